@@ -0,0 +1,50 @@
+"""Run-scoped handoff of generated assets between pipeline stages.
+
+The image and voice stages upload their outputs to S3, and the video stage
+of the same job needs those bytes moments later. Rather than downloading
+them back, stages keep a local copy of what they store and register it here
+under its S3 key; the video stage reads the local file and falls back to S3
+only for assets it does not find (a resumed run, a cache hit).
+"""
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+
+class RunAssets:
+    """Local copies of the assets a pipeline run has stored.
+
+    Use as a context manager; the copies are removed when the run ends.
+    """
+
+    def __init__(self) -> None:
+        self.dir = Path(tempfile.mkdtemp(prefix="run-assets-"))
+        self._paths: dict[str, str] = {}
+
+    def __enter__(self) -> "RunAssets":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def path_for(self, key: str) -> Path:
+        """Return where to keep the local copy of an asset stored under a key."""
+        return self.dir / key.replace("/", "_")
+
+    def add(self, key: str, path: str | Path) -> None:
+        """Register the local copy of an asset stored under a key."""
+        self._paths[key] = str(path)
+
+    def get(self, key: str) -> str | None:
+        """Return the local copy of an asset, or None if there is none."""
+        path = self._paths.get(key)
+        if path is None or not os.path.exists(path):
+            return None
+        return path
+
+    def close(self) -> None:
+        """Remove every local copy."""
+        self._paths.clear()
+        shutil.rmtree(self.dir, ignore_errors=True)
@@ -0,0 +1,221 @@
+"""In-process MP3 duration measurement.
+
+Narration clips are MP3 streams. Their exact duration is the number of
+audio frames times the samples per frame, divided by the sample rate, all
+of which can be read from the 4-byte frame headers, less the encoder delay
+and padding that a LAME tag says the decoder drops. Walking the headers is
+much cheaper than an ffprobe subprocess and works on bytes already in
+memory or on a stream as it arrives.
+"""
+
+# Bitrates in kbps by (MPEG version is 1, layer) and bitrate index
+_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+# Sample rates by version bits (0 = MPEG 2.5, 2 = MPEG 2, 3 = MPEG 1)
+_SAMPLE_RATES = {
+    0: (11025, 12000, 8000),
+    2: (22050, 24000, 16000),
+    3: (44100, 48000, 32000),
+}
+
+_HEADER_SIZE = 4
+_ID3_HEADER_SIZE = 10
+
+# Encoder names that start the LAME tag after a Xing/Info header (LAME itself,
+# and FFmpeg's libmp3lame muxer)
+_LAME_ENCODERS = (b"LAME", b"Lavf", b"Lavc")
+
+
+def _parse_header(header: bytes) -> tuple[int, int, int] | None:
+    """Parse an MPEG audio frame header.
+
+    Returns:
+        (frame_length, samples, sample_rate), or None if the bytes are not
+        a valid frame header.
+    """
+    if header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version_bits = (header[1] >> 3) & 0x03
+    layer_bits = (header[1] >> 1) & 0x03
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0x03
+    padding = (header[2] >> 1) & 0x01
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None  # Reserved values, or free-format bitrate
+
+    mpeg1 = version_bits == 3
+    layer = 4 - layer_bits
+    bitrate = _BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version_bits][rate_index]
+
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4, 384, sample_rate
+    if layer == 3 and not mpeg1:
+        return 72 * bitrate // sample_rate + padding, 576, sample_rate
+    return 144 * bitrate // sample_rate + padding, 1152, sample_rate
+
+
+def _encoder_trim(frame: bytes) -> int:
+    """Read the encoder delay plus padding, in samples, from a Xing/Info frame.
+
+    Returns:
+        The samples a decoder drops from the start and end of the stream,
+        or 0 if the frame carries no LAME tag.
+    """
+    for marker in (b"Xing", b"Info"):
+        pos = frame.find(marker)
+        if pos != -1:
+            break
+    else:
+        return 0
+    flags = int.from_bytes(frame[pos + 4:pos + 8], "big")
+    pos += 8
+    # Optional frame count, byte count, seek table and quality fields
+    for flag, size in ((0x1, 4), (0x2, 4), (0x4, 100), (0x8, 4)):
+        if flags & flag:
+            pos += size
+    tag = frame[pos:pos + 24]
+    if len(tag) < 24 or tag[:4] not in _LAME_ENCODERS:
+        return 0
+    delay = tag[21] << 4 | tag[22] >> 4
+    padding = (tag[22] & 0x0F) << 8 | tag[23]
+    return delay + padding
+
+
+class Mp3Duration:
+    """Incremental MP3 duration counter.
+
+    Feed the stream in chunks of any size; only an incomplete trailing
+    frame is kept between calls. ID3v2 tags, ID3v1 trailers, and the
+    Xing/Info header frame written by VBR encoders are skipped, and the
+    encoder delay and padding in its LAME tag are subtracted.
+
+    Attributes:
+        frames: Number of audio frames seen so far.
+        seconds: Decoded duration of those frames.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        self._offset = 0  # Stream offset of the first byte in the buffer
+        self._skip = 0
+        self._started = False
+        self.frames = 0
+        self._frame_seconds = 0.0
+        self._trim_seconds = 0.0
+
+    @property
+    def seconds(self) -> float:
+        return max(0.0, self._frame_seconds - self._trim_seconds)
+
+    def feed(self, data: bytes) -> list[tuple[int, int, float]]:
+        """Consume the next chunk of the stream.
+
+        Returns:
+            The audio frames completed by this chunk, as (start, end,
+            seconds) with start and end as offsets into the whole stream.
+        """
+        if self._skip:
+            skipped = min(self._skip, len(data))
+            self._skip -= skipped
+            self._offset += skipped
+            data = data[skipped:]
+        self._buffer.extend(data)
+        return self._scan()
+
+    def _scan(self) -> list[tuple[int, int, float]]:
+        buffer = self._buffer
+        found = []
+        pos = 0
+        while len(buffer) - pos >= _HEADER_SIZE:
+            if not self._started and buffer[pos:pos + 3] == b"ID3":
+                if len(buffer) - pos < _ID3_HEADER_SIZE:
+                    break
+                size = 0
+                for byte in buffer[pos + 6:pos + 10]:
+                    size = (size << 7) | (byte & 0x7F)
+                footer = _ID3_HEADER_SIZE if buffer[pos + 5] & 0x10 else 0
+                tag_end = pos + _ID3_HEADER_SIZE + size + footer
+                if tag_end > len(buffer):
+                    self._skip = tag_end - len(buffer)
+                    pos = len(buffer)
+                    break
+                pos = tag_end
+                continue
+
+            frame = _parse_header(buffer[pos:pos + _HEADER_SIZE])
+            if frame is None:
+                pos += 1  # Resynchronize on the next candidate header
+                continue
+            length, samples, sample_rate = frame
+            if len(buffer) - pos < length:
+                break  # Wait for the rest of the frame
+            if not self._started:
+                self._started = True
+                first = bytes(buffer[pos:pos + length])
+                if b"Xing" in first[:64] or b"Info" in first[:64] or b"VBRI" in first[:64]:
+                    self._trim_seconds = _encoder_trim(first) / sample_rate
+                    pos += length  # Encoder metadata, not audio
+                    continue
+            seconds = samples / sample_rate
+            self.frames += 1
+            self._frame_seconds += seconds
+            found.append((self._offset + pos, self._offset + pos + length, seconds))
+            pos += length
+        del buffer[:pos]
+        self._offset += pos
+        return found
+
+
+def mp3_duration(data: bytes) -> float:
+    """Return the exact duration in seconds of an MP3 held in memory."""
+    counter = Mp3Duration()
+    counter.feed(data)
+    return counter.seconds
+
+
+def split_mp3(data: bytes, cut_times: list[float]) -> list[tuple[bytes, float]]:
+    """Split an MP3 into clips at frame boundaries.
+
+    Each cut falls on the first frame starting at or after the requested
+    time, so clip durations add up exactly to the whole track.
+
+    Args:
+        data: The complete MP3.
+        cut_times: Ascending times in seconds to cut at.
+
+    Returns:
+        One (clip_bytes, duration_sec) per segment, i.e. len(cut_times) + 1.
+    """
+    clips: list[tuple[bytes, float]] = []
+    cuts = iter(cut_times)
+    next_cut = next(cuts, None)
+    clip_start: int | None = None
+    clip_end = 0
+    clip_seconds = 0.0
+    elapsed = 0.0
+
+    for start, end, seconds in Mp3Duration().feed(data):
+        while next_cut is not None and elapsed >= next_cut:
+            clips.append((data[clip_start:clip_end] if clip_start is not None else b"", clip_seconds))
+            clip_start, clip_seconds = None, 0.0
+            next_cut = next(cuts, None)
+        if clip_start is None:
+            clip_start = start
+        clip_end = end
+        clip_seconds += seconds
+        elapsed += seconds
+
+    clips.append((data[clip_start:clip_end] if clip_start is not None else b"", clip_seconds))
+    while next_cut is not None:
+        # Cuts past the end of the audio produce empty clips
+        clips.append((b"", 0.0))
+        next_cut = next(cuts, None)
+    return clips
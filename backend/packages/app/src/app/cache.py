@@ -0,0 +1,267 @@
+"""Content-addressed cache for generated assets.
+
+Generated assets are keyed by a hash of everything that determines the
+output (model, parameters and full prompt), so regenerating the same scene
+(a re-run or a retry after a later stage failed) reuses the stored bytes
+instead of paying for another provider call.
+
+Cache entries live apart from run outputs and every run gets its own copy
+(an S3 server-side copy, or a local file copy), so evicting an entry never
+breaks a finished storybook. Files derived from an asset (e.g. image
+renditions) can be cached with it as companions, stored next to the entry
+and removed with it.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from app.config import get_settings
+from app.storage import DEFAULT_USER_ID
+
+# Metadata field listing an entry's companion suffixes
+_COMPANIONS_FIELD = "companions"
+
+
+@dataclass
+class CacheHit:
+    """A fresh cache entry.
+
+    Attributes:
+        location: S3 key or local path of the cached asset.
+        metadata: String metadata stored with the entry (e.g. a duration).
+        companions: Locations of files cached with the asset, by suffix.
+    """
+
+    location: str
+    metadata: dict[str, str] = field(default_factory=dict)
+    companions: dict[str, str] = field(default_factory=dict)
+
+
+class AssetCache:
+    """Cache of generated assets in S3 (per user) or on local disk.
+
+    Entries expire ``ttl_sec`` after they were stored. On local disk the
+    cache also keeps at most ``max_entries`` files, evicting the least
+    recently used. In S3, entries live under ``cache/{namespace}/{user_id}/``
+    and are deleted by the bucket's lifecycle rule for that namespace
+    (infrastructure/main.tf), which expires them after the same TTL.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        suffix: str,
+        ttl_sec: int,
+        max_entries: int,
+        storage=None,
+        root: Path | None = None,
+    ) -> None:
+        """Initialize the cache.
+
+        Args:
+            namespace: Asset type, used in the cache path (e.g. "images").
+            suffix: File suffix of cached assets (e.g. ".png").
+            ttl_sec: How long an entry stays valid after it was stored.
+            max_entries: Maximum number of local entries.
+            storage: S3Storage instance, or None in local mode.
+            root: Local cache directory (required in local mode).
+        """
+        if storage is None and root is None:
+            raise ValueError("A local cache needs a root directory")
+        self.namespace = namespace
+        self.suffix = suffix
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self.storage = storage
+        self.root = root
+
+    @staticmethod
+    def fingerprint(**params: Any) -> str:
+        """Hash the parameters that determine a generated asset."""
+        canonical = json.dumps(params, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _location(self, digest: str, user_id: str | None) -> str:
+        filename = f"{digest}{self.suffix}"
+        if self.storage is not None:
+            # A top-level prefix per namespace, which lifecycle rules can match
+            owner = user_id if user_id is not None else DEFAULT_USER_ID
+            return f"cache/{self.namespace}/{owner}/{filename}"
+        return str(self.root / filename)
+
+    @staticmethod
+    def _metadata_path(location: str) -> Path:
+        """Local sidecar file holding an entry's metadata."""
+        return Path(location).with_suffix(".json")
+
+    def _companion(self, location: str, suffix: str) -> str:
+        """Location of a companion file, which replaces the entry's suffix."""
+        return location.removesuffix(self.suffix) + suffix
+
+    def _companions(self, location: str, metadata: dict[str, str]) -> dict[str, str]:
+        """Locations of the companions recorded in an entry's metadata."""
+        suffixes = metadata.get(_COMPANIONS_FIELD, "")
+        return {suffix: self._companion(location, suffix) for suffix in suffixes.split(",") if suffix}
+
+    def get(self, digest: str, user_id: str | None = None) -> CacheHit | None:
+        """Look up a fresh cached asset.
+
+        Args:
+            digest: Fingerprint of the asset.
+            user_id: Owner of the cache entry (S3 mode).
+
+        Returns:
+            The cache hit, or None on a miss or an expired entry.
+        """
+        location = self._location(digest, user_id)
+        if self.storage is not None:
+            response = self.storage.head(location)
+            if response is None:
+                return None
+            age = (datetime.now(timezone.utc) - response["LastModified"]).total_seconds()
+            metadata = response.get("Metadata", {})
+        else:
+            try:
+                stat = os.stat(location)
+            except FileNotFoundError:
+                return None
+            age = time.time() - stat.st_mtime
+            # Record the hit in atime for LRU eviction; mtime keeps the TTL
+            os.utime(location, (time.time(), stat.st_mtime))
+            try:
+                metadata = json.loads(self._metadata_path(location).read_text())
+            except FileNotFoundError:
+                metadata = {}
+        if age > self.ttl_sec:
+            return None
+        companions = self._companions(location, metadata)
+        metadata = {k: v for k, v in metadata.items() if k != _COMPANIONS_FIELD}
+        return CacheHit(location=location, metadata=metadata, companions=companions)
+
+    def put(
+        self,
+        digest: str,
+        source: str,
+        user_id: str | None = None,
+        metadata: dict[str, str] | None = None,
+        companions: dict[str, str] | None = None,
+    ) -> str:
+        """Add an already stored asset to the cache and return its cache location.
+
+        Args:
+            digest: Fingerprint of the asset.
+            source: S3 key or local path the asset was written to.
+            user_id: Owner of the cache entry (S3 mode).
+            metadata: Optional string metadata returned with later hits.
+            companions: Optional files derived from the asset, as S3 key or
+                local path by suffix (e.g. "_thumb.webp"), returned with
+                later hits.
+
+        Returns:
+            S3 key or local path of the cached asset.
+        """
+        location = self._location(digest, user_id)
+        metadata = dict(metadata or {})
+        if companions:
+            metadata[_COMPANIONS_FIELD] = ",".join(companions)
+        if self.storage is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+        # Companions first, so an entry is never visible without them
+        for suffix, companion_source in (companions or {}).items():
+            self._store(companion_source, self._companion(location, suffix))
+        if self.storage is not None:
+            self.storage.copy_object(source, location, metadata=metadata)
+            return location
+
+        if metadata:
+            self._metadata_path(location).write_text(json.dumps(metadata))
+        self._store(source, location)
+        self._evict()
+        return location
+
+    def _store(self, source: str, location: str) -> None:
+        """Copy a stored file into the cache."""
+        if self.storage is not None:
+            self.storage.copy_object(source, location)
+            return
+        # Copy then rename so concurrent readers never see a partial file
+        partial = Path(f"{location}.partial")
+        shutil.copyfile(source, partial)
+        os.replace(partial, location)
+
+    def copy_to(self, location: str, dest: str) -> str:
+        """Copy a cached asset to a run's own key or path and return it."""
+        if self.storage is not None:
+            self.storage.copy_object(location, dest)
+        else:
+            Path(dest).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(location, dest)
+        return dest
+
+    def _evict(self) -> None:
+        """Drop expired local entries, then the least recently used over the limit."""
+        entries = []
+        now = time.time()
+        for path in self.root.glob(f"*{self.suffix}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.ttl_sec:
+                self._remove(path)
+            else:
+                entries.append((max(stat.st_atime, stat.st_mtime), path))
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_entries)]:
+            self._remove(path)
+
+    def _remove(self, path: Path) -> None:
+        metadata_path = self._metadata_path(str(path))
+        try:
+            metadata = json.loads(metadata_path.read_text())
+        except (FileNotFoundError, ValueError):
+            metadata = {}
+        path.unlink(missing_ok=True)
+        for companion in self._companions(str(path), metadata).values():
+            Path(companion).unlink(missing_ok=True)
+        metadata_path.unlink(missing_ok=True)
+
+
+@lru_cache
+def get_image_cache() -> AssetCache | None:
+    """Get the cache for generated scene images, or None if disabled."""
+    settings = get_settings()
+    if not settings.image_cache_enabled:
+        return None
+    return AssetCache(
+        namespace="images",
+        suffix=".png",
+        ttl_sec=settings.image_cache_ttl_sec,
+        max_entries=settings.image_cache_max_entries,
+        storage=settings.get_storage(),
+        root=settings.data_dir / "cache" / "images",
+    )
+
+
+@lru_cache
+def get_tts_cache() -> AssetCache | None:
+    """Get the cache for narration clips, or None if disabled."""
+    settings = get_settings()
+    if not settings.tts_cache_enabled:
+        return None
+    return AssetCache(
+        namespace="audio",
+        suffix=".mp3",
+        ttl_sec=settings.tts_cache_ttl_sec,
+        max_entries=settings.tts_cache_max_entries,
+        storage=settings.get_storage(),
+        root=settings.data_dir / "cache" / "audio",
+    )
@@ -0,0 +1,146 @@
+"""Process-wide API clients with pooled, keep-alive connections.
+
+Building a new SDK client or httpx.AsyncClient per call pays for a fresh
+connection pool and TLS handshake every time. The registry creates each
+client once, on first use, and the app lifespan (or the worker) closes them
+on shutdown.
+"""
+
+import asyncio
+import importlib.util
+import logging
+from functools import lru_cache
+
+import httpx
+from elevenlabs import AsyncElevenLabs
+from openai import AsyncOpenAI
+from pydantic_ai.models.openai import OpenAIChatModel
+from pydantic_ai.providers.openai import OpenAIProvider
+
+from app.config import Settings, get_settings
+
+
+logger = logging.getLogger(__name__)
+
+ELEVENLABS_BASE_URL = "https://api.elevenlabs.io"
+
+# Timeout for plain downloads (generated images, presigned S3 URLs)
+DOWNLOAD_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+
+def _http2_available() -> bool:
+    """Return True if httpx can negotiate HTTP/2 (the optional h2 package)."""
+    return importlib.util.find_spec("h2") is not None
+
+
+class ClientRegistry:
+    """Lazily created, shared clients for OpenAI, ElevenLabs and downloads.
+
+    Each provider gets its own connection pool so a burst of image downloads
+    cannot take connections away from in-flight API calls.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        """Initialize the registry.
+
+        Args:
+            settings: Application settings (API keys and pool limits).
+        """
+        self.settings = settings
+        self.http2 = settings.http2_enabled and _http2_available()
+        self._pools: list[httpx.AsyncClient] = []
+        self._http: httpx.AsyncClient | None = None
+        self._openai: AsyncOpenAI | None = None
+        self._openai_pool: httpx.AsyncClient | None = None
+        self._elevenlabs: AsyncElevenLabs | None = None
+        self._elevenlabs_pool: httpx.AsyncClient | None = None
+
+    def _new_pool(self, timeout: httpx.Timeout | None = None) -> httpx.AsyncClient:
+        """Create an httpx client with the configured pool limits."""
+        pool = httpx.AsyncClient(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=self.settings.http_max_connections,
+                max_keepalive_connections=self.settings.http_max_keepalive_connections,
+                keepalive_expiry=self.settings.http_keepalive_expiry_sec,
+            ),
+            timeout=timeout,
+            follow_redirects=True,
+        )
+        self._pools.append(pool)
+        return pool
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """Client for plain downloads (generated images, presigned URLs)."""
+        if self._http is None:
+            self._http = self._new_pool(DOWNLOAD_TIMEOUT)
+        return self._http
+
+    @property
+    def openai(self) -> AsyncOpenAI:
+        """Shared OpenAI client (DALL-E and the pydantic-ai agents)."""
+        if self._openai is None:
+            self._openai_pool = self._new_pool()
+            self._openai = AsyncOpenAI(
+                api_key=self.settings.openai_api_key,
+                http_client=self._openai_pool,
+            )
+        return self._openai
+
+    @property
+    def elevenlabs(self) -> AsyncElevenLabs:
+        """Shared ElevenLabs client."""
+        return self._ensure_elevenlabs()
+
+    def _ensure_elevenlabs(self) -> AsyncElevenLabs:
+        """Create the ElevenLabs client and its pool if they do not exist yet."""
+        if self._elevenlabs is None:
+            self._elevenlabs_pool = self._new_pool()
+            self._elevenlabs = AsyncElevenLabs(
+                api_key=self.settings.elevenlabs_api_key,
+                httpx_client=self._elevenlabs_pool,
+            )
+        return self._elevenlabs
+
+    def chat_model(self) -> OpenAIChatModel:
+        """Return the configured pydantic-ai chat model, sending requests through the shared OpenAI client."""
+        return OpenAIChatModel(
+            self.settings.openai_chat_model,
+            provider=OpenAIProvider(openai_client=self.openai),
+        )
+
+    async def prewarm(self) -> None:
+        """Open a connection to each provider so the first job skips the handshake.
+
+        Failures are logged and ignored; the connection is simply opened on
+        first use instead.
+        """
+        openai_url = str(self.openai.base_url)
+        self._ensure_elevenlabs()
+        targets = [
+            (self._openai_pool, openai_url),
+            (self._elevenlabs_pool, ELEVENLABS_BASE_URL),
+        ]
+
+        async def warm(pool: httpx.AsyncClient, url: str) -> None:
+            try:
+                await pool.head(url, timeout=5.0)
+            except httpx.HTTPError as e:
+                logger.warning("Could not pre-warm connection to %s: %s", url, e)
+
+        await asyncio.gather(*(warm(pool, url) for pool, url in targets))
+
+    async def aclose(self) -> None:
+        """Close every connection pool; clients are recreated on next use."""
+        pools, self._pools = self._pools, []
+        self._http = self._openai = self._elevenlabs = None
+        self._openai_pool = self._elevenlabs_pool = None
+        for pool in pools:
+            await pool.aclose()
+
+
+@lru_cache
+def get_clients() -> ClientRegistry:
+    """Get cached ClientRegistry instance (singleton)."""
+    return ClientRegistry(get_settings())
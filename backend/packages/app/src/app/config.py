@@ -2,9 +2,12 @@
 
 from pathlib import Path
 from functools import lru_cache
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from app.models import EncodingProfile
+
 
 class Settings(BaseSettings):
     """Application settings loaded from environment."""
@@ -18,6 +21,9 @@ class Settings(BaseSettings):
     openai_api_key: str
     elevenlabs_api_key: str
 
+    # OpenAI chat model used by the vision and story agents
+    openai_chat_model: str = "gpt-4o"
+
     # AWS/S3 Configuration
     aws_region: str = "us-east-1"
     s3_bucket_name: str | None = None
@@ -26,6 +32,95 @@ class Settings(BaseSettings):
     library_table_name: str = "nocomeleon-library"
     checkpoints_table_name: str = "nocomeleon-checkpoints"
 
+    # Pipeline
+    # Encode each scene's video segment as soon as its image and narration
+    # exist, instead of waiting for both stages to finish.
+    streaming_assembly: bool = False
+
+    # Image generation (DALL-E 3): scenes generated at once per run, and the
+    # account's images-per-minute quota shared by all runs in this process
+    image_generation_concurrency: int = 4
+    images_per_minute: int = 15
+    # "url" streams the generated image into storage; "b64_json" returns it
+    # inline in the API response, saving the download round trip
+    image_response_format: Literal["url", "b64_json"] = "url"
+    # Store a WebP thumbnail and JPEG display copy next to each image
+    image_renditions_enabled: bool = True
+    rendition_workers: int = 2
+
+    # Narration (ElevenLabs): concurrent requests allowed by the account's tier
+    elevenlabs_concurrency: int = 5
+    # "whole_story" narrates the story in one request and splits it into
+    # scene clips at the character timestamps (consistent prosody, one
+    # round trip); "per_scene" makes one request per scene
+    tts_mode: Literal["per_scene", "whole_story"] = "per_scene"
+    # ElevenLabs output format (codec_samplerate_bitrate). Narration is mono
+    # speech, so 22.05 kHz at 32 kbps is a quarter the size of the API's
+    # 44.1 kHz / 128 kbps default with no audible loss after the AAC encode
+    tts_output_format: Literal[
+        "mp3_22050_32", "mp3_44100_32", "mp3_44100_64", "mp3_44100_96", "mp3_44100_128",
+    ] = "mp3_22050_32"
+    # Reuse narration already voiced with the same voice, model and text
+    tts_cache_enabled: bool = True
+    tts_cache_ttl_sec: int = 30 * 24 * 3600
+    tts_cache_max_entries: int = 2000  # Local mode only
+    # Reuse images generated from an identical prompt (a re-run or retry)
+    image_cache_enabled: bool = True
+    image_cache_ttl_sec: int = 7 * 24 * 3600
+    image_cache_max_entries: int = 500  # Local mode only
+
+    # Job scheduling (per process)
+    llm_job_concurrency: int = 8
+    tts_job_concurrency: int = 4
+    render_job_concurrency: int = 2
+    job_queue_limit: int = 8
+    job_retry_after_sec: int = 30
+    # Running jobs across all kinds. Kept below the sum of the limits above
+    # so it binds under load, and interactive jobs are then dispatched before
+    # batch work
+    max_running_jobs: int = 8
+    # Fair-share weights by user_id, e.g. '{"user-a": 2}' (default weight 1)
+    job_user_weights: dict[str, float] = {}
+    # How long shutdown waits for in-flight jobs before checkpointing them
+    # as resumable (keep below the ECS stopTimeout)
+    shutdown_drain_sec: float = 25.0
+
+    # Video rendering: ffmpeg processes run at once (defaults to the
+    # container's vCPUs) and their nice level, so encodes yield the CPU to
+    # the API's request handling
+    ffmpeg_concurrency: int | None = None
+    ffmpeg_nice: int = 10
+    # "segments" encodes each scene separately, in parallel up to
+    # ffmpeg_concurrency, and joins them with a stream copy; "single_pass"
+    # encodes the whole story in one ffmpeg run
+    video_render_mode: Literal["single_pass", "segments"] = "single_pass"
+    # Final MP4 layout: "faststart" puts the index first so playback starts
+    # before the download finishes; "fragmented" writes self-contained
+    # fragments that play while the file is still arriving
+    video_container: Literal["faststart", "fragmented"] = "faststart"
+    # Also package the video as HLS with a small bitrate ladder
+    hls_enabled: bool = False
+    # Default encoding preset for jobs that do not pick one
+    encoding_profile: EncodingProfile = EncodingProfile.BALANCED
+
+    # Durable job queue ("inline" runs jobs inside the API process;
+    # "sqlite" persists them for `python -m app.worker`)
+    job_queue_backend: Literal["inline", "sqlite"] = "inline"
+    job_lease_sec: int = 60
+    job_heartbeat_sec: int = 20
+    job_max_attempts: int = 3
+    worker_poll_interval_sec: float = 1.0
+
+    # Outbound HTTP (one pooled client per provider, shared by all stages).
+    # HTTP/2 is opt-in: it also needs the h2 package (httpx[http2]), which
+    # is not a default dependency.
+    http_max_connections: int = 20
+    http_max_keepalive_connections: int = 10
+    http_keepalive_expiry_sec: float = 30.0
+    http2_enabled: bool = False
+    # Open provider connections at startup instead of on the first job
+    prewarm_connections: bool = False
+
     # Paths
     data_dir: Path = Path("./data")
 
@@ -50,6 +145,10 @@ class Settings(BaseSettings):
     def samples_dir(self) -> Path:
         return self.data_dir / "samples"
 
+    @property
+    def job_queue_path(self) -> Path:
+        return self.data_dir / "jobs.db"
+
     # S3 Storage
     @property
     def use_s3(self) -> bool:
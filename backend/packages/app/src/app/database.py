@@ -76,6 +76,27 @@ class Database:
         })
         self.checkpoints_table.put_item(Item=item)
 
+    def update_checkpoint(self, user_id: str, run_id: str, data: dict[str, Any]) -> bool:
+        """Set fields on an existing checkpoint without replacing the others.
+
+        Returns False if the checkpoint no longer exists (e.g. it expired).
+        """
+        names = {f"#f{i}": field for i, field in enumerate(data)}
+        values = {f":v{i}": value for i, value in enumerate(data.values())}
+        values[":updated_at"] = datetime.now(timezone.utc).isoformat()
+        assignments = ", ".join(f"{name} = :v{i}" for i, name in enumerate(names))
+        try:
+            self.checkpoints_table.update_item(
+                Key={"user_id": user_id, "run_id": run_id},
+                UpdateExpression=f"SET {assignments}, updated_at = :updated_at",
+                ConditionExpression="attribute_exists(run_id)",
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=_convert_floats_to_decimal(values),
+            )
+        except self.dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+            return False
+        return True
+
     def delete_checkpoint(self, user_id: str, run_id: str) -> None:
         """Delete a pipeline checkpoint."""
         self.checkpoints_table.delete_item(Key={"user_id": user_id, "run_id": run_id})
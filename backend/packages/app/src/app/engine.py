@@ -0,0 +1,227 @@
+"""Dependency-aware stage execution engine.
+
+Stages declare the stages they depend on. Independent stages run
+concurrently inside a single asyncio.TaskGroup, so a failure in one stage
+cancels its siblings instead of leaving them running in the background.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from app.database import get_database
+
+
+StageFunc = Callable[[dict[str, Any]], Awaitable[Any]]
+
+# Error recorded for jobs cut short by a shutdown; retrying with resume continues them
+INTERRUPTED_ERROR = "Interrupted by a server restart, retry to resume"
+
+# Cancellation message for jobs whose queue lease passed to another worker,
+# which now owns the run's checkpoint
+LEASE_LOST = "lease lost"
+
+
+@dataclass(frozen=True)
+class Stage:
+    """A single unit of work in a stage graph.
+
+    Attributes:
+        name: Unique stage name (also used as ``current_stage`` in checkpoints).
+        run: Async callable receiving the results of completed stages by name.
+        depends_on: Names of stages that must complete before this one starts.
+        checkpoint: Optional callable mapping the stage result to checkpoint fields.
+    """
+
+    name: str
+    run: StageFunc
+    depends_on: tuple[str, ...] = ()
+    checkpoint: Callable[[Any], dict[str, Any]] | None = None
+
+
+class StageFailed(Exception):
+    """Raised when a stage in the graph fails.
+
+    Attributes:
+        stage: Name of the stage that raised.
+        error: The original exception.
+    """
+
+    def __init__(self, stage: str, error: BaseException) -> None:
+        super().__init__(str(error))
+        self.stage = stage
+        self.error = error
+
+
+class StageGraph:
+    """A validated DAG of stages that can be executed concurrently."""
+
+    def __init__(self, stages: list[Stage]) -> None:
+        """Initialize and validate the graph.
+
+        Args:
+            stages: Stages in declaration order.
+
+        Raises:
+            ValueError: If names are duplicated, a dependency is unknown,
+                or the graph contains a cycle.
+        """
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Stage names must be unique")
+        for stage in stages:
+            for dep in stage.depends_on:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> list[str]:
+        """Return stage names in a valid execution order."""
+        order: list[str] = []
+        visiting: set[str] = set()
+
+        def visit(name: str) -> None:
+            if name in order:
+                return
+            if name in visiting:
+                raise ValueError(f"Stage graph has a cycle through '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].depends_on:
+                visit(dep)
+            visiting.discard(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    async def run(
+        self,
+        on_start: Callable[[str], None] | None = None,
+        on_complete: Callable[[str, Any], None] | None = None,
+        initial: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        """Execute all stages, running independent stages concurrently.
+
+        Args:
+            on_start: Optional hook called when a stage starts.
+            on_complete: Optional hook called with the stage result when it completes.
+            initial: Results for stages that are already complete; these are skipped.
+
+        Returns:
+            Mapping of stage name to result.
+
+        Raises:
+            StageFailed: If any stage or hook raises. Sibling stages are cancelled.
+        """
+        results: dict[str, Any] = dict(initial or {})
+        done = {name: asyncio.Event() for name in self.stages}
+        for name in results:
+            if name in done:
+                done[name].set()
+
+        async def execute(stage: Stage) -> None:
+            for dep in stage.depends_on:
+                await done[dep].wait()
+            # Hook failures (e.g. a checkpoint write) fail the stage too
+            try:
+                if on_start:
+                    on_start(stage.name)
+                result = await stage.run(results)
+                results[stage.name] = result
+                if on_complete:
+                    on_complete(stage.name, result)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                raise StageFailed(stage.name, e) from e
+            done[stage.name].set()
+
+        try:
+            async with asyncio.TaskGroup() as tg:
+                for name in self.order:
+                    if name not in results:
+                        tg.create_task(execute(self.stages[name]))
+        except* StageFailed as group:
+            raise group.exceptions[0] from None
+
+        return results
+
+
+async def run_job(
+    graph: StageGraph,
+    user_id: str,
+    run_id: str,
+    state: dict[str, Any] | None = None,
+    complete_stage: str | None = None,
+    initial: dict[str, Any] | None = None,
+) -> dict[str, Any] | None:
+    """Run a stage graph as a background job, checkpointing progress.
+
+    The checkpoint is rewritten whenever a stage starts or completes. While
+    several stages run concurrently, ``current_stage`` reports the earliest
+    declared stage that is still running. If the job is cancelled (e.g. on
+    shutdown), it is checkpointed as a resumable error before the
+    cancellation propagates, unless it was cancelled with LEASE_LOST.
+
+    Args:
+        graph: The stages to run.
+        user_id: Owner of the job.
+        run_id: Job identifier.
+        state: Checkpoint fields carried through every save (e.g. story_script).
+        complete_stage: ``current_stage`` value written on success. Defaults
+            to ``"{last stage}_complete"``.
+        initial: Results for stages that are already complete.
+
+    Returns:
+        Mapping of stage name to result, or None if the job failed.
+    """
+    db = get_database()
+    state = dict(state or {})
+    running: list[str] = []
+    completed: set[str] = set(initial or {})
+
+    for name, result in (initial or {}).items():
+        stage = graph.stages.get(name)
+        if stage and stage.checkpoint:
+            state.update(stage.checkpoint(result))
+
+    def current_stage() -> str | None:
+        for name in graph.stages:
+            if name in running:
+                return name
+        return next((name for name in graph.order if name not in completed), None)
+
+    def save(status: str, stage: str | None, **extra: Any) -> None:
+        db.save_checkpoint(user_id, run_id, {
+            "status": status,
+            "current_stage": stage,
+            **state,
+            **extra,
+        })
+
+    def on_start(name: str) -> None:
+        running.append(name)
+        save("processing", current_stage())
+
+    def on_complete(name: str, result: Any) -> None:
+        running.remove(name)
+        completed.add(name)
+        stage = graph.stages[name]
+        if stage.checkpoint:
+            state.update(stage.checkpoint(result))
+        if running:
+            save("processing", current_stage())
+
+    try:
+        results = await graph.run(on_start=on_start, on_complete=on_complete, initial=initial)
+    except StageFailed as e:
+        save("error", e.stage, error=str(e.error))
+        return None
+    except asyncio.CancelledError as e:
+        if e.args != (LEASE_LOST,):
+            save("error", current_stage(), error=INTERRUPTED_ERROR, resumable=True)
+        raise
+
+    save("complete", complete_stage or f"{graph.order[-1]}_complete")
+    return results
@@ -0,0 +1,421 @@
+"""Background jobs run by the API process or a standalone worker.
+
+Each job type has a handler that takes a JSON-serializable payload, so the
+same job can run inline (via the JobScheduler) or be persisted to the
+durable job queue and picked up by ``app.worker``.
+"""
+
+import asyncio
+import hashlib
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Coroutine
+
+from app.assets import RunAssets
+from app.config import get_settings
+from app.database import get_database
+from app.engine import INTERRUPTED_ERROR, Stage, StageGraph, run_job
+from app.models import (
+    AudioResult,
+    ImageResult,
+    PipelineRequest,
+    StoryRequest,
+    StoryScript,
+    VideoResult,
+)
+from app.queue import get_job_queue
+from app.scheduler import JobKind, Priority, get_scheduler
+from app.stages import (
+    analyze_drawing,
+    generate_story,
+    generate_images,
+    generate_audio,
+    assemble_video,
+    SceneStreamAssembler,
+)
+
+
+async def process_vision_background(image_base64: str, user_id: str, run_id: str):
+    """Background task to process vision analysis."""
+    graph = StageGraph([
+        Stage(
+            "vision",
+            lambda results: analyze_drawing(image_base64),
+            checkpoint=lambda drawing: {"drawing_analysis": drawing.model_dump()},
+        ),
+    ])
+    await run_job(graph, user_id, run_id)
+
+
+async def process_story_background(request: StoryRequest):
+    """Background task to process story generation."""
+    graph = StageGraph([
+        Stage(
+            "story",
+            lambda results: generate_story(
+                drawing=request.drawing,
+                theme=request.theme,
+                child_age=request.child_age,
+                voice_type=request.voice_type,
+                personal_context=request.personal_context,
+            ),
+            checkpoint=lambda story: {"story_script": story.model_dump()},
+        ),
+    ])
+    results = await run_job(
+        graph,
+        request.user_id,
+        request.run_id,
+        state={"drawing_analysis": request.drawing.model_dump()},
+    )
+
+    if results and request.prefetch_narration:
+        scheduler = get_scheduler()
+        # Speculative work only uses idle TTS capacity
+        if scheduler.has_free_slot(JobKind.TTS):
+            key = (request.user_id, request.run_id)
+            cancel_prefetch(*key)
+            task = scheduler.submit(
+                JobKind.TTS,
+                prefetch_narration(request, results["story"]),
+                user_id=request.user_id,
+            )
+            _prefetch_tasks[key] = task
+            task.add_done_callback(_forget_prefetch)
+
+
+def story_fingerprint(story: StoryScript) -> str:
+    """Hash a story script so edits can be detected cheaply."""
+    return hashlib.sha256(story.model_dump_json().encode()).hexdigest()
+
+
+# Speculative narration in flight in this process, by (user_id, run_id)
+_prefetch_tasks: dict[tuple[str | None, str], asyncio.Task] = {}
+
+
+def _forget_prefetch(task: asyncio.Task) -> None:
+    """Drop a finished prefetch from the registry (unless already replaced)."""
+    for key, registered in list(_prefetch_tasks.items()):
+        if registered is task:
+            del _prefetch_tasks[key]
+
+
+def cancel_prefetch(user_id: str | None, run_id: str) -> None:
+    """Cancel speculative narration for a run, if it is still running here."""
+    task = _prefetch_tasks.pop((user_id, run_id), None)
+    if task is not None:
+        task.cancel()
+
+
+async def prefetch_narration(request: StoryRequest, story: StoryScript) -> None:
+    """
+    Speculatively generate narration for a freshly written story.
+
+    Clips are stored under their own keys, named after the story fingerprint
+    and voice, so a prefetch still running when the pipeline starts cannot
+    overwrite the pipeline's narration. The result is attached to the run's
+    checkpoint as ``prefetched_audio``, tagged with the fingerprint and
+    voice. A later pipeline request uses it only if both still match;
+    otherwise it is ignored and dropped with the next checkpoint write.
+    Nothing is stored if the run has expired.
+    """
+    fingerprint = story_fingerprint(story)
+    try:
+        audio = await generate_audio(
+            story=story,
+            voice_type=request.voice_type,
+            run_id=f"{request.run_id}_prefetch_{fingerprint[:12]}_{request.voice_type.value}",
+            user_id=request.user_id,
+        )
+    except Exception:
+        return  # Speculative; the pipeline will generate narration itself
+
+    get_database().update_checkpoint(request.user_id, request.run_id, {
+        "prefetched_audio": {
+            "story_fingerprint": fingerprint,
+            "voice_type": request.voice_type.value,
+            "audio": audio.model_dump(),
+        },
+    })
+
+
+# Checkpoint fields a resumed pipeline carries over from the previous attempt
+RESUMABLE_FIELDS = ("style", "voice_type", "images", "audio", "video")
+
+
+def _asset_exists(key: str, storage) -> bool:
+    """Check whether a stage output is still stored (S3 key or local path)."""
+    if Path(key).exists():
+        return True
+    return storage is not None and storage.object_exists(key)
+
+
+def carry_over_outputs(request: PipelineRequest, previous: dict[str, Any] | None) -> dict[str, Any]:
+    """
+    Select the checkpoint fields of a previous attempt worth keeping for resume.
+
+    Nothing is kept if the story has been edited since that attempt.
+
+    Args:
+        request: The pipeline request being resumed
+        previous: The run's checkpoint before this request, if any
+
+    Returns:
+        Checkpoint fields to merge into the new initial checkpoint
+    """
+    if not previous or not previous.get("story_script"):
+        return {}
+    if StoryScript.model_validate(previous["story_script"]) != request.story:
+        return {}
+    return {field: previous[field] for field in RESUMABLE_FIELDS if field in previous}
+
+
+def prefetched_outputs(request: PipelineRequest, previous: dict[str, Any] | None) -> dict[str, Any]:
+    """
+    Select speculatively generated narration that matches this pipeline request.
+
+    Args:
+        request: The pipeline request
+        previous: The run's checkpoint before this request, if any
+
+    Returns:
+        Checkpoint fields (voice_type, audio) to merge into the initial checkpoint
+    """
+    prefetched = (previous or {}).get("prefetched_audio")
+    if not prefetched:
+        return {}
+    if prefetched.get("story_fingerprint") != story_fingerprint(request.story):
+        return {}
+    if prefetched.get("voice_type") != request.voice_type.value:
+        return {}
+    return {"voice_type": prefetched["voice_type"], "audio": prefetched["audio"]}
+
+
+def resume_results(request: PipelineRequest, checkpoint: dict[str, Any] | None) -> dict[str, Any]:
+    """
+    Rebuild the results of pipeline stages whose outputs are still usable.
+
+    Outputs are reused only if they were made with the same style (images)
+    or voice (narration), cover the same scenes, and every referenced object
+    still exists in storage.
+
+    Args:
+        request: The pipeline request being resumed
+        checkpoint: The run's checkpoint, as prepared by the pipeline endpoint
+
+    Returns:
+        Mapping of stage name to result for stages that can be skipped
+    """
+    if not checkpoint:
+        return {}
+
+    storage = get_settings().get_storage()
+    scene_numbers = [scene.number for scene in request.story.scenes]
+    results: dict[str, Any] = {}
+
+    images = checkpoint.get("images")
+    if images and checkpoint.get("style") == request.style.value:
+        image_result = ImageResult.model_validate({"images": images})
+        if (
+            [img.scene_number for img in image_result.images] == scene_numbers
+            and all(_asset_exists(img.key, storage) for img in image_result.images)
+        ):
+            results["images"] = image_result
+
+    audio = checkpoint.get("audio")
+    if audio and checkpoint.get("voice_type") == request.voice_type.value:
+        audio_result = AudioResult.model_validate(audio)
+        if (
+            [aud.scene_number for aud in audio_result.audio_files] == scene_numbers
+            and all(_asset_exists(aud.key, storage) for aud in audio_result.audio_files)
+            and (audio_result.track_key is None or _asset_exists(audio_result.track_key, storage))
+        ):
+            results["voice"] = audio_result
+
+    video = checkpoint.get("video")
+    if video and "images" in results and "voice" in results:
+        video_result = VideoResult.model_validate(video)
+        if _asset_exists(video_result.video_key, storage):
+            results["video"] = video_result
+
+    return results
+
+
+async def process_pipeline_background(request: PipelineRequest):
+    """Background task to process full video pipeline.
+
+    Images and voice do not depend on each other, so they run concurrently;
+    video assembly starts once both are done. With streaming assembly enabled,
+    each scene is encoded as soon as its image and narration are ready and the
+    video stage only joins the finished segments.
+
+    Stage outputs the endpoint carried into the checkpoint (from a resumed
+    attempt or prefetched narration) are reused when still stored, and work
+    restarts from the first missing stage.
+    """
+    user_id = request.user_id
+    run_id = request.run_id
+    # Speculative narration still running here is superseded by this run
+    cancel_prefetch(user_id, run_id)
+
+    initial = resume_results(request, get_database().get_checkpoint(user_id, run_id))
+
+    async with AsyncExitStack() as stack:
+        # Local copies of stored images and narration, so the video stage
+        # does not download what this job has just uploaded
+        assets = stack.enter_context(RunAssets())
+        assembler = None
+        if get_settings().streaming_assembly:
+            assembler = await stack.enter_async_context(
+                SceneStreamAssembler(
+                    run_id=run_id,
+                    user_id=user_id,
+                    encoding_profile=request.encoding_profile,
+                    assets=assets,
+                )
+            )
+
+        def video_stage(results):
+            if assembler is not None:
+                return assembler.finish(results["images"], results["voice"])
+            return assemble_video(
+                images=results["images"],
+                audio=results["voice"],
+                run_id=run_id,
+                user_id=user_id,
+                encoding_profile=request.encoding_profile,
+                assets=assets,
+            )
+
+        graph = StageGraph([
+            Stage(
+                "images",
+                lambda results: generate_images(
+                    story=request.story,
+                    drawing=request.drawing,
+                    style=request.style,
+                    run_id=run_id,
+                    user_id=user_id,
+                    on_image=assembler.add_image if assembler else None,
+                    assets=assets,
+                ),
+                checkpoint=lambda image_result: {
+                    "images": [img.model_dump() for img in image_result.images],
+                },
+            ),
+            Stage(
+                "voice",
+                lambda results: generate_audio(
+                    story=request.story,
+                    voice_type=request.voice_type,
+                    run_id=run_id,
+                    user_id=user_id,
+                    on_audio=assembler.add_audio if assembler else None,
+                    assets=assets,
+                ),
+                checkpoint=lambda audio_result: {"audio": audio_result.model_dump()},
+            ),
+            Stage(
+                "video",
+                video_stage,
+                depends_on=("images", "voice"),
+                checkpoint=lambda video_result: {"video": video_result.model_dump()},
+            ),
+        ])
+        await run_job(
+            graph,
+            user_id,
+            run_id,
+            state={
+                "drawing_analysis": request.drawing.model_dump(),
+                "story_script": request.story.model_dump(),
+                "style": request.style.value,
+                "voice_type": request.voice_type.value,
+            },
+            initial=initial,
+        )
+
+
+@dataclass(frozen=True)
+class JobSpec:
+    """How a job type is scheduled and executed.
+
+    Attributes:
+        kind: Resource class the job is scheduled under.
+        handler: Builds the job coroutine from its JSON payload.
+        priority: Dispatch priority class.
+    """
+
+    kind: JobKind
+    handler: Callable[[dict[str, Any]], Coroutine[Any, Any, None]]
+    priority: Priority = Priority.BATCH
+
+
+JOBS: dict[str, JobSpec] = {
+    "vision": JobSpec(
+        kind=JobKind.LLM,
+        handler=lambda payload: process_vision_background(
+            payload["image_base64"], payload["user_id"], payload["run_id"]
+        ),
+        priority=Priority.INTERACTIVE,
+    ),
+    "story": JobSpec(
+        kind=JobKind.LLM,
+        handler=lambda payload: process_story_background(StoryRequest.model_validate(payload)),
+        priority=Priority.INTERACTIVE,
+    ),
+    "pipeline": JobSpec(
+        kind=JobKind.RENDER,
+        handler=lambda payload: process_pipeline_background(PipelineRequest.model_validate(payload)),
+    ),
+}
+
+
+def ensure_capacity(job_type: str) -> None:
+    """Raise SchedulerSaturated if a job of this type would be rejected.
+
+    Only applies when jobs run inline; the durable queue absorbs bursts and
+    workers pull at their own pace.
+    """
+    if get_job_queue() is None:
+        get_scheduler().ensure_capacity(JOBS[job_type].kind)
+
+
+def mark_interrupted(payload: dict[str, Any]) -> None:
+    """Checkpoint a job that was cancelled before it ever started as resumable."""
+    user_id = payload.get("user_id")
+    run_id = payload.get("run_id")
+    if user_id and run_id:
+        get_database().update_checkpoint(user_id, run_id, {
+            "status": "error",
+            "error": INTERRUPTED_ERROR,
+            "resumable": True,
+        })
+
+
+def dispatch(job_type: str, payload: dict[str, Any]) -> None:
+    """Run a job in this process or hand it to the durable job queue.
+
+    Args:
+        job_type: Key into JOBS.
+        payload: JSON-serializable job arguments.
+    """
+    spec = JOBS[job_type]
+    queue = get_job_queue()
+    if queue is not None:
+        queue.enqueue(
+            job_type,
+            spec.kind.value,
+            payload,
+            user_id=payload.get("user_id"),
+            priority=spec.priority,
+        )
+    else:
+        get_scheduler().submit(
+            spec.kind,
+            spec.handler(payload),
+            user_id=payload.get("user_id"),
+            priority=spec.priority,
+            on_abandon=lambda: mark_interrupted(payload),
+        )
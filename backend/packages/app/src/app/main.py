@@ -1,16 +1,30 @@
 """FastAPI application for NoComelon AI pipeline."""
 
 import asyncio
-import subprocess
+import posixpath
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
+from urllib.parse import quote
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 
+from app.clients import get_clients
 from app.config import get_settings
 from app.database import get_database
+from app.jobs import (
+    cancel_prefetch,
+    carry_over_outputs,
+    dispatch,
+    ensure_capacity,
+    prefetched_outputs,
+)
+from app.queue import get_job_queue
+from app.renditions import shutdown_rendition_pool
+from app.scheduler import JobKind, SchedulerSaturated, get_scheduler
 from app.models import (
     VisionRequest,
     StoryRequest,
@@ -28,8 +42,6 @@ from app.models import (
     PipelineResponse,
 )
 from app.stages import (
-    analyze_drawing,
-    generate_story,
     generate_images,
     generate_audio,
     assemble_video,
@@ -47,13 +59,27 @@ class JobStatusResponse(BaseModel):
     story_script: dict | None = None
     images: list | None = None
     video: dict | None = None
+    resumable: bool = False
     updated_at: str | None = None
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Pre-warm API connections on startup; drain jobs and close clients on shutdown."""
+    settings = get_settings()
+    if settings.prewarm_connections:
+        await get_clients().prewarm()
+    yield
+    await get_scheduler().shutdown(settings.shutdown_drain_sec)
+    await get_clients().aclose()
+    shutdown_rendition_pool()
+
+
 app = FastAPI(
     title="NoComelon API",
     description="AI pipeline for generating children's storybooks from drawings",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # CORS for Streamlit
@@ -66,6 +92,16 @@ app.add_middleware(
 )
 
 
+@app.exception_handler(SchedulerSaturated)
+async def scheduler_saturated_handler(request: Request, exc: SchedulerSaturated):
+    """Reject work the process cannot take on right now."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 @app.get("/health")
 async def health():
     """Basic health check."""
@@ -88,9 +124,13 @@ async def status():
 
     # Check FFmpeg
     try:
-        subprocess.run(['ffmpeg', '-version'], capture_output=True, check=True)
-        ffmpeg_status = "installed"
-    except (subprocess.CalledProcessError, FileNotFoundError):
+        process = await asyncio.create_subprocess_exec(
+            'ffmpeg', '-version',
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        ffmpeg_status = "installed" if await process.wait() == 0 else "missing"
+    except FileNotFoundError:
         ffmpeg_status = "missing"
 
     # Check data directory
@@ -108,24 +148,6 @@ async def status():
     }
 
 
-async def process_vision_background(image_base64: str, user_id: str, run_id: str):
-    """Background task to process vision analysis."""
-    db = get_database()
-    try:
-        result = await analyze_drawing(image_base64)
-        db.save_checkpoint(user_id, run_id, {
-            "status": "complete",
-            "current_stage": "vision_complete",
-            "drawing_analysis": result.model_dump(),
-        })
-    except Exception as e:
-        db.save_checkpoint(user_id, run_id, {
-            "status": "error",
-            "current_stage": "vision",
-            "error": str(e),
-        })
-
-
 @app.post("/api/v1/vision/analyze")
 async def api_analyze_drawing(request: VisionRequest):
     """Analyze a drawing asynchronously. Poll /api/v1/jobs/{run_id}/status for results."""
@@ -134,6 +156,8 @@ async def api_analyze_drawing(request: VisionRequest):
     if not request.user_id:
         raise HTTPException(status_code=400, detail="user_id is required for async processing")
 
+    ensure_capacity("vision")
+
     db = get_database()
     # Initialize checkpoint
     db.save_checkpoint(request.user_id, run_id, {
@@ -142,43 +166,24 @@ async def api_analyze_drawing(request: VisionRequest):
     })
 
     # Start background task
-    asyncio.create_task(process_vision_background(request.image_base64, request.user_id, run_id))
+    dispatch("vision", {
+        "image_base64": request.image_base64,
+        "user_id": request.user_id,
+        "run_id": run_id,
+    })
 
     # Return immediately
     return {"run_id": run_id, "status": "processing", "current_stage": "vision"}
 
 
-async def process_story_background(request: StoryRequest):
-    """Background task to process story generation."""
-    db = get_database()
-    try:
-        story = await generate_story(
-            drawing=request.drawing,
-            theme=request.theme,
-            child_age=request.child_age,
-            voice_type=request.voice_type,
-            personal_context=request.personal_context,
-        )
-        db.save_checkpoint(request.user_id, request.run_id, {
-            "status": "complete",
-            "current_stage": "story_complete",
-            "drawing_analysis": request.drawing.model_dump(),
-            "story_script": story.model_dump(),
-        })
-    except Exception as e:
-        db.save_checkpoint(request.user_id, request.run_id, {
-            "status": "error",
-            "current_stage": "story",
-            "error": str(e),
-        })
-
-
 @app.post("/api/v1/story/generate")
 async def api_generate_story(request: StoryRequest):
     """Generate a story asynchronously. Poll /api/v1/jobs/{run_id}/status for results."""
     if not request.user_id or not request.run_id:
         raise HTTPException(status_code=400, detail="user_id and run_id are required")
 
+    ensure_capacity("story")
+
     db = get_database()
     # Initialize checkpoint
     db.save_checkpoint(request.user_id, request.run_id, {
@@ -188,7 +193,7 @@ async def api_generate_story(request: StoryRequest):
     })
 
     # Start background task
-    asyncio.create_task(process_story_background(request))
+    dispatch("story", request.model_dump(mode="json"))
 
     # Return immediately
     return {"run_id": request.run_id, "status": "processing", "current_stage": "story"}
@@ -198,13 +203,15 @@ async def api_generate_story(request: StoryRequest):
 async def api_generate_images(request: ImagesRequest):
     """Stage 3: Generate images."""
     try:
-        return await generate_images(
+        return await get_scheduler().run(JobKind.LLM, generate_images(
             story=request.story,
             drawing=request.drawing,
             style=request.style,
             run_id=request.run_id,
             user_id=request.user_id,
-        )
+        ), user_id=request.user_id)
+    except SchedulerSaturated:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -213,12 +220,14 @@ async def api_generate_images(request: ImagesRequest):
 async def api_generate_audio(request: VoiceRequest):
     """Stage 4: Generate voice audio."""
     try:
-        return await generate_audio(
+        return await get_scheduler().run(JobKind.TTS, generate_audio(
             story=request.story,
             voice_type=request.voice_type,
             run_id=request.run_id,
             user_id=request.user_id,
-        )
+        ), user_id=request.user_id)
+    except SchedulerSaturated:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -227,13 +236,16 @@ async def api_generate_audio(request: VoiceRequest):
 async def api_assemble_video(request: VideoRequest):
     """Stage 5: Assemble final video."""
     try:
-        return await assemble_video(
+        return await get_scheduler().run(JobKind.RENDER, assemble_video(
             images=request.images,
             audio=request.audio,
             run_id=request.run_id,
             music_track=request.music_track,
             user_id=request.user_id,
-        )
+            encoding_profile=request.encoding_profile,
+        ), user_id=request.user_id)
+    except SchedulerSaturated:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -264,98 +276,55 @@ async def api_delete_from_library(storybook_id: str, user_id: str):
 
 
 # Pipeline endpoint
-async def process_pipeline_background(request: PipelineRequest):
-    """Background task to process full video pipeline."""
-    db = get_database()
-    user_id = request.user_id
-    run_id = request.run_id
-
-    try:
-        # Stage: Images
-        db.save_checkpoint(user_id, run_id, {
-            "status": "processing",
-            "current_stage": "images",
-            "drawing_analysis": request.drawing.model_dump(),
-            "story_script": request.story.model_dump(),
-        })
-        image_result = await generate_images(
-            story=request.story,
-            drawing=request.drawing,
-            style=request.style,
-            run_id=run_id,
-            user_id=user_id,
-        )
-
-        # Stage: Voice
-        db.save_checkpoint(user_id, run_id, {
-            "status": "processing",
-            "current_stage": "voice",
-            "drawing_analysis": request.drawing.model_dump(),
-            "story_script": request.story.model_dump(),
-            "images": [{"scene_number": img.scene_number, "key": img.key} for img in image_result.images],
-        })
-        audio_result = await generate_audio(
-            story=request.story,
-            voice_type=request.voice_type,
-            run_id=run_id,
-            user_id=user_id,
-        )
-
-        # Stage: Video
-        db.save_checkpoint(user_id, run_id, {
-            "status": "processing",
-            "current_stage": "video",
-            "drawing_analysis": request.drawing.model_dump(),
-            "story_script": request.story.model_dump(),
-            "images": [{"scene_number": img.scene_number, "key": img.key} for img in image_result.images],
-        })
-        video_result = await assemble_video(
-            images=image_result,
-            audio=audio_result,
-            run_id=run_id,
-            user_id=user_id,
-        )
-
-        # Complete
-        db.save_checkpoint(user_id, run_id, {
-            "status": "complete",
-            "current_stage": "video_complete",
-            "drawing_analysis": request.drawing.model_dump(),
-            "story_script": request.story.model_dump(),
-            "images": [{"scene_number": img.scene_number, "key": img.key} for img in image_result.images],
-            "video": video_result.model_dump(),
-        })
-
-    except Exception as e:
-        db.save_checkpoint(user_id, run_id, {
-            "status": "error",
-            "current_stage": "error",
-            "error": str(e),
-        })
-
-
 @app.post("/api/v1/pipeline/generate")
 async def api_generate_pipeline(request: PipelineRequest):
     """Generate video asynchronously. Poll /api/v1/jobs/{run_id}/status for results."""
     if not request.user_id or not request.run_id:
         raise HTTPException(status_code=400, detail="user_id and run_id are required")
 
+    ensure_capacity("pipeline")
+
+    # Speculative narration still running would race this run's voice stage
+    cancel_prefetch(request.user_id, request.run_id)
+
     db = get_database()
-    # Initialize checkpoint
-    db.save_checkpoint(request.user_id, request.run_id, {
+    checkpoint = {
         "status": "processing",
         "current_stage": "images",
         "drawing_analysis": request.drawing.model_dump(),
         "story_script": request.story.model_dump(),
-    })
+    }
+    previous = db.get_checkpoint(request.user_id, request.run_id)
+    # Narration speculatively generated after the story stage, if still valid
+    checkpoint.update(prefetched_outputs(request, previous))
+    if request.resume:
+        # Keep the previous attempt's stage outputs so the job can reuse them
+        checkpoint.update(carry_over_outputs(request, previous))
+
+    # Initialize checkpoint
+    db.save_checkpoint(request.user_id, request.run_id, checkpoint)
 
     # Start background task
-    asyncio.create_task(process_pipeline_background(request))
+    dispatch("pipeline", request.model_dump(mode="json"))
 
     # Return immediately
     return {"run_id": request.run_id, "status": "processing", "current_stage": "images"}
 
 
+# Job queue depth endpoint
+@app.get("/api/v1/jobs/queue")
+async def get_queue_depth():
+    """Get running and queued job counts per job kind.
+
+    Reports the durable queue when one is configured, otherwise this
+    process's scheduler.
+    """
+    queue = get_job_queue()
+    if queue is not None:
+        return queue.stats()
+    return get_scheduler().stats()
+
+
 # Job status endpoint (for async polling)
 @app.get("/api/v1/jobs/{run_id}/status")
 async def get_job_status(run_id: str, user_id: str = Query(...)) -> JobStatusResponse:
@@ -375,6 +344,7 @@ async def get_job_status(run_id: str, user_id: str = Query(...)) -> JobStatusRes
         story_script=checkpoint.get("story_script"),
         images=checkpoint.get("images"),
         video=checkpoint.get("video"),
+        resumable=checkpoint.get("resumable", False),
         updated_at=checkpoint.get("updated_at"),
     )
 
@@ -424,3 +394,60 @@ async def generate_presigned_url(
             status_code=500,
             detail=f"Failed to generate pre-signed URL: {str(e)}"
         )
+
+
+def _sign_playlist(playlist: str, s3_key: str, user_id: str, storage, expires_in: int) -> str:
+    """Rewrite the URIs of an HLS playlist so a player can fetch them.
+
+    Packaged playlists refer to their variants and segments by relative
+    names, which do not resolve against a presigned URL. Variant playlists
+    are pointed back at the HLS endpoint, and segments get presigned URLs.
+    """
+    prefix = posixpath.dirname(s3_key)
+    lines = []
+    for line in playlist.splitlines():
+        uri = line.strip()
+        if uri and not uri.startswith("#"):
+            if uri.endswith(".m3u8"):
+                line = f"{uri}?user_id={quote(user_id)}"
+            else:
+                line = storage.generate_presigned_url(posixpath.join(prefix, uri), expires_in=expires_in)
+        lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+@app.get("/api/v1/videos/hls/{s3_key:path}")
+async def get_hls_playlist(
+    s3_key: str,
+    user_id: str = Query(..., description="User ID for authorization"),
+) -> Response:
+    """Serve an HLS playlist whose segments can be fetched from the private bucket.
+
+    Load the master playlist (VideoResult.hls_playlist_key) from this
+    endpoint; the variant playlists it lists are served from here as well.
+    """
+    if not s3_key.startswith(f"{user_id}/"):
+        raise HTTPException(
+            status_code=403,
+            detail="Access denied: S3 key does not belong to this user"
+        )
+    if not s3_key.endswith(".m3u8"):
+        raise HTTPException(status_code=400, detail="Not an HLS playlist")
+
+    storage = get_settings().get_storage()
+    if not storage:
+        raise HTTPException(
+            status_code=500,
+            detail="S3 storage not configured"
+        )
+
+    try:
+        playlist = await asyncio.to_thread(storage.download_bytes, s3_key)
+    except Exception as e:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Playlist not found: {str(e)}"
+        )
+
+    content = _sign_playlist(playlist.decode(), s3_key, user_id, storage, expires_in=3600)
+    return Response(content=content, media_type="application/vnd.apple.mpegurl")
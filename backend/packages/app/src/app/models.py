@@ -27,6 +27,13 @@ class VoiceType(str, Enum):
     CHEERFUL = "cheerful"
 
 
+class EncodingProfile(str, Enum):
+    """Video encoding presets, trading encode time against file size."""
+    FAST = "fast"
+    BALANCED = "balanced"
+    QUALITY = "quality"
+
+
 # Stage 1: Vision Output
 class DrawingAnalysis(BaseModel):
     """Result of analyzing a child's drawing."""
@@ -62,6 +69,8 @@ class GeneratedImage(BaseModel):
     """A generated image for a scene."""
     scene_number: int
     key: str  # S3 key
+    thumbnail_key: str | None = None  # Small WebP rendition
+    display_key: str | None = None  # Full-size JPEG rendition
 
 
 class ImageResult(BaseModel):
@@ -81,6 +90,7 @@ class AudioResult(BaseModel):
     """Result of voice generation stage."""
     audio_files: list[GeneratedAudio]
     total_duration_sec: float
+    track_key: str | None = None  # Whole-story narration, when voiced in one request
 
 
 # Stage 5: Video Output
@@ -89,6 +99,11 @@ class VideoResult(BaseModel):
     video_key: str  # S3 key
     duration_sec: float
     thumbnail_key: str  # S3 key
+    hls_playlist_key: str | None = None  # S3 key of the HLS master playlist
+    hls_segment_keys: list[str] = Field(
+        default_factory=list,
+        description="S3 keys of the HLS media segments, by variant in playback order",
+    )
 
 
 # Checkpoint
@@ -130,6 +145,10 @@ class StoryRequest(BaseModel):
     child_age: int = Field(ge=3, le=7)
     user_id: str | None = None
     run_id: str | None = None
+    prefetch_narration: bool = Field(
+        default=False,
+        description="Speculatively generate narration as soon as the story is ready",
+    )
 
 
 class ImagesRequest(BaseModel):
@@ -156,6 +175,10 @@ class VideoRequest(BaseModel):
     audio: AudioResult
     music_track: str | None = None
     user_id: str | None = None
+    encoding_profile: EncodingProfile | None = Field(
+        default=None,
+        description="Encoding preset (defaults to the server's encoding_profile)",
+    )
 
 
 # Library Models
@@ -179,6 +202,14 @@ class PipelineRequest(BaseModel):
     style: Style
     voice_type: VoiceType
     user_id: str | None = None
+    resume: bool = Field(
+        default=False,
+        description="Reuse stage outputs already stored for this run_id",
+    )
+    encoding_profile: EncodingProfile | None = Field(
+        default=None,
+        description="Encoding preset (defaults to the server's encoding_profile)",
+    )
 
 
 class PipelineResponse(BaseModel):
@@ -0,0 +1,303 @@
+"""Durable job queue with leased workers.
+
+Jobs are persisted before the API responds, so a deploy or crash no longer
+drops them. Workers lease a job for a limited time and extend the lease with
+heartbeats while it runs; a lease that expires (because the worker died) is
+recovered and the job is either re-queued or, after too many attempts,
+marked as failed. Leasing prefers higher-priority jobs and, within a
+priority, users with the fewest jobs currently running. Job status for
+clients still lives in the DynamoDB checkpoint; the queue only tracks
+delivery.
+"""
+
+import json
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import closing
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from app.config import get_settings
+
+
+@dataclass
+class QueuedJob:
+    """A job leased from the queue.
+
+    Attributes:
+        id: Queue-assigned job identifier.
+        job_type: Key into app.jobs.JOBS.
+        kind: Job kind (scheduler resource class) as a string.
+        payload: JSON payload passed to the job handler.
+        attempts: Number of times the job has been leased, including this one.
+        lease_token: Token proving ownership of the current lease.
+    """
+
+    id: str
+    job_type: str
+    kind: str
+    payload: dict[str, Any]
+    attempts: int
+    lease_token: str
+
+
+class JobQueue(ABC):
+    """Interface for durable job queues."""
+
+    @abstractmethod
+    def enqueue(
+        self,
+        job_type: str,
+        kind: str,
+        payload: dict[str, Any],
+        user_id: str | None = None,
+        priority: int = 1,
+    ) -> str:
+        """Persist a job and return its id.
+
+        Lower priority values are leased first.
+        """
+
+    @abstractmethod
+    def lease(self, worker_id: str, kinds: list[str] | None = None) -> QueuedJob | None:
+        """Lease the next queued job of one of the given kinds, if any."""
+
+    @abstractmethod
+    def heartbeat(self, job: QueuedJob) -> bool:
+        """Extend a lease. Returns False if the lease was lost."""
+
+    @abstractmethod
+    def complete(self, job: QueuedJob) -> None:
+        """Mark a leased job as done."""
+
+    @abstractmethod
+    def fail(self, job: QueuedJob, error: str) -> None:
+        """Mark a leased job as failed."""
+
+    @abstractmethod
+    def release(self, job: QueuedJob) -> None:
+        """Give up a lease without using an attempt, re-queueing the job."""
+
+    @abstractmethod
+    def recover_stale(self) -> list[QueuedJob]:
+        """Release expired leases.
+
+        Jobs with attempts left are re-queued. Jobs that exhausted their
+        attempts are marked failed and returned so the caller can update
+        their checkpoints.
+        """
+
+    @abstractmethod
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Return queued and leased job counts per kind."""
+
+
+class SQLiteJobQueue(JobQueue):
+    """JobQueue backed by a local SQLite database.
+
+    Suitable for a single host or a shared volume. Every operation opens its
+    own short-lived connection, so the queue can be used from several
+    processes at once.
+    """
+
+    def __init__(self, path: Path, lease_sec: int = 60, max_attempts: int = 3) -> None:
+        """Initialize the queue and create its table if needed.
+
+        Args:
+            path: Path to the SQLite database file.
+            lease_sec: How long a lease lasts without a heartbeat.
+            max_attempts: How many times a job is leased before it is failed.
+        """
+        self.path = path
+        self.lease_sec = lease_sec
+        self.max_attempts = max_attempts
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    job_type TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    user_id TEXT NOT NULL DEFAULT '',
+                    priority INTEGER NOT NULL DEFAULT 1,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_owner TEXT,
+                    lease_token TEXT,
+                    lease_expires REAL,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "user_id" not in columns:
+                # Databases created before fair-share leasing
+                conn.execute("ALTER TABLE jobs ADD COLUMN user_id TEXT NOT NULL DEFAULT ''")
+                conn.execute("ALTER TABLE jobs ADD COLUMN priority INTEGER NOT NULL DEFAULT 1")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_status_kind ON jobs (status, kind, created_at)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection in autocommit mode with a busy timeout."""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def enqueue(
+        self,
+        job_type: str,
+        kind: str,
+        payload: dict[str, Any],
+        user_id: str | None = None,
+        priority: int = 1,
+    ) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, job_type, kind, payload, user_id, priority, status,"
+                " created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, job_type, kind, json.dumps(payload), user_id or "", int(priority), now, now),
+            )
+        return job_id
+
+    def lease(self, worker_id: str, kinds: list[str] | None = None) -> QueuedJob | None:
+        now = time.time()
+        query = "SELECT * FROM jobs AS j WHERE status = 'queued'"
+        params: list[Any] = []
+        if kinds:
+            query += f" AND kind IN ({', '.join('?' for _ in kinds)})"
+            params.extend(kinds)
+        # Priority class first, then the user with the fewest running jobs
+        query += (
+            " ORDER BY priority,"
+            " (SELECT COUNT(*) FROM jobs AS r WHERE r.status = 'leased' AND r.user_id = j.user_id),"
+            " created_at LIMIT 1"
+        )
+
+        conn = self._connect()
+        try:
+            # Take the write lock up front so two workers cannot lease the same row
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(query, params).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            token = uuid.uuid4().hex
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', attempts = attempts + 1, lease_owner = ?,"
+                " lease_token = ?, lease_expires = ?, updated_at = ? WHERE id = ?",
+                (worker_id, token, now + self.lease_sec, now, row["id"]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        return QueuedJob(
+            id=row["id"],
+            job_type=row["job_type"],
+            kind=row["kind"],
+            payload=json.loads(row["payload"]),
+            attempts=row["attempts"] + 1,
+            lease_token=token,
+        )
+
+    def _update_leased(self, job: QueuedJob, assignments: str, params: tuple) -> bool:
+        """Update a job only if the caller still holds its lease."""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ?"
+                " WHERE id = ? AND status = 'leased' AND lease_token = ?",
+                (*params, time.time(), job.id, job.lease_token),
+            )
+            return cursor.rowcount == 1
+
+    def heartbeat(self, job: QueuedJob) -> bool:
+        return self._update_leased(job, "lease_expires = ?", (time.time() + self.lease_sec,))
+
+    def complete(self, job: QueuedJob) -> None:
+        self._update_leased(job, "status = 'done', lease_token = NULL", ())
+
+    def fail(self, job: QueuedJob, error: str) -> None:
+        self._update_leased(job, "status = 'failed', lease_token = NULL, error = ?", (error,))
+
+    def release(self, job: QueuedJob) -> None:
+        self._update_leased(
+            job,
+            "status = 'queued', attempts = attempts - 1, lease_owner = NULL,"
+            " lease_token = NULL, lease_expires = NULL",
+            (),
+        )
+
+    def recover_stale(self) -> list[QueuedJob]:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'leased' AND lease_expires < ?", (now,)
+            ).fetchall()
+            dead = []
+            for row in rows:
+                if row["attempts"] >= self.max_attempts:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', lease_token = NULL,"
+                        " error = 'lease expired', updated_at = ? WHERE id = ?",
+                        (now, row["id"]),
+                    )
+                    dead.append(QueuedJob(
+                        id=row["id"],
+                        job_type=row["job_type"],
+                        kind=row["kind"],
+                        payload=json.loads(row["payload"]),
+                        attempts=row["attempts"],
+                        lease_token="",
+                    ))
+                else:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'queued', lease_owner = NULL, lease_token = NULL,"
+                        " lease_expires = NULL, updated_at = ? WHERE id = ?",
+                        (now, row["id"]),
+                    )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return dead
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT kind, status, COUNT(*) AS n FROM jobs"
+                " WHERE status IN ('queued', 'leased') GROUP BY kind, status"
+            ).fetchall()
+        stats: dict[str, dict[str, int]] = {}
+        for row in rows:
+            counts = stats.setdefault(row["kind"], {"queued": 0, "running": 0})
+            counts["queued" if row["status"] == "queued" else "running"] = row["n"]
+        return stats
+
+
+@lru_cache
+def get_job_queue() -> JobQueue | None:
+    """Get the configured durable job queue, or None if jobs run inline."""
+    settings = get_settings()
+    if settings.job_queue_backend == "sqlite":
+        return SQLiteJobQueue(
+            path=settings.job_queue_path,
+            lease_sec=settings.job_lease_sec,
+            max_attempts=settings.job_max_attempts,
+        )
+    return None
@@ -0,0 +1,80 @@
+"""Client-side rate and concurrency limiting for provider APIs."""
+
+import asyncio
+import time
+from functools import lru_cache
+
+from app.config import get_settings
+
+
+class TokenBucket:
+    """Token-bucket limiter for async callers.
+
+    The bucket holds up to ``capacity`` tokens and refills at ``rate`` tokens
+    per second. Each ``acquire`` reserves a token immediately (the balance may
+    go negative) and sleeps until that reservation is covered, so concurrent
+    callers are served in arrival order without a lock.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        """Initialize a full bucket.
+
+        Args:
+            rate: Tokens added per second.
+            capacity: Maximum burst size.
+        """
+        if rate <= 0 or capacity < 1:
+            raise ValueError("rate must be positive and capacity at least 1")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    @classmethod
+    def per_minute(cls, limit: int, burst: int = 1) -> "TokenBucket":
+        """Build a bucket for a requests-per-minute quota.
+
+        The burst stays small rather than a full minute's allowance, since
+        providers also enforce the quota over sub-minute windows.
+
+        Args:
+            limit: Requests allowed per minute.
+            burst: Requests that may be sent back to back (capped at the limit).
+        """
+        return cls(rate=limit / 60, capacity=min(max(burst, 1), limit))
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Take a token and return how many seconds to wait before using it."""
+        self._refill()
+        self._tokens -= 1
+        return max(0.0, -self._tokens / self.rate)
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and consume it."""
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+@lru_cache
+def get_image_rate_limiter() -> TokenBucket:
+    """Get the process-wide limiter for image generation calls (singleton)."""
+    settings = get_settings()
+    return TokenBucket.per_minute(
+        settings.images_per_minute, burst=settings.image_generation_concurrency
+    )
+
+
+@lru_cache
+def get_tts_semaphore() -> asyncio.Semaphore:
+    """Get the process-wide limit on concurrent ElevenLabs requests (singleton).
+
+    ElevenLabs caps concurrent requests per account by subscription tier,
+    so the limit is shared by every run in the process.
+    """
+    return asyncio.Semaphore(get_settings().elevenlabs_concurrency)
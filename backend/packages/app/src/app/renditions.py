@@ -0,0 +1,128 @@
+"""Compressed renditions of generated scene images.
+
+DALL-E returns 1024x1024 PNGs of several MB each. Next to every original we
+store a small WebP thumbnail and a full-resolution JPEG display copy, which
+clients and the video stage fetch instead. Pillow decoding and encoding is
+CPU-bound, so it runs in a process pool rather than on the event loop.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+from PIL import Image
+
+from app.assets import RunAssets
+from app.config import get_settings
+
+
+@dataclass(frozen=True)
+class Rendition:
+    """A derived image format.
+
+    Attributes:
+        name: Rendition name (also the GeneratedImage field prefix).
+        max_size: Longest edge in pixels; smaller images are not upscaled.
+        format: Pillow format name.
+        suffix: File suffix appended to the original's stem.
+        quality: Encoder quality (0-100).
+    """
+
+    name: str
+    max_size: int
+    format: str
+    suffix: str
+    quality: int
+
+
+RENDITIONS = (
+    Rendition("thumbnail", 256, "WEBP", "_thumb.webp", 80),
+    Rendition("display", 1024, "JPEG", "_display.jpg", 85),
+)
+
+
+def rendition_key(key: str, rendition: Rendition) -> str:
+    """Return the key or path of a rendition stored next to the original."""
+    return f"{os.path.splitext(key)[0]}{rendition.suffix}"
+
+
+def render(source: str, outputs: dict[str, str]) -> None:
+    """Write each rendition of an image (runs in a worker process).
+
+    Args:
+        source: Local path of the original image.
+        outputs: Local output path by rendition name.
+    """
+    with Image.open(source) as original:
+        original = original.convert("RGB")
+        for rendition in RENDITIONS:
+            if rendition.name not in outputs:
+                continue
+            image = original.copy()
+            image.thumbnail((rendition.max_size, rendition.max_size), Image.Resampling.LANCZOS)
+            image.save(outputs[rendition.name], rendition.format, quality=rendition.quality, optimize=True)
+
+
+@lru_cache
+def get_rendition_pool() -> ProcessPoolExecutor:
+    """Get the process pool used for image renditions (singleton).
+
+    Workers are spawned rather than forked, since forking a process that
+    already runs threads (asyncio.to_thread, boto3) can deadlock.
+    """
+    return ProcessPoolExecutor(
+        max_workers=get_settings().rendition_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def shutdown_rendition_pool() -> None:
+    """Stop the rendition workers, if the pool was ever started."""
+    if get_rendition_pool.cache_info().currsize:
+        get_rendition_pool().shutdown(cancel_futures=True)
+        get_rendition_pool.cache_clear()
+
+
+async def create_renditions(
+    source: str,
+    destination: str,
+    storage=None,
+    work_dir: str | None = None,
+    assets: RunAssets | None = None,
+) -> dict[str, str]:
+    """Create and store every rendition of a scene image.
+
+    Args:
+        source: Local path of the original image.
+        destination: S3 key or local path the original was stored at;
+            renditions are stored next to it.
+        storage: S3Storage instance, or None in local mode.
+        work_dir: Local directory for encoded files before upload (S3 mode).
+        assets: Run asset handoff to register the encoded files with (S3 mode).
+
+    Returns:
+        Rendition key or path by rendition name.
+    """
+    keys = {r.name: rendition_key(destination, r) for r in RENDITIONS}
+    if storage is None:
+        outputs = keys
+    else:
+        outputs = {
+            r.name: str(Path(work_dir) / Path(rendition_key(source, r)).name) for r in RENDITIONS
+        }
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(get_rendition_pool(), render, source, outputs)
+
+    if storage is not None:
+        await asyncio.gather(*(
+            asyncio.to_thread(storage.upload_file, outputs[name], keys[name]) for name in keys
+        ))
+        if assets is not None:
+            for name in keys:
+                assets.add(keys[name], outputs[name])
+    return keys
@@ -0,0 +1,357 @@
+"""Per-process job scheduler with admission control and fair sharing.
+
+Background jobs are grouped by the resource they mostly consume (LLM calls,
+TTS calls, FFmpeg renders). Each kind has a concurrency limit and a bounded
+wait queue; once both are full, new work is rejected with SchedulerSaturated
+instead of being accepted and left to exhaust the container's memory.
+
+Jobs waiting for a slot are dispatched by priority class first (interactive
+vision/story calls ahead of batch renders) and then by deficit round-robin
+across users, so one user submitting many jobs cannot starve everyone else.
+
+On shutdown the scheduler stops admitting work, lets in-flight jobs finish
+up to a deadline and cancels whatever is left.
+"""
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum, IntEnum
+from functools import lru_cache
+from typing import Any, Callable, Coroutine
+
+from app.config import get_settings
+
+
+class JobKind(str, Enum):
+    """Resource class a job is scheduled under."""
+    LLM = "llm"
+    TTS = "tts"
+    RENDER = "render"
+
+
+class Priority(IntEnum):
+    """Dispatch priority class; lower values are dispatched first."""
+    INTERACTIVE = 0
+    BATCH = 1
+
+
+# Fair-share bucket for jobs submitted without a user
+ANONYMOUS_USER = ""
+
+
+class SchedulerSaturated(Exception):
+    """Raised when a job kind has no free slot or queue space.
+
+    Attributes:
+        kind: The saturated job kind.
+        retry_after: Suggested client back-off in seconds.
+    """
+
+    def __init__(self, kind: JobKind, retry_after: int) -> None:
+        super().__init__(f"Too many {kind.value} jobs in progress, retry later")
+        self.kind = kind
+        self.retry_after = retry_after
+
+
+@dataclass(eq=False)
+class _Waiter:
+    """A job waiting for the dispatcher to grant it a slot."""
+    kind: JobKind
+    granted: asyncio.Future = field(
+        default_factory=lambda: asyncio.get_running_loop().create_future()
+    )
+
+
+class _FairQueue:
+    """Per-user FIFO queues served by deficit round-robin.
+
+    Each time a user's turn comes up, their deficit grows by their weight
+    and starting a job costs one unit. With equal weights this is plain
+    round-robin; a user with weight 2 gets two jobs per round.
+    """
+
+    def __init__(self, weights: dict[str, float]) -> None:
+        self.weights = weights
+        self.queues: dict[str, deque[_Waiter]] = {}
+        self.rotation: deque[str] = deque()
+        self.deficit: dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def push(self, user_id: str, waiter: _Waiter) -> None:
+        if user_id not in self.queues:
+            self.queues[user_id] = deque()
+            self.rotation.append(user_id)
+            self.deficit[user_id] = 0.0
+        self.queues[user_id].append(waiter)
+
+    def remove(self, user_id: str, waiter: _Waiter) -> None:
+        queue = self.queues.get(user_id)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                self._drop_user(user_id)
+
+    def _drop_user(self, user_id: str) -> None:
+        del self.queues[user_id]
+        del self.deficit[user_id]
+        self.rotation.remove(user_id)
+
+    def pop(self, eligible: Callable[[JobKind], bool]) -> _Waiter | None:
+        """Take the next waiter whose kind may start now, or None."""
+        if not any(eligible(w.kind) for queue in self.queues.values() for w in queue):
+            return None
+        while True:
+            user_id = self.rotation[0]
+            waiter = next((w for w in self.queues[user_id] if eligible(w.kind)), None)
+            if waiter is None:
+                self.rotation.rotate(-1)
+                continue
+            if self.deficit[user_id] < 1:
+                self.deficit[user_id] += self.weights.get(user_id, 1.0)
+                if self.deficit[user_id] < 1:
+                    self.rotation.rotate(-1)
+                    continue
+            self.deficit[user_id] -= 1
+            self.queues[user_id].remove(waiter)
+            if not self.queues[user_id]:
+                self._drop_user(user_id)
+            elif self.deficit[user_id] < 1:
+                self.rotation.rotate(-1)
+            return waiter
+
+
+class JobScheduler:
+    """Tracks in-flight jobs and dispatches them fairly within per-kind limits."""
+
+    def __init__(
+        self,
+        limits: dict[JobKind, int],
+        queue_limit: int,
+        retry_after: int,
+        max_running: int | None = None,
+        user_weights: dict[str, float] | None = None,
+    ) -> None:
+        """Initialize the scheduler.
+
+        Args:
+            limits: Maximum concurrently running jobs per kind.
+            queue_limit: Maximum jobs per kind waiting for a slot.
+            retry_after: Seconds clients are told to wait when rejected.
+            max_running: Maximum running jobs across all kinds. Defaults to
+                the sum of the per-kind limits.
+            user_weights: Optional fair-share weights by user_id (default 1).
+
+        Raises:
+            ValueError: If a user weight is not positive.
+        """
+        if any(weight <= 0 for weight in (user_weights or {}).values()):
+            # A zero weight never earns a turn, so dispatch would spin forever
+            raise ValueError("Fair-share user weights must be positive")
+        self.limits = limits
+        self.queue_limit = queue_limit
+        self.retry_after = retry_after
+        self.max_running = max_running if max_running is not None else sum(limits.values())
+        self._running = {kind: 0 for kind in limits}
+        self._in_flight = {kind: 0 for kind in limits}
+        self._queues = {priority: _FairQueue(user_weights or {}) for priority in Priority}
+        self._tasks: set[asyncio.Task] = set()
+        self.closed = False
+
+    def has_capacity(self, kind: JobKind) -> bool:
+        """Return True if a job of this kind would be admitted."""
+        if self.closed:
+            return False
+        return self._in_flight[kind] < self.limits[kind] + self.queue_limit
+
+    def _slot_free(self, kind: JobKind) -> bool:
+        """Return True if the limits allow one more running job of this kind."""
+        return (
+            self._running[kind] < self.limits[kind]
+            and sum(self._running.values()) < self.max_running
+        )
+
+    def _has_waiters(self) -> bool:
+        return any(len(queue) for queue in self._queues.values())
+
+    def has_free_slot(self, kind: JobKind) -> bool:
+        """Return True if a job of this kind would start without queueing.
+
+        Counts submitted jobs whose tasks have not started yet, so a caller
+        that submits in a loop without yielding sees each submission.
+        """
+        if self.closed:
+            return False
+        return (
+            self._in_flight[kind] < self.limits[kind]
+            and sum(self._in_flight.values()) < self.max_running
+        )
+
+    def ensure_capacity(self, kind: JobKind) -> None:
+        """Raise SchedulerSaturated if a job of this kind would be rejected.
+
+        Call this before doing any side effects (like writing the initial
+        checkpoint) for a job that will be submitted afterwards.
+        """
+        if not self.has_capacity(kind):
+            raise SchedulerSaturated(kind, self.retry_after)
+
+    def _dispatch(self) -> None:
+        """Start as many waiting jobs as the limits allow, by priority class."""
+        for priority in Priority:
+            while (waiter := self._queues[priority].pop(self._slot_free)) is not None:
+                if waiter.granted.done():
+                    continue  # Cancelled while queued
+                self._running[waiter.kind] += 1
+                waiter.granted.set_result(None)
+
+    async def _acquire(self, kind: JobKind, user_id: str, priority: Priority) -> None:
+        """Wait until the dispatcher grants this job a slot."""
+        if not self._has_waiters() and self._slot_free(kind):
+            self._running[kind] += 1
+            return
+        waiter = _Waiter(kind)
+        self._queues[priority].push(user_id, waiter)
+        self._dispatch()
+        try:
+            await waiter.granted
+        except asyncio.CancelledError:
+            if waiter.granted.done() and not waiter.granted.cancelled():
+                # Granted a slot just as we were cancelled; hand it back
+                self._release(kind)
+            else:
+                self._queues[priority].remove(user_id, waiter)
+            raise
+
+    def _release(self, kind: JobKind) -> None:
+        """Free a slot and start the next waiting job."""
+        self._running[kind] -= 1
+        self._dispatch()
+
+    async def _execute(
+        self,
+        kind: JobKind,
+        coro: Coroutine[Any, Any, Any],
+        user_id: str | None,
+        priority: Priority,
+        on_abandon: Callable[[], None] | None = None,
+    ) -> Any:
+        """Wait for a slot of the given kind, then run the coroutine.
+
+        If the job is cancelled while still queued, the coroutine is closed
+        and ``on_abandon`` is called so the job can record that it never ran.
+        """
+        started = False
+        try:
+            await self._acquire(kind, user_id or ANONYMOUS_USER, priority)
+            started = True
+            try:
+                return await coro
+            finally:
+                self._release(kind)
+        finally:
+            self._in_flight[kind] -= 1
+            if not started:
+                coro.close()
+                if on_abandon is not None:
+                    on_abandon()
+
+    def _admit(self, kind: JobKind, coro: Coroutine[Any, Any, Any]) -> None:
+        """Count a job as in flight, or reject it."""
+        if not self.has_capacity(kind):
+            coro.close()
+            raise SchedulerSaturated(kind, self.retry_after)
+        self._in_flight[kind] += 1
+
+    def submit(
+        self,
+        kind: JobKind,
+        coro: Coroutine[Any, Any, Any],
+        user_id: str | None = None,
+        priority: Priority = Priority.BATCH,
+        on_abandon: Callable[[], None] | None = None,
+    ) -> asyncio.Task:
+        """Schedule a background job.
+
+        The returned task is referenced by the scheduler until it finishes,
+        so it cannot be garbage collected mid-flight.
+
+        Args:
+            kind: Resource class to schedule the job under.
+            coro: The job coroutine.
+            user_id: Owner of the job, used for fair sharing.
+            priority: Dispatch priority class.
+            on_abandon: Called if the job is cancelled before it starts.
+
+        Raises:
+            SchedulerSaturated: If the kind has no free slot or queue space.
+        """
+        self._admit(kind, coro)
+        task = asyncio.create_task(self._execute(kind, coro, user_id, priority, on_abandon))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def run(
+        self,
+        kind: JobKind,
+        coro: Coroutine[Any, Any, Any],
+        user_id: str | None = None,
+        priority: Priority = Priority.BATCH,
+    ) -> Any:
+        """Run a job inline (for synchronous endpoints) under the same limits.
+
+        Raises:
+            SchedulerSaturated: If the kind has no free slot or queue space.
+        """
+        self._admit(kind, coro)
+        return await self._execute(kind, coro, user_id, priority)
+
+    async def shutdown(self, timeout: float) -> int:
+        """Stop admitting jobs and drain the ones in flight.
+
+        Args:
+            timeout: Seconds to wait for in-flight jobs before cancelling them.
+
+        Returns:
+            Number of jobs that had to be cancelled.
+        """
+        self.closed = True
+        if not self._tasks:
+            return 0
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        return len(pending)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Return running and queued job counts per kind."""
+        return {
+            kind.value: {
+                "running": self._running[kind],
+                "queued": self._in_flight[kind] - self._running[kind],
+                "limit": self.limits[kind],
+                "queue_limit": self.queue_limit,
+            }
+            for kind in self.limits
+        }
+
+
+@lru_cache
+def get_scheduler() -> JobScheduler:
+    """Get cached JobScheduler instance (singleton)."""
+    settings = get_settings()
+    return JobScheduler(
+        limits={
+            JobKind.LLM: settings.llm_job_concurrency,
+            JobKind.TTS: settings.tts_job_concurrency,
+            JobKind.RENDER: settings.render_job_concurrency,
+        },
+        queue_limit=settings.job_queue_limit,
+        retry_after=settings.job_retry_after_sec,
+        max_running=settings.max_running_jobs,
+        user_weights=settings.job_user_weights,
+    )
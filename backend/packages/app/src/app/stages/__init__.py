@@ -4,7 +4,7 @@ from .vision import analyze_drawing
 from .story import generate_story
 from .images import generate_images
 from .voice import generate_audio
-from .video import assemble_video
+from .video import assemble_video, SceneStreamAssembler
 
 __all__ = [
     "analyze_drawing",
@@ -12,4 +12,5 @@ __all__ = [
     "generate_images",
     "generate_audio",
     "assemble_video",
+    "SceneStreamAssembler",
 ]
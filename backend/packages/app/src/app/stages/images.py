@@ -1,17 +1,26 @@
 """Stage 3: Generate images for each scene using DALL-E 3."""
 
-from openai import AsyncOpenAI
-import aiofiles
-import httpx
+import asyncio
+import base64
+import tempfile
+from pathlib import Path
+from typing import Awaitable, Callable
 
 from app.models import (
     DrawingAnalysis,
+    Scene,
     StoryScript,
     Style,
     GeneratedImage,
     ImageResult,
 )
+from app.assets import RunAssets
+from app.cache import AssetCache, get_image_cache
+from app.clients import get_clients
 from app.config import get_settings
+from app.ratelimit import get_image_rate_limiter
+from app.renditions import RENDITIONS, create_renditions, rendition_key
+from app.transfer import iter_bytes, tee, write_stream
 
 
 # Style prompt templates
@@ -20,6 +29,10 @@ STYLE_PROMPTS = {
     Style.WATERCOLOR: "watercolor painting, soft edges, dreamy, pastel tones, artistic, ethereal",
 }
 
+IMAGE_MODEL = "dall-e-3"
+IMAGE_SIZE = "1024x1024"
+IMAGE_QUALITY = "standard"
+
 NEGATIVE_PROMPT = "violence, weapons, blood, scary, dark, horror, realistic, photorealistic, adult content, inappropriate, frightening"
 
 
@@ -29,67 +42,125 @@ async def generate_images(
     style: Style,
     run_id: str,
     user_id: str | None = None,
+    on_image: Callable[[GeneratedImage], Awaitable[None]] | None = None,
+    assets: RunAssets | None = None,
 ) -> ImageResult:
     """
     Generate images for each scene in the story.
 
+    Scenes are generated concurrently (up to image_generation_concurrency)
+    and every DALL-E call waits on the shared images-per-minute limiter.
+    Images already generated from the same prompt are copied from the cache.
+
     Args:
         story: The story script with scenes
         drawing: Original drawing analysis (for character description)
         style: Visual style to use
         run_id: Unique identifier for this run
         user_id: Optional user ID for S3 path organization
+        on_image: Optional callback invoked as soon as each scene image is stored
+        assets: Optional run asset handoff that keeps local copies of the
+            stored images (and renditions) for later stages of the job
 
     Returns:
         ImageResult with paths to generated images
     """
     settings = get_settings()
     storage = settings.get_storage()
-    client = AsyncOpenAI(api_key=settings.openai_api_key)
+    clients = get_clients()
+    limiter = get_image_rate_limiter()
+    cache = get_image_cache()
+    semaphore = asyncio.Semaphore(settings.image_generation_concurrency)
 
-    images = []
     style_prompt = STYLE_PROMPTS[style]
     character_desc = f"The main character is {drawing.subject} with {', '.join(drawing.details)}."
 
-    for scene in story.scenes:
+    async def generate_scene(scene: Scene, work_dir: str) -> GeneratedImage:
         # Build the prompt
         prompt = f"""{style_prompt} of {scene.text}
 {character_desc}
 Child-friendly, safe for young children, no scary elements."""
+        params = {"model": IMAGE_MODEL, "size": IMAGE_SIZE, "quality": IMAGE_QUALITY, "prompt": prompt}
 
-        # Generate image
-        response = await client.images.generate(
-            model="dall-e-3",
-            prompt=prompt,
-            size="1024x1024",
-            quality="standard",
-            n=1,
-        )
-
-        # Download the image
-        image_url = response.data[0].url
         filename = f"{run_id}_scene_{scene.number}.png"
-
-        async with httpx.AsyncClient() as http_client:
-            img_response = await http_client.get(image_url)
-            image_bytes = img_response.content
-
-        # Upload to S3 or save locally
+        local_copy = None  # Local copy of an S3 original, for renditions and later stages
         if storage is not None:
-            s3_key = storage.build_s3_key(user_id, "images", filename)
-            storage.upload_bytes(image_bytes, s3_key)
-            image_location = s3_key  # Return key, not presigned URL
+            destination = storage.build_s3_key(user_id, "images", filename)
+            if assets is not None:
+                local_copy = assets.path_for(destination)
+            elif settings.image_renditions_enabled:
+                local_copy = Path(work_dir) / filename
         else:
-            # Save locally (development mode)
-            settings.images_dir.mkdir(parents=True, exist_ok=True)
-            image_path = settings.images_dir / filename
-            async with aiofiles.open(image_path, "wb") as f:
-                await f.write(image_bytes)
-            image_location = str(image_path)
-
-        images.append(GeneratedImage(
+            destination = str(settings.images_dir / filename)
+
+        # Same model, parameters and prompt as an earlier run: reuse its image
+        digest = AssetCache.fingerprint(**params)
+        cached = await asyncio.to_thread(cache.get, digest, user_id) if cache else None
+
+        renditions = {}
+        if cached is not None:
+            # Each run keeps its own copy so cache eviction cannot break it
+            await asyncio.to_thread(cache.copy_to, cached.location, destination)
+            if settings.image_renditions_enabled and all(
+                r.suffix in cached.companions for r in RENDITIONS
+            ):
+                # The renditions were cached with the image; copy them too
+                renditions = {r.name: rendition_key(destination, r) for r in RENDITIONS}
+                await asyncio.gather(*(
+                    asyncio.to_thread(cache.copy_to, cached.companions[r.suffix], renditions[r.name])
+                    for r in RENDITIONS
+                ))
+                local_copy = None  # Later stages read the display copy instead
+            elif local_copy is not None:
+                await asyncio.to_thread(storage.download_file, cached.location, local_copy)
+        else:
+            async with semaphore:
+                # Generate image
+                await limiter.acquire()
+                response = await clients.openai.images.generate(
+                    n=1, response_format=settings.image_response_format, **params
+                )
+
+                # Write it to S3 or local disk without holding it all in memory
+                data = response.data[0]
+                if data.b64_json is not None:
+                    chunks = iter_bytes(base64.b64decode(data.b64_json))
+                    await write_stream(tee(chunks, local_copy), destination, storage)
+                else:
+                    async with clients.http.stream("GET", data.url) as img_response:
+                        img_response.raise_for_status()
+                        chunks = img_response.aiter_bytes()
+                        await write_stream(tee(chunks, local_copy), destination, storage)
+
+        image_location = destination  # S3 key (not a presigned URL) or local path
+        if assets is not None and local_copy is not None:
+            assets.add(destination, local_copy)
+
+        if settings.image_renditions_enabled and not renditions:
+            source = str(local_copy) if local_copy is not None else destination
+            renditions = await create_renditions(
+                source, destination, storage, str(assets.dir) if assets else work_dir, assets
+            )
+
+        if cache is not None and cached is None:
+            companions = {r.suffix: renditions[r.name] for r in RENDITIONS if r.name in renditions}
+            await asyncio.to_thread(cache.put, digest, destination, user_id, companions=companions)
+
+        image = GeneratedImage(
             scene_number=scene.number,
             key=image_location,
-        ))
+            thumbnail_key=renditions.get("thumbnail"),
+            display_key=renditions.get("display"),
+        )
+        if on_image is not None:
+            await on_image(image)
+        return image
+
+    # Results are collected in scene order regardless of completion order;
+    # the TaskGroup cancels the remaining scenes if one fails
+    with tempfile.TemporaryDirectory() as work_dir:
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(generate_scene(scene, work_dir)) for scene in story.scenes]
+    images = [task.result() for task in tasks]
 
     return ImageResult(images=images)
@@ -2,6 +2,7 @@
 
 from pydantic_ai import Agent
 
+from app.clients import get_clients
 from app.models import (
     DrawingAnalysis,
     StoryScript,
@@ -28,9 +29,8 @@ def get_age_guideline(age: int) -> str:
     return AGE_GUIDELINES[(5, 6)]  # Default
 
 
-# Create the story agent
+# Create the story agent (the model is passed per run; see ClientRegistry.chat_model)
 story_agent = Agent(
-    "openai:gpt-4o",
     output_type=StoryScript,
     system_prompt="""You are a children's story writer. Generate a story based on the drawing
 and theme provided.
@@ -92,5 +92,5 @@ async def generate_story(
 
     prompt = "\n".join(prompt_parts)
 
-    result = await story_agent.run(prompt)
+    result = await story_agent.run(prompt, model=get_clients().chat_model())
     return result.output
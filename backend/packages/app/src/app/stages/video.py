@@ -1,45 +1,407 @@
 """Stage 5: Assemble final video using FFmpeg."""
 
-import subprocess
+import asyncio
+import math
+import os
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 import tempfile
 import shutil
 
-import httpx
-
+from app.assets import RunAssets
+from app.clients import get_clients
 from app.models import (
+    EncodingProfile,
     ImageResult,
     AudioResult,
+    GeneratedImage,
+    GeneratedAudio,
     VideoResult,
 )
 from app.config import get_settings
+from app.transfer import write_stream
+
+
+@dataclass(frozen=True)
+class EncodingOptions:
+    """libx264 parameters for a slideshow of still scene images.
+
+    Attributes:
+        fps: Output frame rate. Frames between image changes are identical,
+            so a low rate saves encode time without visible loss.
+        preset: x264 speed preset.
+        crf: Constant rate factor (lower is higher quality and larger).
+        height: Output height in pixels; the width follows the aspect ratio.
+        keyframe_sec: Seconds between keyframes (seek granularity).
+    """
+
+    fps: int
+    preset: str
+    crf: int
+    height: int
+    keyframe_sec: int
+
+    def video_filter(self) -> str:
+        """Frame rate and scaling filter chain for the image stream."""
+        return f"fps={self.fps},scale=-2:{self.height},format=yuv420p"
+
+    def codec_args(self) -> list[str]:
+        """Video encoder arguments."""
+        return [
+            '-c:v', 'libx264', '-tune', 'stillimage',
+            '-preset', self.preset, '-crf', str(self.crf),
+            '-g', str(self.fps * self.keyframe_sec),
+        ]
+
+
+ENCODING_OPTIONS = {
+    EncodingProfile.FAST: EncodingOptions(fps=5, preset="veryfast", crf=28, height=720, keyframe_sec=10),
+    EncodingProfile.BALANCED: EncodingOptions(fps=10, preset="faster", crf=23, height=1024, keyframe_sec=5),
+    EncodingProfile.QUALITY: EncodingOptions(fps=24, preset="slow", crf=20, height=1024, keyframe_sec=2),
+}
+
+
+# -movflags for the final MP4 by video_container setting
+MOVFLAGS = {
+    # Index (moov) before the media data, so playback can start at once
+    "faststart": "+faststart",
+    # Self-contained fragments, playable while the file is still arriving
+    "fragmented": "+frag_keyframe+empty_moov+default_base_moof",
+}
+
+# HLS bitrate ladder: (height, peak video bitrate). Still images compress
+# well, so these are caps for the profile's CRF rather than targets.
+HLS_LADDER = (
+    (720, "1500k"),
+    (480, "700k"),
+    (360, "350k"),
+)
+HLS_MASTER_PLAYLIST = "master.m3u8"
+
+
+def encoding_options(profile: EncodingProfile | None = None) -> EncodingOptions:
+    """Resolve a job's encoding profile, falling back to the configured default."""
+    return ENCODING_OPTIONS[profile or get_settings().encoding_profile]
+
+
+def available_cpus() -> int:
+    """Return the number of vCPUs this process may use.
+
+    A cgroup v2 CPU quota (as set by ECS and Docker) takes precedence over
+    the CPUs visible to the scheduler, which are usually the whole host's.
+    """
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()
+        if quota != "max":
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+@lru_cache
+def get_render_semaphore() -> asyncio.Semaphore:
+    """Get the process-wide limit on concurrent ffmpeg processes (singleton)."""
+    return asyncio.Semaphore(get_settings().ffmpeg_concurrency or available_cpus())
+
+
+def _segment_threads() -> int:
+    """Encoder threads per segment, so parallel encodes share the CPUs rather than oversubscribe them."""
+    return max(1, available_cpus() // (get_settings().ffmpeg_concurrency or available_cpus()))
+
+
+def _temp_path(suffix: str, temp_dir: str) -> str:
+    """Reserve a unique file name in the work directory."""
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=temp_dir)
+    os.close(fd)
+    return path
 
 
 async def _download_to_temp(url: str, suffix: str, temp_dir: str) -> str:
     """
-    Download a file from URL to a temp file.
+    Stream a file from a URL into the work directory.
 
     Args:
-        url: URL to download from (presigned S3 URL)
+        url: URL to download from (legacy asset keys)
         suffix: File suffix (e.g., '.png', '.mp3')
         temp_dir: Directory to save temp file in
 
     Returns:
         Path to the downloaded temp file
     """
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.get(url)
+    path = _temp_path(suffix, temp_dir)
+    async with get_clients().http.stream("GET", url) as response:
         response.raise_for_status()
+        await write_stream(response.aiter_bytes(), path)
+    return path
+
+
+async def _localize(
+    key: str,
+    suffix: str,
+    temp_dir: str,
+    storage,
+    assets: RunAssets | None = None,
+) -> str:
+    """
+    Resolve an asset key to a local file path, downloading it if needed.
+
+    Copies kept by earlier stages of the same job are used in place. Other
+    S3 objects are fetched with the shared boto3 client's managed transfer
+    (ranged GETs for large objects) in a worker thread, without presigning.
+
+    Args:
+        key: S3 key, URL (legacy) or local path
+        suffix: File suffix (e.g., '.png', '.mp3')
+        temp_dir: Directory to save downloaded files in
+        storage: S3Storage instance, or None in local mode
+        assets: Optional run asset handoff to look the key up in first
+
+    Returns:
+        Path to a local copy of the asset
+    """
+    if assets is not None and (local_copy := assets.get(key)) is not None:
+        return local_copy
+    if key.startswith("http"):
+        # Already a URL (legacy)
+        return await _download_to_temp(key, suffix, temp_dir)
+    if storage is not None and not Path(key).exists():
+        # S3 key - download directly into the work directory
+        path = _temp_path(suffix, temp_dir)
+        await asyncio.to_thread(storage.download_file, key, path)
+        return path
+    # Local path
+    return str(Path(key).resolve())
+
 
-        # Create temp file in the specified directory
-        temp_file = tempfile.NamedTemporaryFile(
-            suffix=suffix,
-            dir=temp_dir,
-            delete=False
+async def _localize_image(
+    image: GeneratedImage,
+    temp_dir: str,
+    storage,
+    assets: RunAssets | None = None,
+) -> str:
+    """Localize a scene image, preferring its compressed display rendition."""
+    key = image.display_key or image.key
+    return await _localize(key, Path(key).suffix or ".png", temp_dir, storage, assets)
+
+
+def _store_outputs(
+    video_path: Path,
+    thumbnail_path: Path,
+    user_id: str | None,
+    storage,
+) -> tuple[str, str]:
+    """
+    Upload the final video and thumbnail to S3, or move them into the videos dir.
+
+    Args:
+        video_path: Path to the encoded video in the work directory
+        thumbnail_path: Path to the thumbnail (may not exist if extraction failed)
+        user_id: Optional user ID for S3 path organization
+        storage: S3Storage instance, or None in local mode
+
+    Returns:
+        Tuple of (video_key, thumbnail_key)
+    """
+    if storage is not None:
+        # Upload video
+        video_key = storage.build_s3_key(user_id, "videos", video_path.name)
+        storage.upload_file(str(video_path), video_key)
+
+        # Upload thumbnail
+        thumbnail_key = storage.build_s3_key(user_id, "videos", thumbnail_path.name)
+        if thumbnail_path.exists():
+            storage.upload_file(str(thumbnail_path), thumbnail_key)
+        else:
+            thumbnail_key = video_key  # Fallback if thumbnail generation failed
+        return video_key, thumbnail_key
+
+    # Save locally (development mode)
+    settings = get_settings()
+    settings.videos_dir.mkdir(parents=True, exist_ok=True)
+    final_output_path = settings.videos_dir / video_path.name
+    shutil.move(str(video_path), str(final_output_path))
+    video_key = str(final_output_path)
+
+    if thumbnail_path.exists():
+        final_thumb_path = settings.videos_dir / thumbnail_path.name
+        shutil.move(str(thumbnail_path), str(final_thumb_path))
+        thumbnail_key = str(final_thumb_path)
+    else:
+        thumbnail_key = video_key
+    return video_key, thumbnail_key
+
+
+def _assembly_command(
+    concat_file: Path,
+    audio_paths: list[str],
+    output_path: Path,
+    thumbnail_path: Path,
+    options: EncodingOptions,
+    music_track: str | None = None,
+    movflags: str | None = None,
+) -> list[str]:
+    """
+    Build the single ffmpeg command that renders the final video.
+
+    Narration clips are joined by the concat filter (they are decoded for the
+    AAC encode anyway) and mixed with the background music in the same graph.
+    The thumbnail is a second output scaled from the first frame of the
+    image input, i.e. the first scene image, so the encoded MP4 is never
+    decoded again.
+
+    Args:
+        concat_file: Concat demuxer list of scene images and durations
+        audio_paths: Local narration files in scene order (or one full track)
+        output_path: Where to write the MP4
+        thumbnail_path: Where to write the JPEG thumbnail
+        options: Video encoding parameters
+        music_track: Optional path to background music
+        movflags: Optional MP4 muxer flags (see MOVFLAGS)
+
+    Returns:
+        The ffmpeg command line
+    """
+    cmd = ['ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', str(concat_file)]
+    for audio_path in audio_paths:
+        cmd += ['-i', audio_path]
+
+    narration = ''.join(f'[{i}:a]' for i in range(1, len(audio_paths) + 1))
+    graph = f'[0:v]{options.video_filter()}[v];'
+    graph += f'{narration}concat=n={len(audio_paths)}:v=0:a=1[narration]'
+    if music_track and Path(music_track).exists():
+        # With background music at 15% volume
+        cmd += ['-i', music_track]
+        graph += (
+            f';[narration][{len(audio_paths) + 1}:a]'
+            'amix=inputs=2:duration=first:weights=1 0.15[a]'
         )
-        temp_file.write(response.content)
-        temp_file.close()
-        return temp_file.name
+    else:
+        graph += ';[narration]anull[a]'
+
+    return cmd + [
+        '-filter_complex', graph,
+        # Output 1: the video
+        '-map', '[v]', '-map', '[a]',
+        *options.codec_args(),
+        '-c:a', 'aac', '-b:a', '128k',
+        '-shortest',
+        *(['-movflags', movflags] if movflags else []),
+        str(output_path),
+        # Output 2: the thumbnail
+        '-map', '0:v', '-frames:v', '1',
+        '-vf', 'scale=480:-1',
+        str(thumbnail_path),
+    ]
+
+
+def _hls_command(video_path: Path, hls_dir: Path, options: EncodingOptions) -> list[str]:
+    """
+    Build the ffmpeg command that packages a finished video as HLS.
+
+    Each rung of HLS_LADDER becomes a variant stream with its own playlist
+    (``v<n>.m3u8``), listed in a master playlist. Segments are one keyframe
+    interval long, so every segment starts on a keyframe; the AAC audio is
+    copied into each variant.
+
+    Args:
+        video_path: The final MP4
+        hls_dir: Output directory for playlists and segments
+        options: Video encoding parameters (frame rate, preset, keyframes)
+
+    Returns:
+        The ffmpeg command line
+    """
+    rungs = len(HLS_LADDER)
+    graph = f'[0:v]split={rungs}' + ''.join(f'[s{i}]' for i in range(rungs))
+    for i, (height, _) in enumerate(HLS_LADDER):
+        graph += f';[s{i}]scale=-2:{min(height, options.height)}[v{i}]'
+
+    cmd = ['ffmpeg', '-y', '-i', str(video_path), '-filter_complex', graph]
+    for i in range(rungs):
+        cmd += ['-map', f'[v{i}]', '-map', '0:a']
+    cmd += [*options.codec_args(), '-sc_threshold', '0', '-c:a', 'copy']
+    for i, (_, bitrate) in enumerate(HLS_LADDER):
+        peak = int(bitrate.rstrip('k'))
+        cmd += [f'-maxrate:v:{i}', bitrate, f'-bufsize:v:{i}', f'{2 * peak}k']
+    return cmd + [
+        '-f', 'hls',
+        '-hls_time', str(options.keyframe_sec),
+        '-hls_playlist_type', 'vod',
+        '-hls_segment_filename', str(hls_dir / 'v%v_%03d.ts'),
+        '-master_pl_name', HLS_MASTER_PLAYLIST,
+        '-var_stream_map', ' '.join(f'v:{i},a:{i}' for i in range(rungs)),
+        str(hls_dir / 'v%v.m3u8'),
+    ]
+
+
+async def _store_hls(hls_dir: Path, user_id: str | None, storage) -> tuple[str, list[str]]:
+    """
+    Upload an HLS package to S3, or move it into the videos dir.
+
+    Args:
+        hls_dir: Directory holding the master playlist, variants and segments
+        user_id: Optional user ID for S3 path organization
+        storage: S3Storage instance, or None in local mode
+
+    Returns:
+        Tuple of (master_playlist_key, segment_keys in playback order)
+    """
+    files = sorted(hls_dir.iterdir())
+    if storage is not None:
+        keys = {
+            path: storage.build_s3_key(user_id, f"videos/{hls_dir.name}", path.name)
+            for path in files
+        }
+        await asyncio.gather(*(
+            asyncio.to_thread(storage.upload_file, str(path), key) for path, key in keys.items()
+        ))
+    else:
+        videos_dir = get_settings().videos_dir
+        videos_dir.mkdir(parents=True, exist_ok=True)
+        destination = videos_dir / hls_dir.name
+        shutil.rmtree(destination, ignore_errors=True)
+        shutil.move(str(hls_dir), str(destination))
+        keys = {path: str(destination / path.name) for path in files}
+
+    master_key = keys[hls_dir / HLS_MASTER_PLAYLIST]
+    segment_keys = [key for path, key in keys.items() if path.suffix == '.ts']
+    return master_key, segment_keys
+
+
+async def _finish_outputs(
+    video_path: Path,
+    thumbnail_path: Path,
+    run_id: str,
+    user_id: str | None,
+    storage,
+    options: EncodingOptions,
+    duration_sec: float,
+) -> VideoResult:
+    """Package the final video as HLS if enabled, store every output and describe them."""
+    hls_keys = None
+    if get_settings().hls_enabled:
+        hls_dir = video_path.parent / f"{run_id}_hls"
+        hls_dir.mkdir()
+        await _run_ffmpeg(_hls_command(video_path, hls_dir, options))
+        hls_keys = await _store_hls(hls_dir, user_id, storage)
+
+    # Off the event loop: the final video is tens of MB
+    video_key, thumbnail_key = await asyncio.to_thread(
+        _store_outputs, video_path, thumbnail_path, user_id, storage
+    )
+
+    return VideoResult(
+        video_key=video_key,
+        duration_sec=duration_sec,
+        thumbnail_key=thumbnail_key,
+        hls_playlist_key=hls_keys[0] if hls_keys else None,
+        hls_segment_keys=hls_keys[1] if hls_keys else [],
+    )
 
 
 async def assemble_video(
@@ -48,60 +410,60 @@ async def assemble_video(
     run_id: str,
     music_track: str | None = None,
     user_id: str | None = None,
+    encoding_profile: EncodingProfile | None = None,
+    assets: RunAssets | None = None,
 ) -> VideoResult:
     """
     Assemble images and audio into final video.
 
+    In the "segments" render mode each scene is encoded on its own, in
+    parallel under the render semaphore, and the segments are joined with a
+    stream copy; otherwise the story is encoded in a single ffmpeg pass.
+
     Args:
         images: Generated images from Stage 3
         audio: Generated audio from Stage 4
         run_id: Unique identifier for this run
         music_track: Optional path to background music
         user_id: Optional user ID for S3 path organization
+        encoding_profile: Encoding preset (defaults to the configured one)
+        assets: Optional run asset handoff holding local copies of the inputs
 
     Returns:
         VideoResult with path to final video
     """
     settings = get_settings()
+    if settings.video_render_mode == "segments":
+        async with SceneStreamAssembler(
+            run_id, music_track, user_id, encoding_profile, assets
+        ) as assembler:
+            return await assembler.finish(images, audio)
+
     storage = settings.get_storage()
 
     # Create a temp directory for all intermediate files
     temp_dir = tempfile.mkdtemp()
 
     try:
-        # Download images from S3 keys or URLs, or use local paths
-        local_image_paths = []
-        for img in images.images:
-            if img.key.startswith("http"):
-                # Already a URL (legacy)
-                local_path = await _download_to_temp(img.key, ".png", temp_dir)
-            elif storage is not None and not Path(img.key).exists():
-                # S3 key - generate presigned URL and download
-                url = storage.generate_presigned_url(img.key)
-                local_path = await _download_to_temp(url, ".png", temp_dir)
-            else:
-                # Local path
-                local_path = str(Path(img.key).resolve())
-            local_image_paths.append(local_path)
-
-        # Download audio files from S3 keys or URLs, or use local paths
-        local_audio_paths = []
-        for aud in audio.audio_files:
-            if aud.key.startswith("http"):
-                # Already a URL (legacy)
-                local_path = await _download_to_temp(aud.key, ".mp3", temp_dir)
-            elif storage is not None and not Path(aud.key).exists():
-                # S3 key - generate presigned URL and download
-                url = storage.generate_presigned_url(aud.key)
-                local_path = await _download_to_temp(url, ".mp3", temp_dir)
-            else:
-                # Local path
-                local_path = str(Path(aud.key).resolve())
-            local_audio_paths.append(local_path)
-
-        # Create output path in temp directory
+        # Download images and audio from S3 keys or URLs, or use local paths
+        if audio.track_key:
+            # Whole-story narration is already a single track
+            audio_keys = [audio.track_key]
+        else:
+            audio_keys = [aud.key for aud in audio.audio_files]
+        # All assets are fetched concurrently; gather keeps the input order
+        local_paths = await asyncio.gather(
+            *(_localize_image(img, temp_dir, storage, assets) for img in images.images),
+            *(_localize(key, ".mp3", temp_dir, storage, assets) for key in audio_keys),
+        )
+        local_image_paths = local_paths[:len(images.images)]
+        local_audio_paths = local_paths[len(images.images):]
+
+        # Create output paths in temp directory
         output_filename = f"{run_id}_final.mp4"
         temp_output_path = Path(temp_dir) / output_filename
+        thumbnail_filename = f"{run_id}_thumb.jpg"
+        temp_thumbnail_path = Path(temp_dir) / thumbnail_filename
 
         # Create concat file for images with durations
         # Match each image to its audio duration
@@ -114,103 +476,246 @@ async def assemble_video(
             if local_image_paths:
                 f.write(f"file '{local_image_paths[-1]}'\n")
 
-        # Concatenate all audio files
-        audio_concat_file = Path(temp_dir) / "audio.txt"
-        with open(audio_concat_file, 'w') as f:
-            for audio_path in local_audio_paths:
-                f.write(f"file '{audio_path}'\n")
-
-        # Merge audio files
-        merged_audio = Path(temp_dir) / "merged_audio.mp3"
-        subprocess.run([
-            'ffmpeg', '-y', '-f', 'concat', '-safe', '0',
-            '-i', str(audio_concat_file),
-            '-c', 'copy', str(merged_audio)
-        ], check=True, capture_output=True)
-
-        # Build FFmpeg command
-        if music_track and Path(music_track).exists():
-            # With background music at 15% volume
-            cmd = [
-                'ffmpeg', '-y',
-                '-f', 'concat', '-safe', '0', '-i', str(concat_file),
-                '-i', str(merged_audio),
-                '-i', music_track,
-                '-filter_complex', '[1:a][2:a]amix=inputs=2:duration=first:weights=1 0.15[a]',
-                '-map', '0:v', '-map', '[a]',
-                '-c:v', 'libx264', '-pix_fmt', 'yuv420p',
-                '-c:a', 'aac', '-b:a', '128k',
-                '-shortest',
-                str(temp_output_path)
-            ]
-        else:
-            # Without background music
-            cmd = [
-                'ffmpeg', '-y',
-                '-f', 'concat', '-safe', '0', '-i', str(concat_file),
-                '-i', str(merged_audio),
-                '-map', '0:v', '-map', '1:a',
-                '-c:v', 'libx264', '-pix_fmt', 'yuv420p',
-                '-c:a', 'aac', '-b:a', '128k',
-                '-shortest',
-                str(temp_output_path)
-            ]
-
-        # Run FFmpeg
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            raise RuntimeError(f"FFmpeg failed: {result.stderr}")
-
-        # Get video duration
-        probe_cmd = [
-            'ffprobe', '-v', 'error', '-show_entries', 'format=duration',
-            '-of', 'default=noprint_wrappers=1:nokey=1', str(temp_output_path)
-        ]
-        probe_result = subprocess.run(probe_cmd, capture_output=True, text=True)
-        duration = float(probe_result.stdout.strip()) if probe_result.stdout.strip() else audio.total_duration_sec
+        # Merge narration, encode the video and write the thumbnail in one pass
+        options = encoding_options(encoding_profile)
+        await _run_ffmpeg(_assembly_command(
+            concat_file, local_audio_paths, temp_output_path, temp_thumbnail_path,
+            options, music_track, MOVFLAGS[settings.video_container],
+        ))
 
-        # Generate thumbnail from first frame
-        thumbnail_filename = f"{run_id}_thumb.jpg"
-        temp_thumbnail_path = Path(temp_dir) / thumbnail_filename
-        thumb_cmd = [
-            'ffmpeg', '-y', '-i', str(temp_output_path),
-            '-ss', '00:00:01', '-vframes', '1',
-            '-vf', 'scale=480:-1',
-            str(temp_thumbnail_path)
-        ]
-        subprocess.run(thumb_cmd, capture_output=True)
-
-        # Upload to S3 or save locally
-        if storage is not None:
-            # Upload video
-            video_key = storage.build_s3_key(user_id, "videos", output_filename)
-            storage.upload_file(str(temp_output_path), video_key)
-
-            # Upload thumbnail
-            thumbnail_key = storage.build_s3_key(user_id, "videos", thumbnail_filename)
-            if temp_thumbnail_path.exists():
-                storage.upload_file(str(temp_thumbnail_path), thumbnail_key)
-            else:
-                thumbnail_key = video_key  # Fallback if thumbnail generation failed
-        else:
-            # Save locally (development mode)
-            settings.videos_dir.mkdir(parents=True, exist_ok=True)
-            final_output_path = settings.videos_dir / output_filename
-            shutil.move(str(temp_output_path), str(final_output_path))
-            video_key = str(final_output_path)
-
-            if temp_thumbnail_path.exists():
-                final_thumb_path = settings.videos_dir / thumbnail_filename
-                shutil.move(str(temp_thumbnail_path), str(final_thumb_path))
-                thumbnail_key = str(final_thumb_path)
-            else:
-                thumbnail_key = video_key
-
-        return VideoResult(
-            video_key=video_key,
-            duration_sec=duration,
-            thumbnail_key=thumbnail_key,
+        return await _finish_outputs(
+            temp_output_path, temp_thumbnail_path, run_id, user_id, storage, options,
+            duration_sec=audio.total_duration_sec,  # Exact, measured from the MP3 frames
         )
     finally:
         # Cleanup temp directory and all its contents
         shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+async def _run_ffmpeg(cmd: list[str]) -> None:
+    """
+    Run an FFmpeg command without blocking the event loop.
+
+    At most ffmpeg_concurrency commands run at once across the process, each
+    at a lower CPU priority than the API. A cancelled command kills its
+    ffmpeg process.
+
+    Args:
+        cmd: Full command line, starting with 'ffmpeg'
+
+    Raises:
+        RuntimeError: If FFmpeg exits with a non-zero status
+    """
+    nice = get_settings().ffmpeg_nice
+    if nice and shutil.which('nice'):
+        cmd = ['nice', '-n', str(nice), *cmd]
+
+    async with get_render_semaphore():
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            _, stderr = await process.communicate()
+        except asyncio.CancelledError:
+            process.kill()
+            await process.wait()
+            raise
+    if process.returncode != 0:
+        raise RuntimeError(f"FFmpeg failed: {stderr.decode(errors='replace')}")
+
+
+async def _encode_segment(
+    image_path: str,
+    audio_path: str,
+    output_path: Path,
+    options: EncodingOptions,
+) -> None:
+    """
+    Encode a single scene (still image + narration) into an MP4 segment.
+
+    All segments are encoded with identical parameters so they can be
+    joined with the concat demuxer without re-encoding. Each encode gets its
+    share of the CPUs, as up to ffmpeg_concurrency of them run at once.
+    """
+    await _run_ffmpeg([
+        'ffmpeg', '-y',
+        '-loop', '1', '-framerate', str(options.fps), '-i', image_path,
+        '-i', audio_path,
+        '-map', '0:v', '-map', '1:a',
+        '-vf', options.video_filter(),
+        *options.codec_args(),
+        '-threads', str(_segment_threads()),
+        '-c:a', 'aac', '-b:a', '128k',
+        '-shortest',
+        str(output_path)
+    ])
+
+
+async def _concat_segments(
+    segment_paths: list[Path],
+    output_path: Path,
+    music_track: str | None = None,
+) -> None:
+    """
+    Join encoded scene segments into the final video.
+
+    The video stream is always copied. Audio is copied too, unless background
+    music has to be mixed in.
+    """
+    movflags = ['-movflags', MOVFLAGS[get_settings().video_container]]
+    list_file = output_path.parent / "segments.txt"
+    with open(list_file, 'w') as f:
+        for segment_path in segment_paths:
+            f.write(f"file '{segment_path}'\n")
+
+    if music_track and Path(music_track).exists():
+        # With background music at 15% volume
+        cmd = [
+            'ffmpeg', '-y',
+            '-f', 'concat', '-safe', '0', '-i', str(list_file),
+            '-i', music_track,
+            '-filter_complex', '[0:a][1:a]amix=inputs=2:duration=first:weights=1 0.15[a]',
+            '-map', '0:v', '-map', '[a]',
+            '-c:v', 'copy',
+            '-c:a', 'aac', '-b:a', '128k',
+            *movflags,
+            str(output_path)
+        ]
+    else:
+        cmd = [
+            'ffmpeg', '-y',
+            '-f', 'concat', '-safe', '0', '-i', str(list_file),
+            '-c', 'copy',
+            *movflags,
+            str(output_path)
+        ]
+    await _run_ffmpeg(cmd)
+
+
+class SceneStreamAssembler:
+    """Encode scene segments while images and narration are still being generated.
+
+    Feed finished assets in via ``add_image`` / ``add_audio`` (suitable as the
+    ``on_image`` / ``on_audio`` callbacks of the image and voice stages). As
+    soon as a scene has both its image and its audio, its segment is encoded
+    in the background. ``finish`` waits for the remaining segments and joins
+    them with a stream copy. Given every asset up front via ``finish``, it
+    encodes all scenes in parallel (the "segments" render mode).
+
+    Use as an async context manager so pending encodes and the work
+    directory are cleaned up if the pipeline fails.
+    """
+
+    def __init__(
+        self,
+        run_id: str,
+        music_track: str | None = None,
+        user_id: str | None = None,
+        encoding_profile: EncodingProfile | None = None,
+        assets: RunAssets | None = None,
+    ) -> None:
+        self.run_id = run_id
+        self.music_track = music_track
+        self.user_id = user_id
+        self.options = encoding_options(encoding_profile)
+        self.assets = assets
+        self.storage = get_settings().get_storage()
+        self.temp_dir = tempfile.mkdtemp()
+        self._images: dict[int, GeneratedImage] = {}
+        self._audio: dict[int, GeneratedAudio] = {}
+        self._image_paths: dict[int, str] = {}
+        self._segments: dict[int, asyncio.Task[Path]] = {}
+
+    async def __aenter__(self) -> "SceneStreamAssembler":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def add_image(self, image: GeneratedImage) -> None:
+        """Register a finished scene image."""
+        self._images[image.scene_number] = image
+        self._maybe_start(image.scene_number)
+
+    async def add_audio(self, audio: GeneratedAudio) -> None:
+        """Register a finished scene narration clip."""
+        self._audio[audio.scene_number] = audio
+        self._maybe_start(audio.scene_number)
+
+    def _maybe_start(self, scene_number: int) -> None:
+        """Start encoding a scene once both of its assets are available."""
+        if scene_number in self._segments:
+            return
+        if scene_number in self._images and scene_number in self._audio:
+            self._segments[scene_number] = asyncio.create_task(
+                self._encode_scene(self._images[scene_number], self._audio[scene_number])
+            )
+
+    async def _encode_scene(self, image: GeneratedImage, audio: GeneratedAudio) -> Path:
+        """Fetch a scene's assets and encode its segment."""
+        image_path, audio_path = await asyncio.gather(
+            _localize_image(image, self.temp_dir, self.storage, self.assets),
+            _localize(audio.key, ".mp3", self.temp_dir, self.storage, self.assets),
+        )
+        self._image_paths[image.scene_number] = image_path
+        segment_path = Path(self.temp_dir) / f"segment_{image.scene_number:03d}.mp4"
+        await _encode_segment(image_path, audio_path, segment_path, self.options)
+        return segment_path
+
+    async def finish(self, images: ImageResult, audio: AudioResult) -> VideoResult:
+        """
+        Wait for all scene segments and join them into the final video.
+
+        Args:
+            images: Complete result of the image stage
+            audio: Complete result of the voice stage
+
+        Returns:
+            VideoResult with the final video and thumbnail keys
+        """
+        # Pick up any scenes whose callbacks were not delivered
+        for img in images.images:
+            self._images.setdefault(img.scene_number, img)
+            self._maybe_start(img.scene_number)
+        for aud in audio.audio_files:
+            self._audio.setdefault(aud.scene_number, aud)
+            self._maybe_start(aud.scene_number)
+
+        scene_numbers = [img.scene_number for img in images.images]
+        missing = [number for number in scene_numbers if number not in self._segments]
+        if missing:
+            raise RuntimeError(f"No audio for scenes: {missing}")
+        segment_paths = [await self._segments[number] for number in scene_numbers]
+
+        output_filename = f"{self.run_id}_final.mp4"
+        temp_output_path = Path(self.temp_dir) / output_filename
+        thumbnail_filename = f"{self.run_id}_thumb.jpg"
+        temp_thumbnail_path = Path(self.temp_dir) / thumbnail_filename
+
+        await _concat_segments(segment_paths, temp_output_path, self.music_track)
+
+        # Scale the thumbnail from the first scene image, rather than
+        # decoding the finished video again
+        try:
+            await _run_ffmpeg([
+                'ffmpeg', '-y', '-i', self._image_paths[scene_numbers[0]],
+                '-frames:v', '1',
+                '-vf', 'scale=480:-1',
+                str(temp_thumbnail_path)
+            ])
+        except RuntimeError:
+            pass  # Falls back to the video key below
+
+        return await _finish_outputs(
+            temp_output_path, temp_thumbnail_path, self.run_id, self.user_id, self.storage,
+            self.options, duration_sec=audio.total_duration_sec,
+        )
+
+    async def close(self) -> None:
+        """Cancel pending encodes and remove the work directory."""
+        for task in self._segments.values():
+            task.cancel()
+        await asyncio.gather(*self._segments.values(), return_exceptions=True)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
@@ -3,13 +3,13 @@
 import base64
 from pydantic_ai import Agent, BinaryContent
 
+from app.clients import get_clients
 from app.models import DrawingAnalysis
 from app.config import get_settings
 
 
-# Create the vision agent
+# Create the vision agent (the model is passed per run; see ClientRegistry.chat_model)
 vision_agent = Agent(
-    "openai:gpt-4o",
     output_type=DrawingAnalysis,
     system_prompt="""You are analyzing a child's drawing. Your job is to identify:
 1. The main subject (character, animal, object)
@@ -46,7 +46,8 @@ async def analyze_drawing(image_base64: str) -> DrawingAnalysis:
         [
             BinaryContent(data=image_bytes, media_type="image/png"),
             "Please analyze this child's drawing.",
-        ]
+        ],
+        model=get_clients().chat_model(),
     )
 
     return result.output
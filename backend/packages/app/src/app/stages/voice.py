@@ -1,20 +1,32 @@
 """Stage 4: Generate voice narration using ElevenLabs."""
 
-from io import BytesIO
+import asyncio
+import base64
+import logging
+import unicodedata
+from typing import AsyncIterator, Awaitable, Callable
 
-from elevenlabs import AsyncElevenLabs
 from elevenlabs.types import VoiceSettings
 import aiofiles
 
 from app.models import (
+    Scene,
     StoryScript,
     VoiceType,
     GeneratedAudio,
     AudioResult,
 )
+from app.assets import RunAssets
+from app.audio import Mp3Duration, split_mp3
+from app.cache import AssetCache, get_tts_cache
+from app.clients import get_clients
 from app.config import get_settings
+from app.ratelimit import get_tts_semaphore
+from app.transfer import tee, write_stream
 
 
+logger = logging.getLogger(__name__)
+
 # Voice ID mapping for ElevenLabs
 # These are example voice IDs - replace with actual ElevenLabs voice IDs
 VOICE_IDS = {
@@ -23,78 +35,263 @@ VOICE_IDS = {
 }
 
 
+TTS_MODEL = "eleven_turbo_v2_5"
+VOICE_SETTINGS = VoiceSettings(
+    stability=0.5,
+    similarity_boost=0.75,
+)
+
+
+# Joins scene texts in whole-story mode; the paragraph break reads as a pause
+SCENE_SEPARATOR = "\n\n"
+
+
+def normalize_text(text: str) -> str:
+    """Normalize scene text for cache keys (Unicode form and whitespace)."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+async def _measured(chunks: AsyncIterator[bytes], counter: Mp3Duration) -> AsyncIterator[bytes]:
+    """Pass a stream through unchanged while counting its MP3 frames."""
+    async for chunk in chunks:
+        counter.feed(chunk)
+        yield chunk
+
+
+async def _store_bytes(data: bytes, destination: str, storage, assets: RunAssets | None = None) -> None:
+    """Upload bytes to S3 (keeping a copy in the run's assets), or write them to a local path."""
+    if storage is not None:
+        await asyncio.to_thread(storage.upload_bytes, data, destination)
+        if assets is None:
+            return
+        local_copy = assets.path_for(destination)
+        async with aiofiles.open(local_copy, "wb") as f:
+            await f.write(data)
+        assets.add(destination, local_copy)
+    else:
+        async with aiofiles.open(destination, "wb") as f:
+            await f.write(data)
+
+
+def scene_cut_times(scenes: list[Scene], alignment) -> list[float] | None:
+    """Find where each scene after the first starts in whole-story audio.
+
+    Each cut sits halfway through the pause between the last character of
+    one scene and the first character of the next.
+
+    Args:
+        scenes: Scenes in narration order.
+        alignment: Character alignment from convert_with_timestamps.
+
+    Returns:
+        One cut time per scene boundary, or None if a scene's text cannot
+        be located in the alignment.
+    """
+    aligned = "".join(alignment.characters)
+    starts = alignment.character_start_times_seconds
+    ends = alignment.character_end_times_seconds
+    cuts = []
+    position = 0
+    for index, scene in enumerate(scenes):
+        text = scene.text.strip()
+        found = aligned.find(text[:40], position)
+        if found < 0:
+            return None
+        if index > 0:
+            last = found - 1
+            while last > 0 and aligned[last].isspace():
+                last -= 1
+            cuts.append((ends[last] + starts[found]) / 2)
+        position = found + len(text)
+    return cuts
+
+
+async def _generate_whole_story(
+    story: StoryScript,
+    voice_id: str,
+    run_id: str,
+    user_id: str | None,
+    on_audio: Callable[[GeneratedAudio], Awaitable[None]] | None,
+    assets: RunAssets | None,
+) -> AudioResult | None:
+    """Narrate the whole story in one request and split it into scene clips.
+
+    Returns:
+        The AudioResult, including the full track, or None if the scene
+        boundaries could not be found (the caller falls back to per-scene
+        synthesis).
+    """
+    settings = get_settings()
+    storage = settings.get_storage()
+    client = get_clients().elevenlabs
+
+    async with get_tts_semaphore():
+        response = await client.text_to_speech.convert_with_timestamps(
+            voice_id=voice_id,
+            text=SCENE_SEPARATOR.join(scene.text.strip() for scene in story.scenes),
+            model_id=TTS_MODEL,
+            voice_settings=VOICE_SETTINGS,
+            output_format=settings.tts_output_format,
+        )
+
+    cuts = scene_cut_times(story.scenes, response.alignment) if response.alignment else None
+    if cuts is None:
+        logger.warning("Could not align scenes in whole-story narration for %s", run_id)
+        return None
+    track = base64.b64decode(response.audio_base_64)
+    clips = split_mp3(track, cuts)
+
+    def destination(filename: str) -> str:
+        if storage is not None:
+            return storage.build_s3_key(user_id, "audio", filename)
+        settings.audio_dir.mkdir(parents=True, exist_ok=True)
+        return str(settings.audio_dir / filename)
+
+    track_key = destination(f"{run_id}_narration.mp3")
+    audio_files = [
+        GeneratedAudio(
+            scene_number=scene.number,
+            key=destination(f"{run_id}_scene_{scene.number}.mp3"),
+            duration_sec=duration_sec,
+        )
+        for scene, (_, duration_sec) in zip(story.scenes, clips)
+    ]
+    await asyncio.gather(
+        _store_bytes(track, track_key, storage, assets),
+        *(
+            _store_bytes(clip, audio.key, storage, assets)
+            for audio, (clip, _) in zip(audio_files, clips)
+        ),
+    )
+    if on_audio is not None:
+        for audio in audio_files:
+            await on_audio(audio)
+
+    return AudioResult(
+        audio_files=audio_files,
+        total_duration_sec=sum(audio.duration_sec for audio in audio_files),
+        track_key=track_key,
+    )
+
+
 async def generate_audio(
     story: StoryScript,
     voice_type: VoiceType,
     run_id: str,
     user_id: str | None = None,
+    on_audio: Callable[[GeneratedAudio], Awaitable[None]] | None = None,
+    assets: RunAssets | None = None,
 ) -> AudioResult:
     """
     Generate audio narration for each scene.
 
+    Scenes are synthesized concurrently, up to the process-wide
+    elevenlabs_concurrency limit. Text already voiced with the same voice,
+    model, settings and output format is copied from the cache with its
+    measured duration. New clips are streamed into storage as they arrive.
+
+    With tts_mode "whole_story" the story is narrated in a single request
+    instead, then cut into scene clips at the character timestamps; the
+    full track is kept as well so assemble_video can use it directly.
+
     Args:
         story: The story script with scenes
         voice_type: Type of narrator voice
         run_id: Unique identifier for this run
         user_id: Optional user ID for S3 path organization
+        on_audio: Optional callback invoked as soon as each scene clip is stored
+        assets: Optional run asset handoff that keeps local copies of the
+            stored narration for later stages of the job
 
     Returns:
         AudioResult with paths to audio files and durations
     """
     settings = get_settings()
     storage = settings.get_storage()
-    client = AsyncElevenLabs(api_key=settings.elevenlabs_api_key)
-
-    audio_files = []
-    total_duration = 0.0
+    client = get_clients().elevenlabs
     voice_id = VOICE_IDS[voice_type]
 
-    for scene in story.scenes:
-        filename = f"{run_id}_scene_{scene.number}.mp3"
-
-        # Generate the audio (returns async generator, not coroutine)
-        audio_generator = client.text_to_speech.convert(
-            voice_id=voice_id,
-            text=scene.text,
-            model_id="eleven_turbo_v2_5",
-            voice_settings=VoiceSettings(
-                stability=0.5,
-                similarity_boost=0.75,
-            ),
+    if settings.tts_mode == "whole_story":
+        result = await _generate_whole_story(
+            story, voice_id, run_id, user_id, on_audio, assets
         )
+        if result is not None:
+            return result
 
-        # Collect audio bytes in buffer
-        audio_buffer = BytesIO()
-        async for chunk in audio_generator:
-            audio_buffer.write(chunk)
-        audio_bytes = audio_buffer.getvalue()
+    semaphore = get_tts_semaphore()
+    cache = get_tts_cache()
 
-        # Upload to S3 or save locally
+    async def synthesize_scene(scene: Scene) -> GeneratedAudio:
+        filename = f"{run_id}_scene_{scene.number}.mp3"
         if storage is not None:
-            s3_key = storage.build_s3_key(user_id, "audio", filename)
-            storage.upload_bytes(audio_bytes, s3_key)
-            audio_location = s3_key  # Return key, not presigned URL
+            destination = storage.build_s3_key(user_id, "audio", filename)
         else:
-            # Save locally (development mode)
             settings.audio_dir.mkdir(parents=True, exist_ok=True)
-            audio_path = settings.audio_dir / filename
-            async with aiofiles.open(audio_path, "wb") as f:
-                await f.write(audio_bytes)
-            audio_location = str(audio_path)
+            destination = str(settings.audio_dir / filename)
 
-        # Get duration (approximate based on text length, ~150 words/min)
-        # For accurate duration, we'd need to analyze the audio file
-        word_count = len(scene.text.split())
-        duration_sec = (word_count / 150) * 60  # Rough estimate
+        # Same voice, model, settings and text as an earlier run: reuse its clip
+        digest = AssetCache.fingerprint(
+            voice_id=voice_id,
+            model_id=TTS_MODEL,
+            voice_settings=VOICE_SETTINGS.model_dump(exclude_none=True),
+            output_format=settings.tts_output_format,
+            text=normalize_text(scene.text),
+        )
+        cached = await asyncio.to_thread(cache.get, digest, user_id) if cache else None
+        if cached is not None and "duration_sec" in cached.metadata:
+            # Each run keeps its own copy so cache eviction cannot break it
+            await asyncio.to_thread(cache.copy_to, cached.location, destination)
+            duration_sec = float(cached.metadata["duration_sec"])
+        else:
+            async with semaphore:
+                # Generate the audio (returns async generator, not coroutine)
+                audio_generator = client.text_to_speech.convert(
+                    voice_id=voice_id,
+                    text=scene.text,
+                    model_id=TTS_MODEL,
+                    voice_settings=VOICE_SETTINGS,
+                    output_format=settings.tts_output_format,
+                )
+
+                # Stream chunks into S3 or a local file as they arrive,
+                # measuring the duration on the way through
+                counter = Mp3Duration()
+                local_copy = None
+                if assets is not None and storage is not None:
+                    local_copy = assets.path_for(destination)
+                await write_stream(
+                    tee(_measured(audio_generator, counter), local_copy), destination, storage
+                )
+                if local_copy is not None:
+                    assets.add(destination, local_copy)
 
-        audio_files.append(GeneratedAudio(
+            # Exact duration from the MP3 frame headers
+            duration_sec = counter.seconds
+            if duration_sec == 0:
+                # Not an MP3 we can parse: estimate from text length (~150 words/min)
+                duration_sec = (len(scene.text.split()) / 150) * 60
+            elif cache is not None:
+                await asyncio.to_thread(
+                    cache.put, digest, destination, user_id, {"duration_sec": repr(duration_sec)}
+                )
+        audio_location = destination  # S3 key (not a presigned URL) or local path
+
+        generated = GeneratedAudio(
             scene_number=scene.number,
             key=audio_location,
             duration_sec=duration_sec,
-        ))
-        total_duration += duration_sec
+        )
+        if on_audio is not None:
+            await on_audio(generated)
+        return generated
+
+    # Results are collected in scene order regardless of completion order;
+    # the TaskGroup cancels the remaining scenes if one fails
+    async with asyncio.TaskGroup() as tg:
+        tasks = [tg.create_task(synthesize_scene(scene)) for scene in story.scenes]
+    audio_files = [task.result() for task in tasks]
 
     return AudioResult(
         audio_files=audio_files,
-        total_duration_sec=total_duration,
+        total_duration_sec=sum(audio.duration_sec for audio in audio_files),
     )
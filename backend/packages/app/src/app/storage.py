@@ -9,6 +9,7 @@ from pathlib import Path
 from typing import Union
 
 import boto3
+from botocore.exceptions import ClientError
 
 # Default user ID used when no user_id is provided.
 # Will be replaced with Cognito sub when auth is implemented.
@@ -112,6 +113,72 @@ class S3Storage:
         self.client.upload_file(path_str, self.bucket_name, s3_key)
         return f"s3://{self.bucket_name}/{s3_key}"
 
+    def create_multipart_upload(self, s3_key: str) -> str:
+        """Start a multipart upload.
+
+        Args:
+            s3_key: The full S3 key (including user prefix).
+
+        Returns:
+            The upload ID to pass to the other multipart methods.
+        """
+        response = self.client.create_multipart_upload(Bucket=self.bucket_name, Key=s3_key)
+        return response["UploadId"]
+
+    def upload_part(self, s3_key: str, upload_id: str, part_number: int, data: bytes) -> dict:
+        """Upload one part of a multipart upload.
+
+        Args:
+            s3_key: The full S3 key (including user prefix).
+            upload_id: ID returned by create_multipart_upload.
+            part_number: 1-based part number. All parts but the last must be
+                at least 5 MiB.
+            data: The part's bytes.
+
+        Returns:
+            The part descriptor to pass to complete_multipart_upload.
+        """
+        response = self.client.upload_part(
+            Bucket=self.bucket_name,
+            Key=s3_key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=data,
+        )
+        return {"ETag": response["ETag"], "PartNumber": part_number}
+
+    def complete_multipart_upload(self, s3_key: str, upload_id: str, parts: list[dict]) -> str:
+        """Finish a multipart upload.
+
+        Args:
+            s3_key: The full S3 key (including user prefix).
+            upload_id: ID returned by create_multipart_upload.
+            parts: Part descriptors returned by upload_part, in order.
+
+        Returns:
+            The S3 URI of the uploaded object.
+        """
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=s3_key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+        return f"s3://{self.bucket_name}/{s3_key}"
+
+    def abort_multipart_upload(self, s3_key: str, upload_id: str) -> None:
+        """Abort a multipart upload and discard its parts.
+
+        Args:
+            s3_key: The full S3 key (including user prefix).
+            upload_id: ID returned by create_multipart_upload.
+        """
+        self.client.abort_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=s3_key,
+            UploadId=upload_id,
+        )
+
     def download_file(self, s3_key: str, local_path: Union[str, Path]) -> Path:
         """Download a file from S3.
 
@@ -130,6 +197,18 @@ class S3Storage:
         self.client.download_file(self.bucket_name, s3_key, str(local))
         return local
 
+    def download_bytes(self, s3_key: str) -> bytes:
+        """Download an object from S3 into memory.
+
+        Args:
+            s3_key: The full S3 key (including user prefix).
+
+        Returns:
+            The object's contents.
+        """
+        response = self.client.get_object(Bucket=self.bucket_name, Key=s3_key)
+        return response["Body"].read()
+
     def generate_presigned_url(self, s3_key: str, expires_in: int = 3600) -> str:
         """Generate a presigned URL for accessing an S3 object.
 
@@ -146,6 +225,59 @@ class S3Storage:
             ExpiresIn=expires_in
         )
 
+    def object_exists(self, s3_key: str) -> bool:
+        """Check whether an object exists in S3.
+
+        Args:
+            s3_key: The full S3 key (including user prefix).
+
+        Returns:
+            True if the object exists, False otherwise.
+        """
+        return self.head(s3_key) is not None
+
+    def head(self, s3_key: str) -> dict | None:
+        """Get an object's metadata without downloading it.
+
+        Args:
+            s3_key: The full S3 key (including user prefix).
+
+        Returns:
+            The HeadObject response (including LastModified and the user
+            Metadata dict), or None if the object does not exist.
+        """
+        try:
+            return self.client.head_object(Bucket=self.bucket_name, Key=s3_key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def copy_object(
+        self, source_key: str, dest_key: str, metadata: dict[str, str] | None = None
+    ) -> str:
+        """Copy an object within the bucket without downloading it.
+
+        Args:
+            source_key: The full S3 key of the existing object.
+            dest_key: The full S3 key to copy it to.
+            metadata: Optional user metadata to set on the copy (replaces
+                the source's metadata).
+
+        Returns:
+            The S3 URI of the new object.
+        """
+        extra = {}
+        if metadata is not None:
+            extra = {"Metadata": metadata, "MetadataDirective": "REPLACE"}
+        self.client.copy_object(
+            Bucket=self.bucket_name,
+            Key=dest_key,
+            CopySource={"Bucket": self.bucket_name, "Key": source_key},
+            **extra,
+        )
+        return f"s3://{self.bucket_name}/{dest_key}"
+
     def delete_object(self, s3_key: str) -> None:
         """Delete an object from S3.
 
@@ -0,0 +1,116 @@
+"""Streaming writes of generated assets into storage.
+
+Provider responses are written to their destination chunk by chunk instead
+of being collected in memory first. In S3 mode chunks are buffered up to one
+multipart part, so peak memory per transfer is bounded by ``part_size``
+regardless of the asset's size.
+"""
+
+import asyncio
+import logging
+from pathlib import Path
+from typing import AsyncIterator
+
+import aiofiles
+
+logger = logging.getLogger(__name__)
+
+# S3 requires every part but the last to be at least 5 MiB
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+
+async def write_stream(
+    chunks: AsyncIterator[bytes],
+    destination: str,
+    storage=None,
+    part_size: int = DEFAULT_PART_SIZE,
+) -> int:
+    """Write a byte stream to an S3 key or a local path.
+
+    Streams smaller than one part are uploaded with a single PutObject;
+    larger ones become a multipart upload, which is aborted if the stream
+    fails part way.
+
+    Args:
+        chunks: Async iterator of byte chunks (e.g. httpx ``aiter_bytes()``).
+        destination: S3 key, or local path in local mode.
+        storage: S3Storage instance, or None in local mode.
+        part_size: Multipart part size in bytes (at least 5 MiB).
+
+    Returns:
+        Number of bytes written.
+    """
+    if storage is None:
+        return await _write_file(chunks, Path(destination))
+
+    part_size = max(part_size, MIN_PART_SIZE)
+    buffer = bytearray()
+    upload_id: str | None = None
+    parts: list[dict] = []
+    total = 0
+    try:
+        async for chunk in chunks:
+            buffer.extend(chunk)
+            total += len(chunk)
+            while len(buffer) >= part_size:
+                if upload_id is None:
+                    upload_id = await asyncio.to_thread(storage.create_multipart_upload, destination)
+                part = bytes(buffer[:part_size])
+                del buffer[:part_size]
+                parts.append(await asyncio.to_thread(
+                    storage.upload_part, destination, upload_id, len(parts) + 1, part
+                ))
+
+        if upload_id is None:
+            await asyncio.to_thread(storage.upload_bytes, bytes(buffer), destination)
+            return total
+        if buffer:
+            parts.append(await asyncio.to_thread(
+                storage.upload_part, destination, upload_id, len(parts) + 1, bytes(buffer)
+            ))
+        await asyncio.to_thread(storage.complete_multipart_upload, destination, upload_id, parts)
+        return total
+    except BaseException:
+        if upload_id is not None:
+            try:
+                await asyncio.to_thread(storage.abort_multipart_upload, destination, upload_id)
+            except Exception:
+                # Keep the original error; the bucket's lifecycle rule
+                # removes incomplete uploads that could not be aborted
+                logger.warning("Could not abort multipart upload to %s", destination, exc_info=True)
+        raise
+
+
+async def _write_file(chunks: AsyncIterator[bytes], path: Path) -> int:
+    """Write chunks to a local file via a temporary name, then rename it."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f"{path.name}.partial")
+    total = 0
+    try:
+        async with aiofiles.open(partial, "wb") as f:
+            async for chunk in chunks:
+                await f.write(chunk)
+                total += len(chunk)
+        partial.replace(path)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    return total
+
+
+async def tee(chunks: AsyncIterator[bytes], path: Path | None) -> AsyncIterator[bytes]:
+    """Pass chunks through, also writing them to a local file if a path is given."""
+    if path is None:
+        async for chunk in chunks:
+            yield chunk
+        return
+    async with aiofiles.open(path, "wb") as f:
+        async for chunk in chunks:
+            await f.write(chunk)
+            yield chunk
+
+
+async def iter_bytes(data: bytes) -> AsyncIterator[bytes]:
+    """Wrap bytes already in memory (e.g. an inline API response) as a stream."""
+    yield data
@@ -0,0 +1,162 @@
+"""Standalone worker that runs jobs from the durable job queue.
+
+Run alongside the API (which only enqueues jobs when JOB_QUEUE_BACKEND is
+durable) so API containers and render workers can scale independently:
+
+    python -m app.worker --kinds render
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+import socket
+import uuid
+
+from app.clients import get_clients
+from app.config import get_settings
+from app.database import get_database
+from app.engine import LEASE_LOST
+from app.jobs import JOBS
+from app.queue import JobQueue, QueuedJob, get_job_queue
+from app.renditions import shutdown_rendition_pool
+from app.scheduler import JobKind, get_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+def _checkpoint_failure(job: QueuedJob, error: str) -> None:
+    """Record a job failure in its checkpoint, the source of job status.
+
+    Stage outputs already in the checkpoint are kept, so a retry of the run
+    can resume from them.
+    """
+    user_id = job.payload.get("user_id")
+    run_id = job.payload.get("run_id")
+    if not user_id or not run_id:
+        return
+    failure = {
+        "status": "error",
+        "current_stage": job.job_type,
+        "error": error,
+    }
+    database = get_database()
+    if not database.update_checkpoint(user_id, run_id, failure):
+        database.save_checkpoint(user_id, run_id, failure)
+
+
+async def _heartbeat(queue: JobQueue, job: QueuedJob, interval: float, work: asyncio.Task) -> None:
+    """Extend the job's lease until cancelled; cancel the job if the lease is lost."""
+    while True:
+        await asyncio.sleep(interval)
+        if not queue.heartbeat(job):
+            # Another worker may already have re-leased the job
+            logger.warning("Lost lease on job %s, cancelling it", job.id)
+            work.cancel(msg=LEASE_LOST)
+            return
+
+
+async def _process(queue: JobQueue, job: QueuedJob) -> None:
+    """Run a leased job, keeping its lease alive while it runs."""
+    settings = get_settings()
+    work = asyncio.create_task(JOBS[job.job_type].handler(job.payload))
+    heartbeat = asyncio.create_task(_heartbeat(queue, job, settings.job_heartbeat_sec, work))
+    try:
+        await work
+    except asyncio.CancelledError:
+        if not asyncio.current_task().cancelling():
+            return  # Lease lost; the queue no longer lets us update the job
+        # Shutdown deadline hit; the job checkpointed itself as resumable,
+        # so hand it back for the next worker to pick up
+        queue.release(job)
+        raise
+    except Exception as e:
+        logger.exception("Job %s (%s) failed", job.id, job.job_type)
+        queue.fail(job, str(e))
+        _checkpoint_failure(job, str(e))
+    else:
+        queue.complete(job)
+    finally:
+        heartbeat.cancel()
+
+
+async def run_worker(
+    worker_id: str,
+    kinds: list[JobKind],
+    stop: asyncio.Event,
+) -> None:
+    """Lease and run jobs until ``stop`` is set, then drain running jobs.
+
+    Jobs still running after SHUTDOWN_DRAIN_SEC are cancelled and
+    checkpointed as resumable.
+
+    Args:
+        worker_id: Identifier recorded as the lease owner.
+        kinds: Job kinds this worker accepts.
+        stop: Event that ends the polling loop.
+    """
+    settings = get_settings()
+    queue = get_job_queue()
+    if queue is None:
+        raise RuntimeError("JOB_QUEUE_BACKEND must name a durable queue to run a worker")
+    scheduler = get_scheduler()
+    if settings.prewarm_connections:
+        await get_clients().prewarm()
+
+    while not stop.is_set():
+        for job in queue.recover_stale():
+            logger.warning("Job %s abandoned after %d attempts", job.id, job.attempts)
+            _checkpoint_failure(job, "Job was abandoned by its worker")
+
+        # Lease across every kind with a free slot, so the queue's priority
+        # order applies between kinds, until the slots or the queue run out
+        leased = False
+        while free := [kind.value for kind in kinds if scheduler.has_free_slot(kind)]:
+            job = queue.lease(worker_id, free)
+            if job is None:
+                break
+            logger.info("Leased job %s (%s, attempt %d)", job.id, job.job_type, job.attempts)
+            scheduler.submit(JobKind(job.kind), _process(queue, job))
+            leased = True
+
+        if not leased:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.worker_poll_interval_sec)
+            except TimeoutError:
+                pass
+
+    await scheduler.shutdown(settings.shutdown_drain_sec)
+    await get_clients().aclose()
+    shutdown_rendition_pool()
+
+
+def main() -> None:
+    """Command-line entrypoint."""
+    parser = argparse.ArgumentParser(description="Run NoComelon background jobs")
+    parser.add_argument(
+        "--kinds",
+        default=",".join(kind.value for kind in JobKind),
+        help="Comma-separated job kinds to run (default: all)",
+    )
+    parser.add_argument(
+        "--worker-id",
+        default=f"{socket.gethostname()}-{uuid.uuid4().hex[:6]}",
+        help="Lease owner name (default: hostname plus random suffix)",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    kinds = [JobKind(kind.strip()) for kind in args.kinds.split(",") if kind.strip()]
+
+    async def run() -> None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await run_worker(args.worker_id, kinds, stop)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Shared fixtures for stage tests."""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.models import DrawingAnalysis, StoryScript, Scene
+from app.stages import images, voice
+
+
+@pytest.fixture
+def sample_drawing():
+    return DrawingAnalysis(
+        subject="a purple dinosaur",
+        setting="a green meadow",
+        details=["big eyes", "spiky back"],
+        mood="happy",
+        colors=["purple", "green"],
+    )
+
+
+@pytest.fixture
+def sample_story():
+    return StoryScript(
+        scenes=[
+            Scene(number=1, text="Once upon a time there was a little dinosaur."),
+            Scene(number=2, text="The dinosaur loved to play in the meadow."),
+        ],
+        total_scenes=2,
+    )
+
+
+@pytest.fixture
+def image_stage(tmp_path, monkeypatch):
+    """Run the images stage against mock clients with local storage and no cache.
+
+    Tests set ``clients.openai.images.generate`` and adjust ``settings`` or
+    assign ``cache`` on the returned namespace.
+    """
+    clients = MagicMock()
+    settings = MagicMock(
+        images_dir=tmp_path / "images",
+        image_generation_concurrency=4,
+        image_response_format="url",
+        image_renditions_enabled=False,
+    )
+    settings.get_storage.return_value = None
+    limiter = MagicMock()
+    limiter.acquire = MagicMock(side_effect=lambda: asyncio.sleep(0))
+    stage = SimpleNamespace(clients=clients, settings=settings, limiter=limiter, cache=None)
+    monkeypatch.setattr(images, "get_settings", lambda: settings)
+    monkeypatch.setattr(images, "get_clients", lambda: clients)
+    monkeypatch.setattr(images, "get_image_rate_limiter", lambda: limiter)
+    monkeypatch.setattr(images, "get_image_cache", lambda: stage.cache)
+    return stage
+
+
+@pytest.fixture
+def voice_stage(tmp_path, monkeypatch):
+    """Run the voice stage against a mock ElevenLabs client with local storage and no cache.
+
+    Tests set ``client.text_to_speech.convert`` (or ``convert_with_timestamps``)
+    and adjust ``settings`` or assign ``cache`` on the returned namespace.
+    """
+    client = MagicMock()
+    settings = MagicMock(
+        audio_dir=tmp_path / "audio", tts_mode="per_scene", tts_output_format="mp3_22050_32"
+    )
+    settings.get_storage.return_value = None
+    stage = SimpleNamespace(client=client, settings=settings, cache=None)
+    monkeypatch.setattr(voice, "get_settings", lambda: settings)
+    monkeypatch.setattr(voice, "get_clients", lambda: MagicMock(elevenlabs=client))
+    monkeypatch.setattr(voice, "get_tts_semaphore", lambda: asyncio.Semaphore(2))
+    monkeypatch.setattr(voice, "get_tts_cache", lambda: stage.cache)
+    return stage
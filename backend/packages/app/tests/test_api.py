@@ -29,3 +29,53 @@ def test_status_endpoint(client):
     assert "elevenlabs" in data
     assert "ffmpeg" in data
     assert "data_dir" in data
+
+
+def test_job_queue_endpoint(client):
+    """Queue endpoint should report load per job kind."""
+    response = client.get("/api/v1/jobs/queue")
+    assert response.status_code == 200
+    data = response.json()
+    for kind in ("llm", "tts", "render"):
+        assert "running" in data[kind]
+        assert "queued" in data[kind]
+
+
+def test_saturated_scheduler_returns_503(client, monkeypatch):
+    """Rejected jobs should map to 503 with a Retry-After header."""
+    from app import jobs
+    from app.scheduler import JobKind, JobScheduler
+
+    full = JobScheduler(limits={kind: 0 for kind in JobKind}, queue_limit=0, retry_after=7)
+    monkeypatch.setattr(jobs, "get_scheduler", lambda: full)
+
+    response = client.post("/api/v1/vision/analyze", json={"image_base64": "", "user_id": "u1"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
+
+
+def test_hls_playlists_are_served_with_signed_segments(client, monkeypatch):
+    """Variant playlists point back at the endpoint and segments are presigned."""
+    from unittest.mock import MagicMock
+    from app import main
+
+    playlists = {
+        "u1/videos/run1_hls/master.m3u8": b"#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=1\nv0.m3u8\n",
+        "u1/videos/run1_hls/v0.m3u8": b"#EXTM3U\n#EXTINF:2.0,\nv0_000.ts\n#EXT-X-ENDLIST\n",
+    }
+    storage = MagicMock()
+    storage.download_bytes.side_effect = playlists.__getitem__
+    storage.generate_presigned_url.side_effect = lambda key, expires_in: f"https://signed/{key}"
+    settings = MagicMock()
+    settings.get_storage.return_value = storage
+    monkeypatch.setattr(main, "get_settings", lambda: settings)
+
+    master = client.get("/api/v1/videos/hls/u1/videos/run1_hls/master.m3u8", params={"user_id": "u1"})
+    variant = client.get("/api/v1/videos/hls/u1/videos/run1_hls/v0.m3u8", params={"user_id": "u1"})
+    foreign = client.get("/api/v1/videos/hls/u2/videos/run1_hls/v0.m3u8", params={"user_id": "u1"})
+
+    assert master.headers["content-type"] == "application/vnd.apple.mpegurl"
+    assert "v0.m3u8?user_id=u1" in master.text.splitlines()
+    assert "https://signed/u1/videos/run1_hls/v0_000.ts" in variant.text.splitlines()
+    assert foreign.status_code == 403
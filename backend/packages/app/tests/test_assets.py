@@ -0,0 +1,45 @@
+"""Tests for the run-scoped asset handoff."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.assets import RunAssets
+from app.models import StoryScript, Scene, VoiceType
+from app.stages import video, voice
+
+
+def test_registered_copies_are_removed_with_the_run():
+    """Copies resolve by key until the run's directory is removed."""
+    with RunAssets() as assets:
+        path = assets.path_for("user/audio/run1_scene_1.mp3")
+        path.write_bytes(b"clip")
+        assets.add("user/audio/run1_scene_1.mp3", path)
+
+        assert assets.get("user/audio/run1_scene_1.mp3") == str(path)
+        assert assets.get("user/audio/run1_scene_2.mp3") is None
+
+    assert not path.exists()
+    assert assets.get("user/audio/run1_scene_1.mp3") is None
+
+
+@pytest.mark.asyncio
+async def test_narration_is_handed_to_the_video_stage_without_download(voice_stage, tmp_path):
+    """Clips uploaded by the voice stage are read locally by the video stage."""
+    async def fake_convert(voice_id, text, **kwargs):
+        yield text.encode()
+
+    voice_stage.client.text_to_speech.convert = fake_convert
+    storage = MagicMock()
+    storage.build_s3_key.side_effect = lambda user_id, folder, name: f"{user_id}/{folder}/{name}"
+    voice_stage.settings.get_storage.return_value = storage
+    story = StoryScript(scenes=[Scene(number=1, text="Hello there.")], total_scenes=1)
+
+    with RunAssets() as assets:
+        result = await voice.generate_audio(story, VoiceType.GENTLE, "run1", "u1", assets=assets)
+        key = result.audio_files[0].key
+        path = await video._localize(key, ".mp3", str(tmp_path), storage, assets)
+
+        assert key == "u1/audio/run1_scene_1.mp3"
+        assert open(path, "rb").read() == b"Hello there."
+        storage.download_file.assert_not_called()
@@ -0,0 +1,87 @@
+"""Tests for in-process MP3 duration measurement."""
+
+from pathlib import Path
+
+import pytest
+
+from app.audio import Mp3Duration, mp3_duration, split_mp3
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, no padding: 417-byte frames of 1152 samples
+FRAME_HEADER = bytes([0xFF, 0xFB, 0x90, 0x00])
+FRAME_LENGTH = 417
+FRAME_SECONDS = 1152 / 44100
+
+
+# 22.05 kHz mono clip encoded by FFmpeg's libmp3lame: 91 frames of 576
+# samples, with a LAME tag recording 576 samples of delay and 1105 of padding
+LAME_TAGGED_CLIP = Path(__file__).parent / "data" / "lame_tagged.mp3"
+
+
+def frames(count: int) -> bytes:
+    return (FRAME_HEADER + bytes(FRAME_LENGTH - 4)) * count
+
+
+def id3v2_tag(payload_size: int) -> bytes:
+    size = bytes((payload_size >> shift) & 0x7F for shift in (21, 14, 7, 0))
+    return b"ID3\x04\x00\x00" + size + bytes(payload_size)
+
+
+def test_duration_counts_frames():
+    """Duration is frames times samples per frame over the sample rate."""
+    assert mp3_duration(frames(100)) == pytest.approx(100 * FRAME_SECONDS)
+
+
+def test_duration_skips_id3_tags():
+    """ID3v2 headers and ID3v1 trailers are not audio."""
+    data = id3v2_tag(300) + frames(10) + b"TAG" + bytes(125)
+
+    assert mp3_duration(data) == pytest.approx(10 * FRAME_SECONDS)
+
+
+def test_duration_skips_xing_header_frame():
+    """The VBR metadata frame at the start is not counted."""
+    xing = FRAME_HEADER + bytes(32) + b"Xing" + bytes(FRAME_LENGTH - 40)
+
+    assert mp3_duration(xing + frames(5)) == pytest.approx(5 * FRAME_SECONDS)
+
+
+def test_duration_excludes_lame_encoder_delay_and_padding():
+    """A LAME-tagged clip measures as its decoded length, not its frame count."""
+    data = LAME_TAGGED_CLIP.read_bytes()
+
+    assert mp3_duration(data) == pytest.approx((91 * 576 - 576 - 1105) / 22050)
+
+
+def test_incremental_feed_matches_whole_buffer():
+    """Feeding arbitrary chunk sizes gives the same result."""
+    data = id3v2_tag(1000) + frames(37)
+    counter = Mp3Duration()
+    for start in range(0, len(data), 97):
+        counter.feed(data[start:start + 97])
+
+    assert counter.frames == 37
+    assert counter.seconds == pytest.approx(mp3_duration(data))
+
+
+def test_non_mp3_data_has_no_duration():
+    """Bytes without frame headers measure as zero."""
+    assert mp3_duration(b"not audio at all" * 10) == 0
+
+
+def test_split_cuts_at_frame_boundaries():
+    """Clips start on the first frame at or after each cut time."""
+    clips = split_mp3(frames(10), [3.5 * FRAME_SECONDS, 7 * FRAME_SECONDS])
+
+    assert [len(clip) for clip, _ in clips] == [4 * FRAME_LENGTH, 3 * FRAME_LENGTH, 3 * FRAME_LENGTH]
+    assert [duration for _, duration in clips] == pytest.approx(
+        [4 * FRAME_SECONDS, 3 * FRAME_SECONDS, 3 * FRAME_SECONDS]
+    )
+    assert all(mp3_duration(clip) == pytest.approx(duration) for clip, duration in clips)
+
+
+def test_split_past_the_end_gives_empty_clips():
+    """Cuts beyond the audio still yield one clip per segment."""
+    clips = split_mp3(frames(2), [100.0])
+
+    assert clips[0] == (frames(2), pytest.approx(2 * FRAME_SECONDS))
+    assert clips[1] == (b"", 0.0)
@@ -0,0 +1,111 @@
+"""Tests for the content-addressed asset cache."""
+
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+from app.cache import AssetCache
+
+
+def make_cache(tmp_path, **kwargs):
+    options = {"ttl_sec": 60, "max_entries": 10, "root": tmp_path}
+    options.update(kwargs)
+    return AssetCache("images", ".png", **options)
+
+
+def test_fingerprint_depends_on_every_parameter():
+    """Changing any generation parameter should change the key."""
+    base = AssetCache.fingerprint(model="dall-e-3", size="1024x1024", prompt="a cat")
+
+    assert base == AssetCache.fingerprint(prompt="a cat", size="1024x1024", model="dall-e-3")
+    assert base != AssetCache.fingerprint(model="dall-e-3", size="1024x1024", prompt="a dog")
+    assert base != AssetCache.fingerprint(model="dall-e-3", size="512x512", prompt="a cat")
+
+
+def stored(tmp_path, name, data=b"png"):
+    path = tmp_path / "runs" / name
+    path.parent.mkdir(exist_ok=True)
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_local_cache_round_trip_and_ttl(tmp_path):
+    """Stored entries are returned until they expire."""
+    cache = make_cache(tmp_path / "cache")
+    location = cache.put("abc", stored(tmp_path, "scene.png"))
+
+    assert cache.get("abc").location == location
+    assert cache.get("missing") is None
+
+    old = time.time() - 120
+    os.utime(location, (old, old))
+    assert cache.get("abc") is None
+
+
+def test_local_cache_keeps_metadata(tmp_path):
+    """Metadata stored with an entry comes back with every hit."""
+    cache = make_cache(tmp_path / "cache")
+    cache.put("abc", stored(tmp_path, "scene.png"), metadata={"duration_sec": "3.1"})
+
+    assert cache.get("abc").metadata == {"duration_sec": "3.1"}
+
+
+def test_local_cache_evicts_least_recently_used(tmp_path):
+    """Over the entry limit, the least recently used entry is dropped."""
+    cache = make_cache(tmp_path / "cache", max_entries=2)
+    first = cache.put("first", stored(tmp_path, "1.png"))
+    second = cache.put("second", stored(tmp_path, "2.png"))
+    now = time.time()
+    os.utime(first, (now - 30, now - 30))
+    os.utime(second, (now - 20, now - 20))
+
+    cache.get("first")  # Now the most recently used
+    cache.put("third", stored(tmp_path, "3.png"))
+
+    assert cache.get("first") is not None
+    assert cache.get("second") is None
+    assert cache.get("third") is not None
+
+
+def test_s3_cache_checks_age_and_copies_server_side():
+    """In S3 mode entries are per user and copied without a download."""
+    storage = MagicMock()
+    storage.head.return_value = {
+        "LastModified": datetime.now(timezone.utc) - timedelta(seconds=5),
+        "Metadata": {"duration_sec": "2.5"},
+    }
+    cache = AssetCache("images", ".png", ttl_sec=60, max_entries=10, storage=storage)
+
+    hit = cache.get("abc", "user1")
+    location = hit.location
+    cache.copy_to(location, "user1/images/run_scene_1.png")
+
+    assert location == "cache/images/user1/abc.png"
+    assert hit.metadata == {"duration_sec": "2.5"}
+    storage.copy_object.assert_called_once_with(location, "user1/images/run_scene_1.png")
+
+    storage.head.return_value["LastModified"] = datetime.now(timezone.utc) - timedelta(hours=1)
+    assert cache.get("abc", "user1") is None
+
+
+def test_local_cache_stores_and_evicts_companions(tmp_path):
+    """Companion files come back with a hit and are removed with their entry."""
+    cache = make_cache(tmp_path / "cache", max_entries=1)
+    location = cache.put(
+        "abc", stored(tmp_path, "scene.png"),
+        companions={"_thumb.webp": stored(tmp_path, "scene_thumb.webp", b"webp")},
+    )
+
+    hit = cache.get("abc")
+    thumb = hit.companions["_thumb.webp"]
+    assert thumb == location.removesuffix(".png") + "_thumb.webp"
+    assert open(thumb, "rb").read() == b"webp"
+    assert hit.metadata == {}
+
+    old = time.time() - 30
+    os.utime(location, (old, old))
+    cache.put("def", stored(tmp_path, "other.png"))
+
+    assert cache.get("abc") is None
+    assert not os.path.exists(thumb)
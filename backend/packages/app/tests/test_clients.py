@@ -0,0 +1,53 @@
+"""Tests for the shared API client registry."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app import clients
+from app.clients import ClientRegistry
+
+
+@pytest.fixture
+def settings():
+    return SimpleNamespace(
+        openai_api_key="test",
+        elevenlabs_api_key="test",
+        http_max_connections=5,
+        http_max_keepalive_connections=2,
+        http_keepalive_expiry_sec=10.0,
+        http2_enabled=True,
+        openai_chat_model="gpt-4o-mini",
+    )
+
+
+@pytest.mark.asyncio
+async def test_registry_reuses_client_until_closed(settings):
+    """Stages should share one pooled client; closing resets the registry."""
+    registry = ClientRegistry(settings)
+
+    http = registry.http
+    assert registry.http is http
+
+    await registry.aclose()
+
+    assert http.is_closed
+    assert registry.http is not http
+    await registry.aclose()
+
+
+def test_http2_requires_h2_package(settings, monkeypatch):
+    """HTTP/2 is only enabled when the h2 package can be imported."""
+    monkeypatch.setattr(clients, "_http2_available", lambda: False)
+    assert ClientRegistry(settings).http2 is False
+
+    monkeypatch.setattr(clients, "_http2_available", lambda: True)
+    assert ClientRegistry(settings).http2 is True
+
+    settings.http2_enabled = False
+    assert ClientRegistry(settings).http2 is False
+
+
+def test_chat_model_uses_configured_name(settings):
+    """The vision and story agents run on the model named in settings."""
+    assert ClientRegistry(settings).chat_model().model_name == "gpt-4o-mini"
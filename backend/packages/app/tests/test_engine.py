@@ -0,0 +1,180 @@
+"""Tests for the stage execution engine."""
+
+import asyncio
+
+import pytest
+from unittest.mock import MagicMock
+
+from app import engine
+from app.engine import Stage, StageFailed, StageGraph, run_job
+
+
+def test_graph_rejects_unknown_dependency():
+    """Dependencies must name stages in the graph."""
+    with pytest.raises(ValueError):
+        StageGraph([Stage("video", lambda r: None, depends_on=("images",))])
+
+
+def test_graph_rejects_cycle():
+    """Cyclic dependencies should be rejected at construction."""
+    with pytest.raises(ValueError):
+        StageGraph([
+            Stage("a", lambda r: None, depends_on=("b",)),
+            Stage("b", lambda r: None, depends_on=("a",)),
+        ])
+
+
+@pytest.mark.asyncio
+async def test_independent_stages_run_concurrently():
+    """Stages without dependencies between them should overlap."""
+    both_started = asyncio.Event()
+    started = []
+
+    async def worker(name):
+        started.append(name)
+        if len(started) == 2:
+            both_started.set()
+        await asyncio.wait_for(both_started.wait(), timeout=1)
+        return name
+
+    async def join(results):
+        return results["a"] + results["b"]
+
+    graph = StageGraph([
+        Stage("a", lambda r: worker("a")),
+        Stage("b", lambda r: worker("b")),
+        Stage("c", join, depends_on=("a", "b")),
+    ])
+
+    results = await graph.run()
+
+    assert results["c"] == "ab"
+
+
+@pytest.mark.asyncio
+async def test_failure_cancels_siblings():
+    """A failing stage should cancel running siblings and report its name."""
+    cancelled = asyncio.Event()
+
+    async def slow(results):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def boom(results):
+        raise RuntimeError("boom")
+
+    graph = StageGraph([Stage("slow", slow), Stage("boom", boom)])
+
+    with pytest.raises(StageFailed) as exc_info:
+        await graph.run()
+
+    assert exc_info.value.stage == "boom"
+    assert cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_initial_results_skip_stages():
+    """Stages with initial results should not run again."""
+    calls = []
+
+    async def stage(name):
+        calls.append(name)
+        return name
+
+    graph = StageGraph([
+        Stage("a", lambda r: stage("a")),
+        Stage("b", lambda r: stage("b"), depends_on=("a",)),
+    ])
+
+    results = await graph.run(initial={"a": "cached"})
+
+    assert calls == ["b"]
+    assert results["a"] == "cached"
+
+
+@pytest.mark.asyncio
+async def test_run_job_checkpoints_progress(monkeypatch):
+    """run_job should checkpoint stage progress and completion."""
+    db = MagicMock()
+    monkeypatch.setattr(engine, "get_database", lambda: db)
+
+    async def value(results):
+        return 42
+
+    graph = StageGraph([Stage("story", value, checkpoint=lambda v: {"answer": v})])
+
+    results = await run_job(graph, "user1", "run1", state={"drawing_analysis": {}})
+
+    assert results == {"story": 42}
+    saved = [c.args[2] for c in db.save_checkpoint.call_args_list]
+    assert saved[0]["status"] == "processing"
+    assert saved[0]["current_stage"] == "story"
+    assert saved[-1] == {
+        "status": "complete",
+        "current_stage": "story_complete",
+        "drawing_analysis": {},
+        "answer": 42,
+    }
+
+
+@pytest.mark.asyncio
+async def test_run_job_records_failing_stage(monkeypatch):
+    """run_job should save an error checkpoint naming the failed stage."""
+    db = MagicMock()
+    monkeypatch.setattr(engine, "get_database", lambda: db)
+
+    async def boom(results):
+        raise RuntimeError("boom")
+
+    graph = StageGraph([Stage("images", boom)])
+
+    assert await run_job(graph, "user1", "run1") is None
+    saved = db.save_checkpoint.call_args_list[-1].args[2]
+    assert saved["status"] == "error"
+    assert saved["current_stage"] == "images"
+    assert saved["error"] == "boom"
+
+
+@pytest.mark.asyncio
+async def test_run_job_records_failing_checkpoint_hook(monkeypatch):
+    """A checkpoint write that fails mid-run should fail the job, not hang it."""
+    db = MagicMock()
+    db.save_checkpoint.side_effect = [ConnectionError("throttled"), None]
+    monkeypatch.setattr(engine, "get_database", lambda: db)
+
+    async def ok(results):
+        return "done"
+
+    graph = StageGraph([Stage("images", ok)])
+
+    assert await run_job(graph, "user1", "run1") is None
+    saved = db.save_checkpoint.call_args_list[-1].args[2]
+    assert saved["status"] == "error"
+    assert saved["current_stage"] == "images"
+    assert saved["error"] == "throttled"
+
+
+@pytest.mark.asyncio
+async def test_run_job_checkpoints_cancelled_job_as_resumable(monkeypatch):
+    """A cancelled job should be saved as a resumable error, not left processing."""
+    db = MagicMock()
+    monkeypatch.setattr(engine, "get_database", lambda: db)
+
+    async def slow(results):
+        await asyncio.sleep(10)
+
+    graph = StageGraph([Stage("video", slow)])
+    task = asyncio.create_task(run_job(graph, "user1", "run1"))
+    await asyncio.sleep(0)
+    task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    saved = db.save_checkpoint.call_args_list[-1].args[2]
+    assert saved["status"] == "error"
+    assert saved["current_stage"] == "video"
+    assert saved["resumable"] is True
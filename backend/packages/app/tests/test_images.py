@@ -1,13 +1,14 @@
 """Tests for images stage."""
 
+import asyncio
 import pytest
 from pathlib import Path
+from types import SimpleNamespace
 
+from app.cache import AssetCache
+from app.stages import images
 from app.stages.images import generate_images, STYLE_PROMPTS
 from app.models import (
-    DrawingAnalysis,
-    StoryScript,
-    Scene,
     Style,
     ImageResult,
 )
@@ -20,28 +21,6 @@ def test_style_prompts_exist():
         assert len(STYLE_PROMPTS[style]) > 0
 
 
-@pytest.fixture
-def sample_drawing():
-    return DrawingAnalysis(
-        subject="a purple dinosaur",
-        setting="a green meadow",
-        details=["big eyes", "spiky back"],
-        mood="happy",
-        colors=["purple", "green"],
-    )
-
-
-@pytest.fixture
-def sample_story():
-    return StoryScript(
-        scenes=[
-            Scene(number=1, text="Once upon a time there was a dinosaur."),
-            Scene(number=2, text="The dinosaur made a friend."),
-        ],
-        total_scenes=2,
-    )
-
-
 @pytest.mark.asyncio
 async def test_generate_images_creates_files(sample_drawing, sample_story, tmp_path, monkeypatch):
     """Image generation should create image files."""
@@ -59,3 +38,128 @@ async def test_generate_images_creates_files(sample_drawing, sample_story, tmp_p
 
     for img in result.images:
         assert Path(img.path).exists()
+
+
+class FakeStream:
+    """Stand-in for httpx.AsyncClient.stream returning a PNG in two chunks."""
+
+    def __init__(self, method, url):
+        self.url = url
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return None
+
+    def raise_for_status(self):
+        return None
+
+    async def aiter_bytes(self):
+        yield b"p"
+        yield b"ng"
+
+
+@pytest.mark.asyncio
+async def test_generate_images_runs_scenes_concurrently_in_order(
+    sample_drawing, sample_story, image_stage, tmp_path
+):
+    """Scenes should overlap, but results must keep scene order."""
+    in_flight = 0
+    peak = 0
+
+    async def fake_generate(prompt, **kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        # Make the first scene finish last
+        await asyncio.sleep(0.02 if "Once upon" in prompt else 0)
+        in_flight -= 1
+        return SimpleNamespace(data=[SimpleNamespace(url=prompt, b64_json=None)])
+
+    image_stage.clients.openai.images.generate = fake_generate
+    image_stage.clients.http.stream = FakeStream
+
+    result = await generate_images(sample_story, sample_drawing, Style.STORYBOOK, "run1")
+
+    assert peak == 2
+    assert image_stage.limiter.acquire.call_count == 2
+    assert [img.scene_number for img in result.images] == [1, 2]
+    assert result.images[0].key == str(tmp_path / "images" / "run1_scene_1.png")
+
+
+@pytest.mark.asyncio
+async def test_generate_images_reuses_cached_prompt(
+    sample_drawing, sample_story, image_stage, tmp_path
+):
+    """A second run with the same prompts should not call DALL-E again."""
+    calls = []
+
+    async def fake_generate(prompt, **kwargs):
+        calls.append(prompt)
+        return SimpleNamespace(data=[SimpleNamespace(url=prompt, b64_json=None)])
+
+    image_stage.clients.openai.images.generate = fake_generate
+    image_stage.clients.http.stream = FakeStream
+    image_stage.cache = AssetCache(
+        "images", ".png", ttl_sec=60, max_entries=10, root=tmp_path / "cache"
+    )
+
+    await generate_images(sample_story, sample_drawing, Style.STORYBOOK, "run1")
+    result = await generate_images(sample_story, sample_drawing, Style.STORYBOOK, "run2")
+
+    assert len(calls) == 2
+    assert result.images[0].key == str(tmp_path / "images" / "run2_scene_1.png")
+    assert Path(result.images[0].key).read_bytes() == b"png"
+
+
+@pytest.mark.asyncio
+async def test_generate_images_writes_inline_b64_response(
+    sample_drawing, sample_story, image_stage
+):
+    """With b64_json the image is written without a separate download."""
+    async def fake_generate(prompt, **kwargs):
+        assert kwargs["response_format"] == "b64_json"
+        return SimpleNamespace(data=[SimpleNamespace(url=None, b64_json="cG5n")])
+
+    image_stage.clients.openai.images.generate = fake_generate
+    image_stage.settings.image_response_format = "b64_json"
+
+    result = await generate_images(sample_story, sample_drawing, Style.STORYBOOK, "run1")
+
+    assert Path(result.images[0].key).read_bytes() == b"png"
+    image_stage.clients.http.stream.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_cached_image_reuses_cached_renditions(
+    sample_drawing, sample_story, image_stage, tmp_path, monkeypatch
+):
+    """A cache hit copies the cached renditions instead of re-encoding the original."""
+    async def fake_generate(prompt, **kwargs):
+        return SimpleNamespace(data=[SimpleNamespace(url=prompt, b64_json=None)])
+
+    rendered = []
+
+    async def fake_create_renditions(source, destination, storage, work_dir, assets):
+        rendered.append(source)
+        keys = {r.name: images.rendition_key(destination, r) for r in images.RENDITIONS}
+        for key in keys.values():
+            Path(key).write_bytes(b"rendition")
+        return keys
+
+    image_stage.clients.openai.images.generate = fake_generate
+    image_stage.clients.http.stream = FakeStream
+    image_stage.settings.image_renditions_enabled = True
+    image_stage.cache = AssetCache(
+        "images", ".png", ttl_sec=60, max_entries=10, root=tmp_path / "cache"
+    )
+    monkeypatch.setattr(images, "create_renditions", fake_create_renditions)
+
+    await generate_images(sample_story, sample_drawing, Style.STORYBOOK, "run1")
+    result = await generate_images(sample_story, sample_drawing, Style.STORYBOOK, "run2")
+
+    assert len(rendered) == 2  # First run only
+    image = result.images[0]
+    assert image.thumbnail_key == str(tmp_path / "images" / "run2_scene_1_thumb.webp")
+    assert Path(image.display_key).read_bytes() == b"rendition"
@@ -0,0 +1,181 @@
+"""Tests for background job helpers."""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from app import jobs
+from app.jobs import carry_over_outputs, prefetched_outputs, resume_results, story_fingerprint
+from app.models import (
+    AudioResult,
+    DrawingAnalysis,
+    PipelineRequest,
+    Scene,
+    StoryRequest,
+    StoryScript,
+    Style,
+    Theme,
+    VoiceType,
+)
+
+
+@pytest.fixture
+def request_model():
+    return PipelineRequest(
+        run_id="run1",
+        user_id="user1",
+        story=StoryScript(
+            scenes=[
+                Scene(number=1, text="Once upon a time."),
+                Scene(number=2, text="The end."),
+            ],
+            total_scenes=2,
+        ),
+        drawing=DrawingAnalysis(
+            subject="a dinosaur",
+            setting="a meadow",
+            details=["big eyes"],
+            mood="happy",
+            colors=["purple"],
+        ),
+        style=Style.STORYBOOK,
+        voice_type=VoiceType.GENTLE,
+        resume=True,
+    )
+
+
+@pytest.fixture
+def checkpoint(request_model, tmp_path):
+    files = {}
+    for name in ("img1.png", "img2.png", "aud1.mp3", "aud2.mp3"):
+        path = tmp_path / name
+        path.write_bytes(b"x")
+        files[name] = str(path)
+    return {
+        "story_script": request_model.story.model_dump(),
+        "style": "storybook",
+        "voice_type": "gentle",
+        "images": [
+            {"scene_number": 1, "key": files["img1.png"]},
+            {"scene_number": 2, "key": files["img2.png"]},
+        ],
+        "audio": {
+            "audio_files": [
+                {"scene_number": 1, "key": files["aud1.mp3"], "duration_sec": 1.5},
+                {"scene_number": 2, "key": files["aud2.mp3"], "duration_sec": 2.0},
+            ],
+            "total_duration_sec": 3.5,
+        },
+    }
+
+
+def test_carry_over_drops_outputs_for_edited_story(request_model, checkpoint):
+    """Outputs made for a different story should not be carried over."""
+    assert "images" in carry_over_outputs(request_model, checkpoint)
+
+    checkpoint["story_script"]["scenes"][0]["text"] = "A different start."
+    assert carry_over_outputs(request_model, checkpoint) == {}
+
+
+def test_resume_skips_stages_with_stored_outputs(request_model, checkpoint):
+    """Images and voice should be reused when every asset still exists."""
+    results = resume_results(request_model, checkpoint)
+
+    assert set(results) == {"images", "voice"}
+    assert results["voice"].total_duration_sec == 3.5
+
+
+def test_resume_keeps_image_renditions(request_model, checkpoint):
+    """Rendition keys stored with each image survive a resume."""
+    checkpoint["images"][0].update(thumbnail_key="thumb1.webp", display_key="disp1.jpg")
+
+    image = resume_results(request_model, checkpoint)["images"].images[0]
+
+    assert (image.thumbnail_key, image.display_key) == ("thumb1.webp", "disp1.jpg")
+
+
+def test_resume_regenerates_missing_or_mismatched_outputs(request_model, checkpoint):
+    """A missing asset or a changed voice should force regeneration."""
+    checkpoint["images"][1]["key"] = "/nonexistent/img2.png"
+    checkpoint["voice_type"] = "cheerful"
+
+    assert resume_results(request_model, checkpoint) == {}
+
+
+def test_prefetched_narration_used_only_for_same_story_and_voice(request_model, checkpoint):
+    """Speculative narration should be dropped if the story or voice changed."""
+    previous = {
+        "prefetched_audio": {
+            "story_fingerprint": story_fingerprint(request_model.story),
+            "voice_type": "gentle",
+            "audio": checkpoint["audio"],
+        },
+    }
+
+    assert prefetched_outputs(request_model, previous) == {
+        "voice_type": "gentle",
+        "audio": checkpoint["audio"],
+    }
+
+    request_model.voice_type = VoiceType.CHEERFUL
+    assert prefetched_outputs(request_model, previous) == {}
+
+    request_model.voice_type = VoiceType.GENTLE
+    request_model.story.scenes[0].text = "An edited start."
+    assert prefetched_outputs(request_model, previous) == {}
+
+
+@pytest.fixture
+def story_request(request_model):
+    return StoryRequest(
+        drawing=request_model.drawing,
+        theme=Theme.ADVENTURE,
+        voice_type=VoiceType.GENTLE,
+        child_age=5,
+        user_id="user1",
+        run_id="run1",
+        prefetch_narration=True,
+    )
+
+
+@pytest.mark.asyncio
+async def test_prefetch_writes_narration_under_its_own_keys(story_request, request_model, monkeypatch):
+    """Speculative clips never share keys with the pipeline's voice stage."""
+    run_ids = []
+
+    async def fake_generate_audio(story, voice_type, run_id, user_id=None):
+        run_ids.append(run_id)
+        return AudioResult(audio_files=[], total_duration_sec=0.0)
+
+    monkeypatch.setattr(jobs, "generate_audio", fake_generate_audio)
+    monkeypatch.setattr(jobs, "get_database", lambda: MagicMock())
+
+    await jobs.prefetch_narration(story_request, request_model.story)
+
+    fingerprint = story_fingerprint(request_model.story)
+    assert run_ids == [f"run1_prefetch_{fingerprint[:12]}_gentle"]
+
+
+@pytest.mark.asyncio
+async def test_cancel_prefetch_stops_speculative_narration(story_request, request_model, monkeypatch):
+    """Starting the pipeline cancels a prefetch still running for the run."""
+    started = asyncio.Event()
+    database = MagicMock()
+
+    async def fake_generate_audio(story, voice_type, run_id, user_id=None):
+        started.set()
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(jobs, "generate_audio", fake_generate_audio)
+    monkeypatch.setattr(jobs, "get_database", lambda: database)
+    task = asyncio.create_task(jobs.prefetch_narration(story_request, request_model.story))
+    monkeypatch.setitem(jobs._prefetch_tasks, ("user1", "run1"), task)
+    await started.wait()
+
+    jobs.cancel_prefetch("user1", "run1")
+
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    database.update_checkpoint.assert_not_called()
+    assert ("user1", "run1") not in jobs._prefetch_tasks
@@ -0,0 +1,80 @@
+"""Tests for the durable job queue."""
+
+import pytest
+
+from app.queue import SQLiteJobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SQLiteJobQueue(tmp_path / "jobs.db", lease_sec=60, max_attempts=2)
+
+
+def test_enqueue_and_lease(queue):
+    """Leasing should return the oldest queued job with its payload."""
+    first = queue.enqueue("story", "llm", {"run_id": "a"})
+    queue.enqueue("story", "llm", {"run_id": "b"})
+
+    job = queue.lease("worker-1")
+
+    assert job.id == first
+    assert job.payload == {"run_id": "a"}
+    assert job.attempts == 1
+    assert queue.stats()["llm"] == {"queued": 1, "running": 1}
+
+
+def test_lease_filters_by_kind(queue):
+    """Workers should only lease jobs of the kinds they accept."""
+    queue.enqueue("pipeline", "render", {})
+
+    assert queue.lease("worker-1", ["llm"]) is None
+    assert queue.lease("worker-1", ["render"]).job_type == "pipeline"
+
+
+def test_complete_requires_current_lease(queue):
+    """A worker that lost its lease should not be able to update the job."""
+    queue.enqueue("vision", "llm", {})
+    job = queue.lease("worker-1")
+
+    assert queue.heartbeat(job)
+    job.lease_token = "stale"
+    assert not queue.heartbeat(job)
+
+
+def test_recover_stale_requeues_then_fails(queue):
+    """Expired leases are re-queued until attempts run out."""
+    queue.lease_sec = -1
+    queue.enqueue("pipeline", "render", {"user_id": "u", "run_id": "r"})
+
+    queue.lease("worker-1")
+    assert queue.recover_stale() == []
+    assert queue.stats()["render"]["queued"] == 1
+
+    queue.lease("worker-2")
+    dead = queue.recover_stale()
+    assert [job.payload["run_id"] for job in dead] == ["r"]
+    assert queue.stats() == {}
+
+
+def test_release_requeues_without_using_an_attempt(queue):
+    """A job interrupted by shutdown goes back to the queue for the next worker."""
+    queue.enqueue("pipeline", "render", {})
+    job = queue.lease("worker-1")
+
+    queue.release(job)
+
+    assert queue.stats()["render"]["queued"] == 1
+    assert not queue.heartbeat(job)
+    assert queue.lease("worker-2").attempts == 1
+
+
+def test_lease_prefers_priority_then_least_busy_user(queue):
+    """Interactive jobs go first; then users with fewer running jobs."""
+    queue.enqueue("pipeline", "render", {"n": 1}, user_id="a")
+    queue.enqueue("pipeline", "render", {"n": 2}, user_id="a")
+    queue.enqueue("pipeline", "render", {"n": 3}, user_id="b")
+    queue.enqueue("story", "llm", {"n": 4}, user_id="c", priority=0)
+
+    leased = [queue.lease("worker-1").payload["n"] for _ in range(4)]
+
+    assert leased == [4, 1, 3, 2]
@@ -0,0 +1,64 @@
+"""Tests for the token-bucket rate limiter."""
+
+import pytest
+
+from app import ratelimit
+from app.ratelimit import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(ratelimit.time, "monotonic", fake)
+    return fake
+
+
+def test_bucket_allows_burst_then_spaces_requests(clock):
+    """A full bucket serves a burst, then callers wait for the refill."""
+    bucket = TokenBucket.per_minute(2, burst=2)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(30)
+    assert bucket.reserve() == pytest.approx(60)
+
+
+def test_per_minute_bucket_bursts_only_up_to_burst_size(clock):
+    """A fresh bucket does not release a whole minute's quota at once."""
+    bucket = TokenBucket.per_minute(15, burst=4)
+
+    delays = [bucket.reserve() for _ in range(15)]
+
+    assert delays[:4] == [0, 0, 0, 0]
+    assert delays[4] == pytest.approx(4)
+    # The 15th request waits until 44 s, not 0 s as with a full-minute burst
+    assert delays[-1] == pytest.approx(44)
+
+
+def test_bucket_refills_over_time(clock):
+    """Tokens come back at the configured rate, up to capacity."""
+    bucket = TokenBucket(rate=1, capacity=2)
+    bucket.reserve()
+    bucket.reserve()
+
+    clock.now = 1.0
+    assert bucket.reserve() == 0
+
+    clock.now = 100.0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(1)
+
+
+def test_bucket_rejects_invalid_rate():
+    """A non-positive rate would never refill."""
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0, capacity=1)
@@ -0,0 +1,63 @@
+"""Tests for compressed image renditions."""
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+from PIL import Image
+
+from app import renditions
+from app.renditions import RENDITIONS, create_renditions, rendition_key
+
+
+@pytest.fixture
+def original(tmp_path):
+    path = tmp_path / "run1_scene_1.png"
+    Image.new("RGBA", (1024, 1024), (120, 60, 200, 255)).save(path)
+    return path
+
+
+@pytest.fixture
+def thread_pool(monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(renditions, "get_rendition_pool", lambda: pool)
+    yield pool
+    pool.shutdown()
+
+
+def test_rendition_key_sits_next_to_original():
+    """Renditions share the original's folder and stem."""
+    thumbnail, display = RENDITIONS
+
+    assert rendition_key("user1/images/run_scene_1.png", thumbnail) == "user1/images/run_scene_1_thumb.webp"
+    assert rendition_key("data/images/run_scene_1.png", display) == "data/images/run_scene_1_display.jpg"
+
+
+@pytest.mark.asyncio
+async def test_local_renditions_are_smaller_and_resized(original, thread_pool):
+    """In local mode renditions are written next to the original."""
+    keys = await create_renditions(str(original), str(original))
+
+    with Image.open(keys["thumbnail"]) as thumbnail:
+        assert thumbnail.format == "WEBP"
+        assert thumbnail.size == (256, 256)
+    with Image.open(keys["display"]) as display:
+        assert display.format == "JPEG"
+        assert display.size == (1024, 1024)
+
+
+@pytest.mark.asyncio
+async def test_s3_renditions_are_uploaded_next_to_original(original, tmp_path, thread_pool):
+    """In S3 mode renditions are encoded in the work dir and uploaded."""
+    storage = MagicMock()
+
+    keys = await create_renditions(
+        str(original), "user1/images/run1_scene_1.png", storage, str(tmp_path)
+    )
+
+    assert keys == {
+        "thumbnail": "user1/images/run1_scene_1_thumb.webp",
+        "display": "user1/images/run1_scene_1_display.jpg",
+    }
+    uploaded = {c.args[1] for c in storage.upload_file.call_args_list}
+    assert uploaded == set(keys.values())
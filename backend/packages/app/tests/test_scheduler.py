@@ -0,0 +1,200 @@
+"""Tests for the job scheduler."""
+
+import asyncio
+
+import pytest
+
+from app import scheduler as scheduler_module
+from app.config import Settings
+from app.scheduler import JobKind, JobScheduler, Priority, SchedulerSaturated, get_scheduler
+
+
+def make_scheduler(limit=1, queue_limit=1):
+    return JobScheduler(
+        limits={kind: limit for kind in JobKind},
+        queue_limit=queue_limit,
+        retry_after=5,
+    )
+
+
+@pytest.mark.asyncio
+async def test_submit_limits_concurrency_per_kind():
+    """Only `limit` jobs of a kind should run at once; the rest queue."""
+    scheduler = make_scheduler(limit=1, queue_limit=1)
+    release = asyncio.Event()
+
+    async def job():
+        await release.wait()
+
+    first = scheduler.submit(JobKind.RENDER, job())
+    second = scheduler.submit(JobKind.RENDER, job())
+    await asyncio.sleep(0)
+
+    stats = scheduler.stats()["render"]
+    assert stats["running"] == 1
+    assert stats["queued"] == 1
+
+    release.set()
+    await asyncio.gather(first, second)
+    assert scheduler.stats()["render"]["running"] == 0
+    assert scheduler.stats()["render"]["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_submit_rejects_when_saturated():
+    """Jobs beyond limit + queue_limit should be rejected with retry_after."""
+    scheduler = make_scheduler(limit=1, queue_limit=0)
+    release = asyncio.Event()
+
+    async def job():
+        await release.wait()
+
+    task = scheduler.submit(JobKind.LLM, job())
+
+    with pytest.raises(SchedulerSaturated) as exc_info:
+        scheduler.submit(JobKind.LLM, job())
+    assert exc_info.value.retry_after == 5
+
+    # Other kinds are unaffected
+    scheduler.ensure_capacity(JobKind.TTS)
+
+    release.set()
+    await task
+    scheduler.ensure_capacity(JobKind.LLM)
+
+
+@pytest.mark.asyncio
+async def test_run_returns_result():
+    """Inline jobs should return their result."""
+    scheduler = make_scheduler()
+
+    async def job():
+        return "done"
+
+    assert await scheduler.run(JobKind.TTS, job()) == "done"
+
+
+@pytest.mark.asyncio
+async def test_shutdown_drains_then_cancels():
+    """Shutdown should stop admissions, drain quick jobs and cancel slow ones."""
+    scheduler = make_scheduler(limit=1, queue_limit=1)
+    abandoned = []
+
+    async def slow():
+        await asyncio.sleep(10)
+
+    running = scheduler.submit(JobKind.RENDER, slow())
+    queued = scheduler.submit(JobKind.RENDER, slow(), on_abandon=lambda: abandoned.append(True))
+    quick = scheduler.submit(JobKind.LLM, asyncio.sleep(0))
+    await asyncio.sleep(0)
+
+    cancelled = await scheduler.shutdown(timeout=0.05)
+
+    assert cancelled == 2
+    assert quick.done() and not quick.cancelled()
+    assert running.cancelled()
+    assert queued.cancelled()
+    assert abandoned == [True]
+    with pytest.raises(SchedulerSaturated):
+        scheduler.ensure_capacity(JobKind.LLM)
+
+
+@pytest.mark.asyncio
+async def test_waiting_jobs_are_shared_fairly_across_users():
+    """A user with many queued jobs should not delay another user's first job."""
+    scheduler = make_scheduler(limit=1, queue_limit=10)
+    release = asyncio.Event()
+    order = []
+
+    async def job(name):
+        order.append(name)
+        await release.wait()
+
+    blocker = scheduler.submit(JobKind.RENDER, job("blocker"), user_id="a")
+    await asyncio.sleep(0)
+    tasks = [scheduler.submit(JobKind.RENDER, job(f"a{i}"), user_id="a") for i in range(3)]
+    tasks.append(scheduler.submit(JobKind.RENDER, job("b0"), user_id="b"))
+    await asyncio.sleep(0)
+
+    release.set()
+    await asyncio.gather(blocker, *tasks)
+
+    assert order == ["blocker", "a0", "b0", "a1", "a2"]
+
+
+@pytest.mark.asyncio
+async def test_interactive_jobs_dispatched_before_batch():
+    """When the global cap binds, interactive jobs should start first."""
+    scheduler = JobScheduler(
+        limits={kind: 2 for kind in JobKind},
+        queue_limit=10,
+        retry_after=5,
+        max_running=1,
+    )
+    release = asyncio.Event()
+    order = []
+
+    async def job(name):
+        order.append(name)
+        await release.wait()
+
+    blocker = scheduler.submit(JobKind.RENDER, job("blocker"))
+    await asyncio.sleep(0)
+    render = scheduler.submit(JobKind.RENDER, job("render"), priority=Priority.BATCH)
+    story = scheduler.submit(JobKind.LLM, job("story"), priority=Priority.INTERACTIVE)
+    await asyncio.sleep(0)
+
+    release.set()
+    await asyncio.gather(blocker, render, story)
+
+    assert order == ["blocker", "story", "render"]
+
+
+@pytest.mark.asyncio
+async def test_interactive_jobs_overtake_batch_jobs_by_default(monkeypatch):
+    """With the default settings the global cap binds before the per-kind limits."""
+    settings = Settings(_env_file=None, openai_api_key="test", elevenlabs_api_key="test")
+    monkeypatch.setattr(scheduler_module, "get_settings", lambda: settings)
+    get_scheduler.cache_clear()
+    scheduler = get_scheduler()
+    get_scheduler.cache_clear()
+    release = {kind: asyncio.Event() for kind in JobKind}
+    order = []
+
+    async def job(name, kind=None):
+        order.append(name)
+        if kind is not None:
+            await release[kind].wait()
+
+    # Fill the global cap with each kind's share of long-running work
+    blockers = [
+        scheduler.submit(kind, job(kind.value, kind))
+        for kind, count in ((JobKind.RENDER, 2), (JobKind.TTS, 4), (JobKind.LLM, 2))
+        for _ in range(count)
+    ]
+    await asyncio.sleep(0)
+    assert len(blockers) == settings.max_running_jobs < sum(scheduler.limits.values())
+
+    images = scheduler.submit(JobKind.LLM, job("images"), priority=Priority.BATCH)
+    story = scheduler.submit(JobKind.LLM, job("story"), priority=Priority.INTERACTIVE)
+    await asyncio.sleep(0)
+    assert "images" not in order and "story" not in order
+
+    release[JobKind.TTS].set()
+    await asyncio.gather(images, story)
+
+    assert order.index("story") < order.index("images")
+    for event in release.values():
+        event.set()
+    await asyncio.gather(*blockers)
+
+
+def test_non_positive_user_weight_is_rejected():
+    """A zero weight would never earn a turn and hang dispatch."""
+    with pytest.raises(ValueError):
+        JobScheduler(
+            limits={kind: 1 for kind in JobKind},
+            queue_limit=1,
+            retry_after=5,
+            user_weights={"u": 0},
+        )
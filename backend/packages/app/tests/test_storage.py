@@ -214,6 +214,25 @@ class TestDownloadFile:
         assert result == local_path
 
 
+class TestDownloadBytes:
+    """Tests for download_bytes method."""
+
+    @patch("app.storage.boto3")
+    def test_download_bytes(self, mock_boto3):
+        """Should return the object's body."""
+        mock_client = MagicMock()
+        mock_client.get_object.return_value = {"Body": MagicMock(read=lambda: b"#EXTM3U")}
+        mock_boto3.client.return_value = mock_client
+
+        storage = S3Storage(bucket_name="my-bucket", region="us-east-1")
+        result = storage.download_bytes("user123/videos/run_hls/master.m3u8")
+
+        mock_client.get_object.assert_called_once_with(
+            Bucket="my-bucket", Key="user123/videos/run_hls/master.m3u8"
+        )
+        assert result == b"#EXTM3U"
+
+
 class TestGeneratePresignedUrl:
     """Tests for generate_presigned_url method."""
 
@@ -269,6 +288,60 @@ class TestDeleteObject:
         )
 
 
+class TestObjectExists:
+    """Tests for object_exists method."""
+
+    @patch("app.storage.boto3")
+    def test_object_exists_true(self, mock_boto3):
+        """Should return True when head_object succeeds."""
+        mock_client = MagicMock()
+        mock_boto3.client.return_value = mock_client
+
+        storage = S3Storage(bucket_name="my-bucket", region="us-east-1")
+
+        assert storage.object_exists("user123/images/scene_1.png") is True
+        mock_client.head_object.assert_called_once_with(
+            Bucket="my-bucket",
+            Key="user123/images/scene_1.png"
+        )
+
+    @patch("app.storage.boto3")
+    def test_object_exists_false_on_404(self, mock_boto3):
+        """Should return False when the object is missing."""
+        from botocore.exceptions import ClientError
+
+        mock_client = MagicMock()
+        mock_client.head_object.side_effect = ClientError(
+            {"Error": {"Code": "404", "Message": "Not Found"}}, "HeadObject"
+        )
+        mock_boto3.client.return_value = mock_client
+
+        storage = S3Storage(bucket_name="my-bucket", region="us-east-1")
+
+        assert storage.object_exists("user123/images/missing.png") is False
+
+
+class TestCopyObject:
+    """Tests for copy_object method."""
+
+    @patch("app.storage.boto3")
+    def test_copy_object_is_server_side(self, mock_boto3):
+        """Should copy within the bucket and return the new S3 URI."""
+        mock_client = MagicMock()
+        mock_boto3.client.return_value = mock_client
+
+        storage = S3Storage(bucket_name="my-bucket", region="us-east-1")
+
+        result = storage.copy_object("cache/images/user123/abc.png", "user123/images/scene_1.png")
+
+        assert result == "s3://my-bucket/user123/images/scene_1.png"
+        mock_client.copy_object.assert_called_once_with(
+            Bucket="my-bucket",
+            Key="user123/images/scene_1.png",
+            CopySource={"Bucket": "my-bucket", "Key": "cache/images/user123/abc.png"},
+        )
+
+
 class TestClientProperty:
     """Tests for lazy-loaded client property."""
 
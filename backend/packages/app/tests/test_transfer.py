@@ -0,0 +1,99 @@
+"""Tests for streaming writes into storage."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.transfer import MIN_PART_SIZE, tee, write_stream
+
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+
+def make_storage():
+    storage = MagicMock()
+    storage.create_multipart_upload.return_value = "upload-1"
+    storage.upload_part.side_effect = lambda key, upload_id, number, data: {
+        "ETag": f"etag-{number}", "PartNumber": number, "size": len(data)
+    }
+    return storage
+
+
+@pytest.mark.asyncio
+async def test_small_stream_uses_single_put():
+    """A stream smaller than one part should not start a multipart upload."""
+    storage = make_storage()
+
+    written = await write_stream(chunks(b"ab", b"cd"), "user/images/a.png", storage)
+
+    assert written == 4
+    storage.upload_bytes.assert_called_once_with(b"abcd", "user/images/a.png")
+    storage.create_multipart_upload.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_large_stream_uploads_bounded_parts():
+    """Large streams are uploaded part by part, never buffering more than a part."""
+    storage = make_storage()
+    block = b"x" * (MIN_PART_SIZE // 2)
+
+    await write_stream(chunks(block, block, block, b"tail"), "key", storage, part_size=MIN_PART_SIZE)
+
+    sizes = [c.args[3] for c in storage.upload_part.call_args_list]
+    assert [len(s) for s in sizes] == [MIN_PART_SIZE, len(block) + 4]
+    parts = storage.complete_multipart_upload.call_args.args[2]
+    assert [p["PartNumber"] for p in parts] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_failed_stream_aborts_multipart_upload():
+    """A stream that fails mid-way should not leave orphaned parts."""
+    storage = make_storage()
+
+    async def broken():
+        yield b"x" * MIN_PART_SIZE
+        raise ConnectionError("reset")
+
+    with pytest.raises(ConnectionError):
+        await write_stream(broken(), "key", storage, part_size=MIN_PART_SIZE)
+
+    storage.abort_multipart_upload.assert_called_once_with("key", "upload-1")
+    storage.complete_multipart_upload.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_failed_abort_keeps_the_original_error():
+    """An abort that fails (e.g. AccessDenied) must not mask the upload error."""
+    storage = make_storage()
+    storage.abort_multipart_upload.side_effect = PermissionError("AccessDenied")
+
+    async def broken():
+        yield b"x" * MIN_PART_SIZE
+        raise ConnectionError("reset")
+
+    with pytest.raises(ConnectionError):
+        await write_stream(broken(), "key", storage, part_size=MIN_PART_SIZE)
+
+
+@pytest.mark.asyncio
+async def test_local_stream_writes_file(tmp_path):
+    """In local mode chunks are written to the destination path."""
+    path = tmp_path / "images" / "scene.png"
+
+    await write_stream(chunks(b"p", b"ng"), str(path))
+
+    assert path.read_bytes() == b"png"
+    assert not (tmp_path / "images" / "scene.png.partial").exists()
+
+
+@pytest.mark.asyncio
+async def test_tee_passes_chunks_through_and_keeps_a_copy(tmp_path):
+    """Chunks reach the consumer unchanged and land in the local copy."""
+    path = tmp_path / "copy.mp3"
+
+    received = [chunk async for chunk in tee(chunks(b"ab", b"cd"), path)]
+
+    assert received == [b"ab", b"cd"]
+    assert path.read_bytes() == b"abcd"
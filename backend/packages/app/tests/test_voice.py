@@ -1,11 +1,13 @@
 """Tests for voice stage."""
 
+import asyncio
+import base64
 import pytest
+from types import SimpleNamespace
 
-from app.stages.voice import generate_audio, VOICE_IDS
+from app.cache import AssetCache
+from app.stages.voice import generate_audio, scene_cut_times, SCENE_SEPARATOR, VOICE_IDS
 from app.models import (
-    StoryScript,
-    Scene,
     VoiceType,
     AudioResult,
 )
@@ -18,17 +20,6 @@ def test_voice_ids_exist():
         assert len(VOICE_IDS[voice_type]) > 0
 
 
-@pytest.fixture
-def sample_story():
-    return StoryScript(
-        scenes=[
-            Scene(number=1, text="Once upon a time there was a little dinosaur."),
-            Scene(number=2, text="The dinosaur loved to play in the meadow."),
-        ],
-        total_scenes=2,
-    )
-
-
 @pytest.mark.asyncio
 async def test_generate_audio_creates_files(sample_story):
     """Audio generation should create audio files."""
@@ -43,3 +34,136 @@ async def test_generate_audio_creates_files(sample_story):
     assert isinstance(result, AudioResult)
     assert len(result.audio_files) == len(sample_story.scenes)
     assert result.total_duration_sec > 0
+
+
+@pytest.mark.asyncio
+async def test_generate_audio_runs_scenes_concurrently_in_order(sample_story, voice_stage, tmp_path):
+    """Scenes should be synthesized concurrently within the limit, in scene order."""
+    in_flight = 0
+    peak = 0
+
+    async def fake_convert(voice_id, text, **kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        # Make the first scene finish last
+        await asyncio.sleep(0.02 if "Once upon" in text else 0)
+        in_flight -= 1
+        yield text.encode()
+
+    voice_stage.client.text_to_speech.convert = fake_convert
+
+    result = await generate_audio(sample_story, VoiceType.GENTLE, "run1")
+
+    assert peak == 2
+    assert [audio.scene_number for audio in result.audio_files] == [1, 2]
+    assert (tmp_path / "audio" / "run1_scene_1.mp3").read_bytes().startswith(b"Once upon")
+    assert result.total_duration_sec == pytest.approx(
+        sum(audio.duration_sec for audio in result.audio_files)
+    )
+
+
+@pytest.mark.asyncio
+async def test_generate_audio_reuses_cached_narration(sample_story, voice_stage, tmp_path):
+    """Text already voiced should be copied from the cache with its duration."""
+    # Ten MPEG-1 Layer III frames (128 kbps, 44.1 kHz)
+    clip = (bytes([0xFF, 0xFB, 0x90, 0x00]) + bytes(413)) * 10
+    calls = []
+
+    async def fake_convert(voice_id, text, **kwargs):
+        calls.append(text)
+        yield clip
+
+    voice_stage.client.text_to_speech.convert = fake_convert
+    voice_stage.cache = AssetCache(
+        "audio", ".mp3", ttl_sec=60, max_entries=10, root=tmp_path / "cache"
+    )
+
+    first = await generate_audio(sample_story, VoiceType.GENTLE, "run1")
+    second = await generate_audio(sample_story, VoiceType.GENTLE, "run2")
+
+    assert len(calls) == 2
+    assert second.audio_files[0].key == str(tmp_path / "audio" / "run2_scene_1.mp3")
+    assert second.audio_files[0].duration_sec == pytest.approx(10 * 1152 / 44100)
+    assert second.total_duration_sec == first.total_duration_sec
+
+
+def alignment_for(text: str, seconds_per_char: float) -> SimpleNamespace:
+    return SimpleNamespace(
+        characters=list(text),
+        character_start_times_seconds=[i * seconds_per_char for i in range(len(text))],
+        character_end_times_seconds=[(i + 1) * seconds_per_char for i in range(len(text))],
+    )
+
+
+def test_scene_cut_times_splits_in_the_pause(sample_story):
+    """Cuts sit between the end of one scene and the start of the next."""
+    text = SCENE_SEPARATOR.join(scene.text for scene in sample_story.scenes)
+    first_length = len(sample_story.scenes[0].text)
+
+    cuts = scene_cut_times(sample_story.scenes, alignment_for(text, 0.1))
+
+    # Last char of scene 1 ends at first_length * 0.1; scene 2 starts 2 chars later
+    assert cuts == pytest.approx([(first_length * 0.1 + (first_length + 2) * 0.1) / 2])
+
+
+def test_scene_cut_times_none_when_text_missing(sample_story):
+    """An alignment that does not contain every scene cannot be split."""
+    assert scene_cut_times(sample_story.scenes, alignment_for("Something else", 0.1)) is None
+
+
+@pytest.mark.asyncio
+async def test_generate_audio_whole_story_splits_one_request(sample_story, voice_stage, tmp_path):
+    """Whole-story mode narrates once and cuts the track into scene clips."""
+    frame = bytes([0xFF, 0xFB, 0x90, 0x00]) + bytes(413)
+    frame_seconds = 1152 / 44100
+    text = SCENE_SEPARATOR.join(scene.text for scene in sample_story.scenes)
+    # 40 frames over the whole text, so scene 2 starts roughly halfway
+    seconds_per_char = 40 * frame_seconds / len(text)
+    calls = []
+
+    async def fake_convert_with_timestamps(voice_id, text, **kwargs):
+        calls.append(text)
+        return SimpleNamespace(
+            audio_base_64=base64.b64encode(frame * 40).decode(),
+            alignment=alignment_for(text, seconds_per_char),
+        )
+
+    voice_stage.client.text_to_speech.convert_with_timestamps = fake_convert_with_timestamps
+    voice_stage.settings.tts_mode = "whole_story"
+
+    result = await generate_audio(sample_story, VoiceType.GENTLE, "run1")
+
+    assert calls == [text]
+    assert result.track_key == str(tmp_path / "audio" / "run1_narration.mp3")
+    assert (tmp_path / "audio" / "run1_narration.mp3").read_bytes() == frame * 40
+    clips = [(tmp_path / "audio" / f"run1_scene_{n}.mp3").read_bytes() for n in (1, 2)]
+    assert b"".join(clips) == frame * 40
+    assert all(len(clip) > 0 for clip in clips)
+    assert result.total_duration_sec == pytest.approx(40 * frame_seconds)
+    assert [audio.duration_sec for audio in result.audio_files] == pytest.approx(
+        [len(clip) // len(frame) * frame_seconds for clip in clips]
+    )
+
+
+@pytest.mark.asyncio
+async def test_generate_audio_streams_chunks_in_configured_format(sample_story, voice_stage, tmp_path):
+    """Chunks are written as they arrive and measured without buffering the clip."""
+    # MPEG-2 Layer III, 32 kbps, 22.05 kHz: 104-byte frames of 576 samples
+    frame = bytes([0xFF, 0xF3, 0x40, 0x00]) + bytes(100)
+    formats = []
+
+    async def fake_convert(voice_id, text, output_format, **kwargs):
+        formats.append(output_format)
+        for _ in range(5):
+            # Split frames across chunk boundaries
+            yield frame[:30]
+            yield frame[30:]
+
+    voice_stage.client.text_to_speech.convert = fake_convert
+
+    result = await generate_audio(sample_story, VoiceType.GENTLE, "run1")
+
+    assert formats == ["mp3_22050_32", "mp3_22050_32"]
+    assert (tmp_path / "audio" / "run1_scene_1.mp3").read_bytes() == frame * 5
+    assert result.audio_files[0].duration_sec == pytest.approx(5 * 576 / 22050)
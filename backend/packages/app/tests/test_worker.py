@@ -0,0 +1,184 @@
+"""Tests for the durable queue worker."""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app import engine, worker
+from app.engine import Stage, StageGraph, run_job
+from app.queue import QueuedJob
+from app.scheduler import JobKind, JobScheduler
+
+
+class FakeQueue:
+    """In-memory stand-in for the durable queue."""
+
+    def __init__(self, count: int) -> None:
+        self.queued = [
+            QueuedJob(id=str(n), job_type="pipeline", kind="render", payload={}, attempts=1, lease_token="t")
+            for n in range(count)
+        ]
+        self.completed: list[str] = []
+        self.released: list[str] = []
+
+    def recover_stale(self):
+        return []
+
+    def lease(self, worker_id, kinds=None):
+        for job in self.queued:
+            if kinds is None or job.kind in kinds:
+                self.queued.remove(job)
+                return job
+        return None
+
+    def heartbeat(self, job):
+        return True
+
+    def complete(self, job):
+        self.completed.append(job.id)
+
+    def release(self, job):
+        self.released.append(job.id)
+
+    def fail(self, job, error):
+        raise AssertionError(f"Job {job.id} failed: {error}")
+
+
+@pytest.fixture
+def worker_env(monkeypatch):
+    settings = MagicMock(
+        prewarm_connections=False,
+        job_heartbeat_sec=10,
+        worker_poll_interval_sec=0.01,
+        shutdown_drain_sec=1,
+    )
+    scheduler = JobScheduler(limits={kind: 2 for kind in JobKind}, queue_limit=0, retry_after=5)
+    monkeypatch.setattr(worker, "get_settings", lambda: settings)
+    monkeypatch.setattr(worker, "get_scheduler", lambda: scheduler)
+    monkeypatch.setattr(worker, "get_clients", lambda: MagicMock(aclose=AsyncMock()))
+    monkeypatch.setattr(worker, "shutdown_rendition_pool", lambda: None)
+    return settings
+
+
+@pytest.mark.asyncio
+async def test_worker_leases_no_more_jobs_than_free_slots(worker_env, monkeypatch):
+    """A backlog larger than the limit is leased as slots free up, never beyond them."""
+    queue = FakeQueue(count=11)
+    running = 0
+    peak = 0
+    stop = asyncio.Event()
+
+    async def handler(payload):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if len(queue.completed) == 10:
+            stop.set()
+
+    monkeypatch.setattr(worker, "get_job_queue", lambda: queue)
+    monkeypatch.setattr(worker, "JOBS", {"pipeline": SimpleNamespace(handler=handler)})
+
+    await asyncio.wait_for(worker.run_worker("w1", [JobKind.RENDER], stop), timeout=5)
+
+    assert peak == 2
+    assert sorted(queue.completed, key=int) == [str(n) for n in range(11)]
+
+
+@pytest.mark.asyncio
+async def test_job_cancelled_at_shutdown_is_released(worker_env, monkeypatch):
+    """Jobs still running at the drain deadline are re-queued, not failed."""
+    worker_env.shutdown_drain_sec = 0.01
+    queue = FakeQueue(count=1)
+    stop = asyncio.Event()
+
+    async def handler(payload):
+        stop.set()
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(worker, "get_job_queue", lambda: queue)
+    monkeypatch.setattr(worker, "JOBS", {"pipeline": SimpleNamespace(handler=handler)})
+
+    await asyncio.wait_for(worker.run_worker("w1", [JobKind.RENDER], stop), timeout=5)
+
+    assert queue.released == ["0"]
+    assert queue.completed == []
+
+
+@pytest.mark.asyncio
+async def test_job_is_cancelled_when_its_lease_is_lost(worker_env, monkeypatch):
+    """A job whose lease expired stops running instead of racing another worker."""
+    worker_env.job_heartbeat_sec = 0.01
+    queue = FakeQueue(count=1)
+    queue.heartbeat = lambda job: False
+    stop = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def handler(payload):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            stop.set()
+            raise
+
+    monkeypatch.setattr(worker, "get_job_queue", lambda: queue)
+    monkeypatch.setattr(worker, "JOBS", {"pipeline": SimpleNamespace(handler=handler)})
+
+    await asyncio.wait_for(worker.run_worker("w1", [JobKind.RENDER], stop), timeout=5)
+
+    assert cancelled.is_set()
+    assert queue.completed == [] and queue.released == []
+
+
+@pytest.mark.asyncio
+async def test_lost_lease_leaves_the_new_owners_checkpoint_alone(worker_env, monkeypatch):
+    """A job re-leased by another worker is not checkpointed as interrupted."""
+    worker_env.job_heartbeat_sec = 0.01
+    queue = FakeQueue(count=1)
+    stop = asyncio.Event()
+    database = MagicMock()
+    monkeypatch.setattr(engine, "get_database", lambda: database)
+
+    def heartbeat(job):
+        # The lease expired and another worker now holds the job
+        stop.set()
+        return False
+
+    queue.heartbeat = heartbeat
+
+    async def slow(results):
+        await asyncio.sleep(10)
+
+    async def handler(payload):
+        await run_job(StageGraph([Stage("render", slow)]), "u", "r")
+
+    monkeypatch.setattr(worker, "get_job_queue", lambda: queue)
+    monkeypatch.setattr(worker, "JOBS", {"pipeline": SimpleNamespace(handler=handler)})
+
+    await asyncio.wait_for(worker.run_worker("w1", [JobKind.RENDER], stop), timeout=5)
+
+    statuses = [call.args[2]["status"] for call in database.save_checkpoint.call_args_list]
+    assert statuses == ["processing"]
+    assert queue.completed == [] and queue.released == []
+
+
+def test_checkpoint_failure_keeps_stage_outputs(monkeypatch):
+    """Recording an abandoned job updates its checkpoint in place."""
+    database = MagicMock()
+    database.update_checkpoint.return_value = True
+    monkeypatch.setattr(worker, "get_database", lambda: database)
+    job = QueuedJob(
+        id="1", job_type="pipeline", kind="render",
+        payload={"user_id": "u", "run_id": "r"}, attempts=3, lease_token="",
+    )
+
+    worker._checkpoint_failure(job, "abandoned")
+
+    database.update_checkpoint.assert_called_once_with("u", "r", {
+        "status": "error", "current_stage": "pipeline", "error": "abandoned",
+    })
+    database.save_checkpoint.assert_not_called()
@@ -8,7 +8,12 @@ export interface JobStatus {
   error: string | null;
   drawing_analysis: Record<string, unknown> | null;
   story_script: Record<string, unknown> | null;
-  images: Array<{ scene_number: number; key: string }> | null;
+  images: Array<{
+    scene_number: number;
+    key: string;
+    thumbnail_key?: string | null;
+    display_key?: string | null;
+  }> | null;
   video: Record<string, unknown> | null;
   updated_at: string | null;
 }
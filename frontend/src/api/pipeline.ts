@@ -13,12 +13,16 @@ export interface PipelineRequest {
 export interface GeneratedImage {
   scene_number: number;
   key: string;
+  thumbnail_key?: string | null;  // Small WebP rendition
+  display_key?: string | null;    // Full-size JPEG rendition
 }
 
 export interface VideoResult {
   video_key: string;
   duration_sec: number;
   thumbnail_key: string;
+  hls_playlist_key?: string | null;  // HLS master playlist, when packaged
+  hls_segment_keys?: string[];
 }
 
 export interface PipelineResponse {
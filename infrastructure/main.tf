@@ -61,6 +61,50 @@ resource "aws_s3_bucket_public_access_block" "assets" {
   restrict_public_buckets = true
 }
 
+# Generated-asset cache entries (cache/{kind}/{user_id}/...) expire with the
+# app's cache TTL; runs keep their own copies, so nothing else depends on them
+resource "aws_s3_bucket_lifecycle_configuration" "assets" {
+  bucket = aws_s3_bucket.assets.id
+
+  # Backstop for streamed uploads the app could not abort itself
+  rule {
+    id     = "abort-incomplete-multipart-uploads"
+    status = "Enabled"
+
+    filter {}
+
+    abort_incomplete_multipart_upload {
+      days_after_initiation = 1
+    }
+  }
+
+  rule {
+    id     = "expire-image-cache"
+    status = "Enabled"
+
+    filter {
+      prefix = "cache/images/"
+    }
+
+    expiration {
+      days = var.image_cache_ttl_days
+    }
+  }
+
+  rule {
+    id     = "expire-tts-cache"
+    status = "Enabled"
+
+    filter {
+      prefix = "cache/audio/"
+    }
+
+    expiration {
+      days = var.tts_cache_ttl_days
+    }
+  }
+}
+
 # ------------------------------------------------------------------------------
 # Secrets Manager
 # ------------------------------------------------------------------------------
@@ -239,7 +283,8 @@ resource "aws_iam_role_policy" "ecs_task_s3" {
         "s3:GetObject",
         "s3:PutObject",
         "s3:DeleteObject",
-        "s3:ListBucket"
+        "s3:ListBucket",
+        "s3:AbortMultipartUpload"
       ]
       Resource = [
         aws_s3_bucket.assets.arn,
@@ -481,7 +526,9 @@ resource "aws_ecs_task_definition" "app" {
     environment = [
       { name = "AWS_REGION", value = var.aws_region },
       { name = "S3_BUCKET_NAME", value = aws_s3_bucket.assets.id },
-      { name = "DATA_DIR", value = "/tmp/data" }
+      { name = "DATA_DIR", value = "/tmp/data" },
+      { name = "IMAGE_CACHE_TTL_SEC", value = tostring(var.image_cache_ttl_days * 86400) },
+      { name = "TTS_CACHE_TTL_SEC", value = tostring(var.tts_cache_ttl_days * 86400) }
     ]
 
     secrets = [
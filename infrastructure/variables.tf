@@ -44,3 +44,15 @@ variable "vpc_id" {
   description = "VPC ID to deploy into"
   type        = string
 }
+
+variable "image_cache_ttl_days" {
+  description = "Days a cached scene image is reused before it expires"
+  type        = number
+  default     = 7
+}
+
+variable "tts_cache_ttl_days" {
+  description = "Days a cached narration clip is reused before it expires"
+  type        = number
+  default     = 30
+}